@@ -0,0 +1,64 @@
+"""Deterministic synthetic feedback for benchmarks.
+
+Row ``i`` of a dataset depends only on ``(seed, i)``, so a 100k dataset is
+the 10k one plus 90k more rows and datasets can be grown in place.
+"""
+import random
+from datetime import datetime, timedelta
+from typing import Iterator, Tuple
+
+from utils.database import FEEDBACK_TAGS
+from utils.matcher import DEFAULT_SAFETY_KEYWORDS
+
+DEFAULT_SEED = 1729
+
+# Roughly the shape of real submissions: mostly mid priority, safety and
+# technical tags most common, a minority mentioning a safety keyword.
+PRIORITY_WEIGHTS = {1: 0.10, 2: 0.20, 3: 0.35, 4: 0.22, 5: 0.13}
+TAG_PROBABILITIES = {
+    'safety': 0.35, 'technical': 0.30, 'performance': 0.20,
+    'alignment': 0.15, 'ethics': 0.10,
+}
+SAFETY_KEYWORD_RATE = 0.15
+HISTORY_DAYS = 365
+
+_WORDS = (
+    "model response output prompt user request answer context token latency "
+    "evaluation dataset training behavior refusal policy instruction system "
+    "tool call result format error timeout retry quality reasoning summary "
+    "feature interface dashboard review report issue example case test release "
+    "the a an of to in for with on when after before during about and but or "
+    "sometimes often rarely always never unexpectedly consistently slightly"
+).split()
+_KEYWORDS = [keyword for keywords in DEFAULT_SAFETY_KEYWORDS.values() for keyword in keywords]
+
+assert set(TAG_PROBABILITIES) == set(FEEDBACK_TAGS)
+
+
+def _sentence(rng: random.Random, words: int) -> str:
+    return ' '.join(rng.choice(_WORDS) for _ in range(words))
+
+
+def make_row(index: int, seed: int = DEFAULT_SEED,
+             now: datetime = None) -> Tuple[str, str, int, list, datetime]:
+    """``(title, description, priority, tags, created_at)`` for row ``index``."""
+    rng = random.Random(seed * 1_000_003 + index)
+    now = now or datetime.now()
+    description = _sentence(rng, rng.randint(20, 120))
+    if rng.random() < SAFETY_KEYWORD_RATE:
+        words = description.split()
+        words.insert(rng.randrange(len(words)), rng.choice(_KEYWORDS))
+        description = ' '.join(words)
+    priority = rng.choices(list(PRIORITY_WEIGHTS), weights=list(PRIORITY_WEIGHTS.values()))[0]
+    tags = [tag for tag, probability in TAG_PROBABILITIES.items() if rng.random() < probability]
+    # Skewed toward recent days, like a growing product
+    age = min(rng.expovariate(1 / 60), HISTORY_DAYS)
+    created_at = now - timedelta(days=age)
+    title = f"{_sentence(rng, rng.randint(3, 8)).capitalize()} #{index}"
+    return title, description, priority, tags, created_at
+
+
+def generate_rows(start: int, stop: int, seed: int = DEFAULT_SEED,
+                  now: datetime = None) -> Iterator[Tuple[str, str, int, list, datetime]]:
+    for index in range(start, stop):
+        yield make_row(index, seed, now)
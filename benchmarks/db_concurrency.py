@@ -0,0 +1,223 @@
+"""Database-layer concurrency test for running several app processes.
+
+Runs the Dashboard's per-render data path (data version, filter options,
+filtered aggregates, count and first page, each memoized per data version
+as components.resources does) from 1, 2, 4, ... processes at once, with a
+share of writes (submissions and upvotes) whose change notifications
+invalidate every process's caches. Reports throughput per process count
+and the scaling efficiency against one process, plus how long a write
+takes to reach another process's listener.
+
+    python -m benchmarks.db_concurrency --ephemeral --processes 1,2,4,8 --duration 20
+
+This calls Database methods from threads in worker processes; it does not
+start Streamlit servers or a proxy, so it measures the shared state
+(Postgres, LISTEN/NOTIFY invalidation) but not script reruns, websocket
+traffic or the proxy. Load testing real replicas behind a proxy is
+manual; see the README.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List
+
+from benchmarks.datasets import DEFAULT_SEED
+from benchmarks.postgres import EphemeralPostgres, recreate_database
+from benchmarks.run import label_size, parse_size, seed
+
+# Sidebar selections sessions switch between; {} is the unfiltered view
+FILTER_CHOICES = (
+    {}, {'priorities': (4, 5)}, {'safety_only': True}, {'tags': ('safety',)},
+    {'priorities': (4, 5), 'tags': ('safety', 'alignment')},
+)
+NOTIFY_SAMPLES = 20
+
+
+def _render(db, memo, memo_lock, version, feedback_filter):
+    """One Dashboard render's queries, memoized like st.cache_data."""
+    from utils.snapshot import get_snapshot
+
+    def cached(name, compute):
+        key = (name, feedback_filter, version)
+        with memo_lock:
+            if key in memo:
+                return memo[key]
+        value = compute()
+        with memo_lock:
+            memo[key] = value
+        return value
+
+    filtered = not feedback_filter.is_empty()
+    cached('options', db.get_filter_options)
+    cached('aggregates', lambda: get_snapshot(db).aggregates(feedback_filter)
+           if filtered else db.get_aggregates())
+    cached('count', lambda: get_snapshot(db).count(feedback_filter)
+           if filtered else db.count_feedback())
+    cached('page', lambda: db.get_feedback_page(limit=25, feedback_filter=feedback_filter))
+
+
+def _session(db, listener, memo, memo_lock, deadline, write_ratio, rng, stats):
+    from utils.database import FeedbackFilter
+
+    while time.monotonic() < deadline:
+        started = time.perf_counter()
+        try:
+            if rng.random() < write_ratio:
+                if rng.random() < 0.5:
+                    db.add_feedback(f"Concurrency test {rng.random()}", "Synthetic concurrency test feedback.",
+                                    rng.randint(1, 5), ['technical'])
+                else:
+                    db.upvote_feedback(rng.randint(1, stats['max_id']))
+                kind = 'writes'
+            else:
+                version = listener.version if listener is not None else None
+                if version is None:
+                    version = db.get_data_version()
+                _render(db, memo, memo_lock, version, FeedbackFilter(**rng.choice(FILTER_CHOICES)))
+                kind = 'renders'
+            elapsed = time.perf_counter() - started
+            with stats['lock']:
+                stats[kind] += 1
+                stats['latencies'].append(elapsed)
+        except Exception:
+            with stats['lock']:
+                stats['errors'] += 1
+
+
+def _worker(args) -> Dict[str, Any]:
+    """Body of one app process."""
+    duration, sessions, write_ratio, max_id, index = args
+    os.environ['PGPOOL_MAXCONN'] = str(sessions + 2)
+    from utils.database import Database
+    from utils.events import ensure_change_listener_started
+    from utils.votes import ensure_vote_flusher_started
+
+    db = Database()
+    listener = ensure_change_listener_started()
+    ensure_vote_flusher_started()
+    # Warm this process's snapshot, as a long-running replica would be
+    from utils.snapshot import get_snapshot
+    get_snapshot(db)
+
+    stats = {'renders': 0, 'writes': 0, 'errors': 0, 'latencies': [],
+             'lock': threading.Lock(), 'max_id': max_id}
+    memo, memo_lock = {}, threading.Lock()
+    deadline = time.monotonic() + duration
+    threads = [
+        threading.Thread(target=_session, args=(db, listener, memo, memo_lock, deadline, write_ratio,
+                                                random.Random(index * 1000 + n), stats))
+        for n in range(sessions)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    stats.pop('lock')
+    return stats
+
+
+def run_level(processes: int, duration: float, sessions: int, write_ratio: float, max_id: int) -> Dict[str, Any]:
+    context = multiprocessing.get_context('spawn')
+    with context.Pool(processes) as pool:
+        results = pool.map(_worker, [(duration, sessions, write_ratio, max_id, n) for n in range(processes)])
+    latencies = sorted(latency for result in results for latency in result['latencies'])
+    operations = sum(result['renders'] + result['writes'] for result in results)
+    return {
+        'processes': processes,
+        'ops_per_second': operations / duration,
+        'renders': sum(result['renders'] for result in results),
+        'writes': sum(result['writes'] for result in results),
+        'errors': sum(result['errors'] for result in results),
+        'p50': statistics.median(latencies) if latencies else None,
+        'p95': latencies[int(0.95 * (len(latencies) - 1))] if latencies else None,
+    }
+
+
+def measure_notify_latency(db) -> Dict[str, float]:
+    """Seconds from a committed write to its notification in another connection."""
+    from utils.events import ChangeListener
+
+    listener = ChangeListener().start()
+    while listener.version is None:
+        time.sleep(0.01)
+    seen = threading.Event()
+    listener.subscribe(lambda version: seen.set())
+    samples = []
+    for n in range(NOTIFY_SAMPLES):
+        seen.clear()
+        started = time.perf_counter()
+        db.add_feedback(f"Notify probe {n}", "Notification latency probe.", 1, [])
+        if seen.wait(5):
+            samples.append(time.perf_counter() - started)
+    listener.stop()
+    if not samples:
+        raise RuntimeError("No change notifications received; is migration 13 applied?")
+    return {'median': statistics.median(samples), 'max': max(samples), 'samples': len(samples)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Database-layer concurrency test")
+    parser.add_argument('--processes', default='1,2,4', help="comma-separated process counts")
+    parser.add_argument('--sessions', type=int, default=4, help="concurrent sessions (threads) per process")
+    parser.add_argument('--duration', type=float, default=15, help="seconds per process count")
+    parser.add_argument('--write-ratio', type=float, default=0.05, help="share of operations that write")
+    parser.add_argument('--rows', default='100k', help="feedback rows to seed")
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    parser.add_argument('--ephemeral', action='store_true', help="start a throwaway cluster with initdb/pg_ctl")
+    parser.add_argument('--database', default='feedback_concurrency', help="scratch database (dropped and recreated)")
+    parser.add_argument('--reuse', action='store_true', help="keep an existing scratch database")
+    parser.add_argument('--output', help="write results JSON here")
+    args = parser.parse_args(argv)
+
+    levels = sorted(int(n) for n in args.processes.split(','))
+    rows = parse_size(args.rows)
+    postgres = EphemeralPostgres(database=args.database).start() if args.ephemeral else None
+    try:
+        if postgres is None and not args.reuse:
+            recreate_database(args.database)
+        else:
+            os.environ['PGDATABASE'] = args.database
+        # No OpenAI calls: submissions are saved without analysis
+        os.environ['ANALYSIS_INLINE_WORKER'] = '0'
+
+        from utils.database import Database
+        db = Database()
+        print(f"Seeding {label_size(rows)} rows")
+        seed(db, rows, args.seed, datetime.now().replace(microsecond=0))
+
+        notify = measure_notify_latency(db)
+        print(f"Change notification latency: median {notify['median'] * 1000:.1f}ms, "
+              f"max {notify['max'] * 1000:.1f}ms")
+
+        results: List[Dict[str, Any]] = []
+        for processes in levels:
+            print(f"[{processes} processes] running for {args.duration:.0f}s")
+            results.append(run_level(processes, args.duration, args.sessions, args.write_ratio, rows))
+    finally:
+        if postgres is not None:
+            postgres.stop()
+
+    single = results[0]['ops_per_second'] / results[0]['processes']
+    print(f"{'processes':>9} {'ops/s':>10} {'speedup':>8} {'efficiency':>10} {'p50 ms':>8} {'p95 ms':>8} {'errors':>7}")
+    for result in results:
+        result['speedup'] = result['ops_per_second'] / single
+        result['efficiency'] = result['speedup'] / result['processes']
+        print(f"{result['processes']:>9} {result['ops_per_second']:>10.1f} {result['speedup']:>8.2f} "
+              f"{result['efficiency']:>10.0%} {(result['p50'] or 0) * 1000:>8.1f} "
+              f"{(result['p95'] or 0) * 1000:>8.1f} {result['errors']:>7}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'notify_latency': notify, 'results': results, 'cpus': os.cpu_count()}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,192 @@
+"""OpenAI-compatible mock server for offline benchmarks.
+
+Serves ``POST /v1/chat/completions`` with canned JSON shaped like the
+app's prompts expect, after a configurable delay (before the first chunk
+when ``stream`` is set). Point the app at it with
+OPENAI_BASE_URL=http://127.0.0.1:<port>/v1.
+
+    python -m benchmarks.mock_llm --port 8089 --latency 0.4 --jitter 0.1
+"""
+import argparse
+import json
+import random
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from utils.nlp import estimate_tokens
+
+_ANALYSIS = {
+    'priority_score': 3,
+    'safety_category': 'potential risk',
+    'reasoning': 'Synthetic analysis from the benchmark mock.',
+    'key_concerns': ['benchmark'],
+}
+
+_SUMMARY = {
+    'executive_summary': 'Synthetic executive summary from the benchmark mock.',
+    'key_recommendations': ['Review high priority items', 'Triage safety concerns', 'Track trends'],
+    'risk_assessment': 'Moderate',
+    'focus_areas': ['safety', 'alignment'],
+}
+
+_PARTITION = {
+    'summary': 'Synthetic period summary from the benchmark mock.',
+    'themes': ['reliability', 'safety'],
+    'risks': [],
+}
+
+# Characters per streamed chunk, roughly a few tokens
+STREAM_CHUNK = 16
+
+
+def _batch_ids(prompt: str):
+    """Item ids from a batch prompt (the JSON list after "Items:")."""
+    match = re.search(r'Items:\s*(\[.*\])\s*$', prompt, re.S)
+    if not match:
+        return []
+    try:
+        return [str(item.get('id')) for item in json.loads(match.group(1))]
+    except (ValueError, AttributeError):
+        return []
+
+
+def completion_content(prompt: str) -> dict:
+    if '"results"' in prompt:
+        return {'results': [{'id': item_id, **_ANALYSIS} for item_id in _batch_ids(prompt)]}
+    if 'executive summary' in prompt.lower():
+        return _SUMMARY
+    if 'themes (list' in prompt:
+        return _PARTITION
+    return _ANALYSIS
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "MockLLM/1.0"
+
+    def do_POST(self):
+        if not self.path.rstrip('/').endswith('/chat/completions'):
+            self.send_error(404)
+            return
+        request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        prompt = '\n'.join(str(message.get('content', '')) for message in request.get('messages', []))
+        content = json.dumps(completion_content(prompt))
+        mock = self.server.mock
+        time.sleep(max(0.0, mock.latency + random.uniform(-mock.jitter, mock.jitter)))
+        with mock.lock:
+            mock.requests += 1
+            completion_id = f'chatcmpl-mock-{mock.requests}'
+        usage = {
+            'prompt_tokens': estimate_tokens(prompt),
+            'completion_tokens': estimate_tokens(content),
+            'total_tokens': estimate_tokens(prompt) + estimate_tokens(content),
+        }
+        if request.get('stream'):
+            self._stream(request, completion_id, content, usage)
+            return
+        body = json.dumps({
+            'id': completion_id,
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': request.get('model', 'mock'),
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': content},
+                'finish_reason': 'stop',
+            }],
+            'usage': usage,
+        }).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _stream(self, request, completion_id, content, usage):
+        """Send ``content`` as server-sent chunk events, like the real API."""
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+
+        def event(choices, usage=None):
+            chunk = {
+                'id': completion_id,
+                'object': 'chat.completion.chunk',
+                'created': int(time.time()),
+                'model': request.get('model', 'mock'),
+                'choices': choices,
+                'usage': usage,
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode('utf-8'))
+            self.wfile.flush()
+
+        event([{'index': 0, 'delta': {'role': 'assistant', 'content': ''}, 'finish_reason': None}])
+        for start in range(0, len(content), STREAM_CHUNK):
+            event([{'index': 0, 'delta': {'content': content[start:start + STREAM_CHUNK]}, 'finish_reason': None}])
+        event([{'index': 0, 'delta': {}, 'finish_reason': 'stop'}])
+        if (request.get('stream_options') or {}).get('include_usage'):
+            event([], usage)
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MockLLMServer:
+    """Runs the mock on a background thread; usable as a context manager."""
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0,
+                 latency: float = 0.2, jitter: float = 0.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.requests = 0
+        self.lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), _Handler)
+        self._server.daemon_threads = True
+        self._server.mock = self
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="mock-llm", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="OpenAI-compatible mock for benchmarks")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--latency', type=float, default=0.2, help="seconds per response")
+    parser.add_argument('--jitter', type=float, default=0.0, help="+/- seconds of random jitter")
+    args = parser.parse_args(argv)
+
+    server = MockLLMServer(args.host, args.port, args.latency, args.jitter)
+    print(f"Mock LLM listening on {server.base_url}")
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,81 @@
+"""Scratch Postgres databases for benchmarks.
+
+``EphemeralPostgres`` starts a throwaway cluster with the local initdb and
+pg_ctl binaries; ``recreate_database`` makes a fresh database on an
+existing server. Either way the PG* environment variables are pointed at
+it before the app's connection pool is created.
+"""
+import os
+import shutil
+import socket
+import subprocess
+import tempfile
+
+import psycopg2
+from psycopg2 import sql
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class EphemeralPostgres:
+    """A private cluster in a temporary directory, removed on stop()."""
+
+    def __init__(self, user: str = 'bench', database: str = 'feedback_bench'):
+        self.user = user
+        self.database = database
+        self.port = None
+        self.datadir = None
+
+    def start(self):
+        if shutil.which('initdb') is None or shutil.which('pg_ctl') is None:
+            raise RuntimeError("initdb/pg_ctl not found on PATH; use an existing server instead")
+        self.datadir = tempfile.mkdtemp(prefix='feedback-bench-pg-')
+        self.port = _free_port()
+        subprocess.run(
+            ['initdb', '-D', self.datadir, '-U', self.user, '--auth=trust', '-E', 'UTF8'],
+            check=True, capture_output=True,
+        )
+        subprocess.run(
+            ['pg_ctl', '-D', self.datadir, '-w', '-l', os.path.join(self.datadir, 'server.log'),
+             '-o', f"-p {self.port} -k {self.datadir} -c listen_addresses=127.0.0.1", 'start'],
+            check=True, capture_output=True,
+        )
+        os.environ.update({
+            'PGHOST': '127.0.0.1', 'PGPORT': str(self.port), 'PGUSER': self.user,
+            'PGPASSWORD': '', 'PGDATABASE': 'postgres',
+        })
+        recreate_database(self.database)
+        return self
+
+    def stop(self):
+        if self.datadir is None:
+            return
+        subprocess.run(['pg_ctl', '-D', self.datadir, '-m', 'fast', 'stop'], capture_output=True)
+        shutil.rmtree(self.datadir, ignore_errors=True)
+        self.datadir = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def recreate_database(name: str):
+    """Drop and create ``name`` on the server in PG*, then select it in PGDATABASE."""
+    conn = psycopg2.connect(
+        host=os.environ['PGHOST'], port=os.environ['PGPORT'], user=os.environ['PGUSER'],
+        password=os.environ.get('PGPASSWORD', ''), dbname='postgres',
+    )
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cur:
+            cur.execute(sql.SQL("DROP DATABASE IF EXISTS {}").format(sql.Identifier(name)))
+            cur.execute(sql.SQL("CREATE DATABASE {}").format(sql.Identifier(name)))
+    finally:
+        conn.close()
+    os.environ['PGDATABASE'] = name
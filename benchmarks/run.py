@@ -0,0 +1,336 @@
+"""Offline benchmark suite.
+
+Seeds a scratch database with synthetic feedback (grown in place through
+each requested size), times the main read, render and analysis paths, and
+writes the results as JSON. With a baseline file, cases whose median got
+slower than ``--tolerance`` are reported and the exit status is nonzero.
+OpenAI calls go to the local mock in benchmarks.mock_llm.
+
+    python -m benchmarks.run --ephemeral --sizes 10k,100k
+    python -m benchmarks.run --database feedback_bench --sizes 10k,100k,1m \\
+        --output results.json --baseline benchmarks/baseline.json
+    python -m benchmarks.run --sizes 10k --update-baseline
+
+Without ``--ephemeral`` the PG* variables must point at a server where the
+benchmark may drop and create ``--database``; the app's own database is
+never touched.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from benchmarks.datasets import DEFAULT_SEED, generate_rows
+from benchmarks.mock_llm import MockLLMServer
+from benchmarks.postgres import EphemeralPostgres, recreate_database
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, 'baseline.json')
+
+SEED_BATCH_SIZE = 5000
+TEXT_SAMPLE_SIZE = 1000
+# Differences below this are timer noise, whatever the ratio
+MIN_REGRESSION_SECONDS = 0.002
+
+CASES = (
+    'get_all_feedback', 'apply_filters', 'snapshot', 'charts', 'generate_metrics_summary',
+    'analyze_text', 'submission', 'analyze_many',
+)
+
+
+def parse_size(text: str) -> int:
+    text = text.strip().lower()
+    multiplier = {'k': 1_000, 'm': 1_000_000}.get(text[-1:], 1)
+    return int(float(text.rstrip('km')) * multiplier)
+
+
+def label_size(size: int) -> str:
+    if size % 1_000_000 == 0:
+        return f"{size // 1_000_000}m"
+    if size % 1_000 == 0:
+        return f"{size // 1_000}k"
+    return str(size)
+
+
+def measure(fn: Callable[[], Any], repeat: int, warmup: int = 1) -> Dict[str, Any]:
+    for _ in range(warmup):
+        fn()
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    return {
+        'median': statistics.median(timings),
+        'p95': timings[min(len(timings) - 1, int(round(0.95 * (len(timings) - 1))))],
+        'min': timings[0],
+        'runs': len(timings),
+    }
+
+
+def seed(db, target: int, seed_value: int, now: datetime):
+    """Grow the feedback table to ``target`` synthetic rows."""
+    current = db.count_feedback()
+    if current > target:
+        raise RuntimeError(f"Database already has {current} rows, more than {target}; "
+                           "use a fresh database or increasing sizes")
+    started = time.perf_counter()
+    for start in range(current, target, SEED_BATCH_SIZE):
+        stop = min(start + SEED_BATCH_SIZE, target)
+        db.bulk_add_feedback(list(generate_rows(start, stop, seed_value, now)))
+        print(f"  seeded {stop}/{target}", end='\r', flush=True)
+    # Seeded history predates the partitions created at migration time
+    db.ensure_partitions()
+    with db.pool.connection(statement_timeout=0) as conn:
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            cur.execute("VACUUM ANALYZE feedback")
+        conn.autocommit = False
+    if target > current:
+        print(f"  seeded {target - current} rows in {time.perf_counter() - started:.1f}s")
+
+
+def run_size_cases(db, cases: List[str], repeat: int) -> Dict[str, Dict[str, Any]]:
+    from utils.database import FeedbackFilter
+    from utils.summary import SummaryGenerator
+    from utils.visualization import (
+        chart_payload_size, create_feedback_trend_chart, create_priority_distribution,
+        create_tag_distribution
+    )
+
+    results = {}
+    # A typical sidebar selection: high priorities, one tag
+    selected = FeedbackFilter(priorities=(4, 5), tags=('safety',))
+
+    if 'get_all_feedback' in cases:
+        results['get_all_feedback'] = measure(db.get_all_feedback, repeat)
+
+    if 'apply_filters' in cases:
+        # What a filter change costs the Dashboard page: the sidebar
+        # options, then the filtered aggregates, count and first page.
+        def apply_filters():
+            db.get_filter_options()
+            db.get_aggregates(selected)
+            db.count_feedback(selected)
+            db.get_feedback_page(limit=25, feedback_filter=selected)
+        results['apply_filters'] = measure(apply_filters, repeat)
+        results['get_aggregates_rollup'] = measure(db.get_aggregates, repeat)
+        results['get_aggregates_live'] = measure(lambda: db.get_aggregates(use_rollups=False), repeat)
+
+    if 'snapshot' in cases:
+        # The columnar snapshot against the SQL path it replaces for
+        # filtered views: full load, an unchanged refresh, and the same
+        # filtered aggregates and count as apply_filters.
+        from utils.snapshot import SnapshotStore
+        store = SnapshotStore()
+        results['snapshot_load'] = measure(lambda: SnapshotStore().get(db), max(1, repeat // 2), warmup=0)
+        snapshot = store.get(db)
+        results['snapshot_load']['bytes'] = snapshot.nbytes
+        results['snapshot_refresh_unchanged'] = measure(lambda: store.get(db), repeat)
+        results['filtered_aggregates_sql'] = measure(
+            lambda: (db.get_aggregates(selected), db.count_feedback(selected)), repeat
+        )
+        results['filtered_aggregates_snapshot'] = measure(
+            lambda: (snapshot.aggregates(selected), snapshot.count(selected)), repeat
+        )
+
+    aggregates = db.get_aggregates()
+    if 'charts' in cases:
+        for builder in (create_feedback_trend_chart, create_priority_distribution, create_tag_distribution):
+            results[builder.__name__] = measure(lambda: builder(aggregates), repeat)
+            results[builder.__name__]['bytes'] = chart_payload_size(builder(aggregates))
+        # Every day as its own point: the WebGL path, before any budget coarsening
+        results['trend_chart_daily'] = measure(
+            lambda: create_feedback_trend_chart(aggregates, bucket='day', budget=float('inf')), repeat
+        )
+        results['trend_chart_daily']['bytes'] = chart_payload_size(
+            create_feedback_trend_chart(aggregates, bucket='day', budget=float('inf'))
+        )
+
+    if 'generate_metrics_summary' in cases:
+        generator = SummaryGenerator()
+        results['generate_metrics_summary'] = measure(
+            lambda: generator.generate_metrics_summary(aggregates), repeat
+        )
+    return results
+
+
+def run_global_cases(db, cases: List[str], repeat: int, seed_value: int) -> Dict[str, Dict[str, Any]]:
+    """Cases whose cost does not depend on the table size."""
+    from utils.nlp import SafetyAnalyzer
+
+    results = {}
+    analyzer = SafetyAnalyzer()
+    sample = list(generate_rows(0, TEXT_SAMPLE_SIZE, seed_value))
+
+    if 'analyze_text' in cases:
+        descriptions = [row[1] for row in sample]
+        results['analyze_text_x1000'] = measure(
+            lambda: [analyzer.analyze_text(text) for text in descriptions], repeat
+        )
+
+    counter = iter(range(10 ** 9))
+
+    if 'submission' in cases:
+        # Save with a queued job, then what the worker does for it. Titles
+        # are unique so the LLM cache never answers.
+        errors = []
+
+        def submit():
+            n = next(counter)
+            title, description, priority, tags, _ = sample[n % len(sample)]
+            feedback_id = db.add_feedback(f"{title} run {n}", description, priority, tags,
+                                          queue_analysis=True)
+            for job in db.claim_analysis_jobs(10):
+                try:
+                    analysis = analyzer.get_ai_safety_score(job['title'], job['description'], fallback=False)
+                except Exception as e:
+                    errors.append(str(e))
+                    analysis = analyzer.get_fallback_analysis(job['description'])
+                db.complete_analysis_job(job['id'], job['feedback_id'], analysis)
+            return feedback_id
+        results['submission'] = measure(submit, repeat)
+        # A failing API path is much faster than a real one; surface it
+        results['submission']['llm_errors'] = len(errors)
+        if errors:
+            print(f"  submission: {len(errors)} analysis calls failed, e.g. {errors[0]}")
+
+    if 'analyze_many' in cases:
+        def analyze_many():
+            n = next(counter)
+            items = [(i, f"{row[0]} run {n}", row[1]) for i, row in enumerate(sample[:50])]
+            return list(analyzer.analyze_many(items))
+        results['analyze_many_x50'] = measure(analyze_many, max(1, repeat // 2))
+
+    return results
+
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]],
+            tolerance: float) -> List[str]:
+    regressions = []
+    for name, result in sorted(results.items()):
+        base = baseline.get(name)
+        if not base:
+            continue
+        delta = result['median'] - base['median']
+        if result['median'] > base['median'] * (1 + tolerance) and delta > MIN_REGRESSION_SECONDS:
+            regressions.append(f"{name}: {base['median'] * 1000:.1f}ms -> {result['median'] * 1000:.1f}ms "
+                               f"(+{delta / base['median']:.0%})")
+    return regressions
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BENCH_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the offline benchmark suite")
+    parser.add_argument('--sizes', default='10k,100k,1m', help="comma-separated row counts, e.g. 10k,100k,1m")
+    parser.add_argument('--cases', default=','.join(CASES), help=f"subset of: {', '.join(CASES)}")
+    parser.add_argument('--repeat', type=int, default=5, help="timed runs per case (median is compared)")
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    parser.add_argument('--ephemeral', action='store_true', help="start a throwaway cluster with initdb/pg_ctl")
+    parser.add_argument('--database', default='feedback_bench', help="scratch database (dropped and recreated)")
+    parser.add_argument('--reuse', action='store_true', help="keep an existing scratch database and grow it")
+    parser.add_argument('--llm-latency', type=float, default=0.2, help="mock LLM response time in seconds")
+    parser.add_argument('--llm-jitter', type=float, default=0.0)
+    parser.add_argument('--output', help="write results JSON here (default: stdout only)")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--tolerance', type=float, default=0.25, help="allowed slowdown before flagging, e.g. 0.25")
+    parser.add_argument('--update-baseline', action='store_true', help="store these results as the baseline")
+    args = parser.parse_args(argv)
+
+    sizes = sorted(parse_size(size) for size in args.sizes.split(','))
+    cases = [case.strip() for case in args.cases.split(',') if case.strip()]
+    unknown = set(cases) - set(CASES)
+    if unknown:
+        parser.error(f"unknown cases: {', '.join(sorted(unknown))}")
+
+    postgres = EphemeralPostgres(database=args.database).start() if args.ephemeral else None
+    mock = MockLLMServer(latency=args.llm_latency, jitter=args.llm_jitter).start()
+    try:
+        if postgres is None and not args.reuse:
+            recreate_database(args.database)
+        else:
+            os.environ['PGDATABASE'] = args.database
+        # Set before the shared OpenAI client is first created
+        os.environ['OPENAI_BASE_URL'] = mock.base_url
+        os.environ.setdefault('OPENAI_API_KEY', 'benchmark')
+        os.environ['ANALYSIS_INLINE_WORKER'] = '0'
+
+        from utils.database import Database
+        db = Database()
+        now = datetime.now().replace(microsecond=0)
+
+        results: Dict[str, Dict[str, Any]] = {}
+        for size in sizes:
+            label = label_size(size)
+            print(f"[{label}] seeding")
+            seed(db, size, args.seed, now)
+            print(f"[{label}] running")
+            for name, result in run_size_cases(db, cases, args.repeat).items():
+                results[f"{label}/{name}"] = result
+        print("[global] running")
+        for name, result in run_global_cases(db, cases, args.repeat, args.seed).items():
+            results[name] = result
+    finally:
+        mock.stop()
+        if postgres is not None:
+            postgres.stop()
+
+    report = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'revision': _git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'seed': args.seed,
+            'repeat': args.repeat,
+            'llm_latency': args.llm_latency,
+        },
+        'results': results,
+    }
+    for name, result in results.items():
+        print(f"{name:<45} median {result['median'] * 1000:9.1f}ms  p95 {result['p95'] * 1000:9.1f}ms")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    # The first run on a machine records its baseline; timings from other
+    # hardware are not comparable, so none is shipped with the repository
+    if args.update_baseline or not os.path.exists(args.baseline):
+        if not args.update_baseline:
+            print(f"No baseline at {args.baseline}; recording these results as the baseline")
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    with open(args.baseline) as f:
+        stored = json.load(f)
+    baseline = stored['results']
+    recorded_on = stored.get('meta', {}).get('platform')
+    if recorded_on != report['meta']['platform']:
+        print(f"Note: the baseline was recorded on {recorded_on}, not this platform")
+    missing = sorted(set(results) - set(baseline))
+    if missing:
+        print(f"Not in the baseline (not compared): {', '.join(missing)}")
+    regressions = compare(results, baseline, args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,159 @@
+"""Cold-start benchmark for the Streamlit entry point.
+
+For the entry point and each page it measures, in a fresh interpreter:
+
+* import time of the page's modules (``python -X importtime``), and
+* the heavy packages they pull in beyond what streamlit itself loads,
+  which must not include anything listed under that page's ``forbidden``
+  key.
+
+With ``--render`` it also times the first full run of each page with
+streamlit's AppTest harness (needs a reachable database).
+
+Results are compared with benchmarks/startup_budget.json; any import that
+exceeds its budget or loads a forbidden package makes the exit status
+nonzero, so the script can gate CI.
+
+    python -m benchmarks.startup
+    python -m benchmarks.startup --render --repeat 5
+    python -m benchmarks.startup --check   # forbidden packages only (tests/test_startup.py)
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BUDGET_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'startup_budget.json')
+
+# Modules each page needs at import; mirrors the lazy imports in main.py
+PAGES = {
+    'entry': ['streamlit', 'components.resources'],
+    'Dashboard': ['components.dashboard', 'components.filters', 'components.feedback_list'],
+    'Executive Summary': ['components.summary_dashboard'],
+    'Submit Feedback': ['components.feedback_form'],
+    'Performance': ['components.performance'],
+}
+
+HEAVY_PACKAGES = ('openai', 'pandas', 'plotly', 'numpy', 'psycopg2')
+
+
+def profile_imports(modules):
+    """Import ``modules`` in a new interpreter.
+
+    Returns ``(seconds, heavy packages loaded, slowest top-level imports)``.
+    """
+    code = (
+        "import json, sys, time\n"
+        "start = time.perf_counter()\n"
+        + "".join(f"import {module}\n" for module in modules)
+        + "elapsed = time.perf_counter() - start\n"
+        "heavy = sorted({name.split('.')[0] for name in sys.modules} & set(%r))\n"
+        "print(json.dumps([elapsed, heavy]))\n" % (list(HEAVY_PACKAGES),)
+    )
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    elapsed, heavy = json.loads(result.stdout.strip().splitlines()[-1])
+    return elapsed, heavy, _slowest_imports(result.stderr)
+
+
+def _slowest_imports(importtime_log, limit=5):
+    """Outermost imports with the largest cumulative time, in seconds."""
+    totals = []
+    for line in importtime_log.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # Nested imports are indented; their time is already in the parent's
+        if not cumulative.strip().isdigit() or name.startswith('  '):
+            continue
+        totals.append((name.strip(), int(cumulative) / 1e6))
+    return sorted(totals, key=lambda item: item[1], reverse=True)[:limit]
+
+
+def time_first_render(page):
+    """Seconds for the first script run of ``page`` under AppTest."""
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_file(os.path.join(ROOT, 'main.py'), default_timeout=60)
+    start = time.perf_counter()
+    app.run()
+    if page != 'Dashboard':
+        app.sidebar.radio[0].set_value(page).run()
+    elapsed = time.perf_counter() - start
+    if app.exception:
+        raise RuntimeError(app.exception[0].message)
+    return elapsed
+
+
+def load_budget():
+    with open(BUDGET_FILE) as f:
+        return json.load(f)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure app cold-start time")
+    parser.add_argument('--repeat', type=int, default=3, help="runs per page (median is reported)")
+    parser.add_argument('--render', action='store_true', help="also time the first render with AppTest")
+    parser.add_argument('--json', action='store_true', help="print results as JSON")
+    parser.add_argument('--check', action='store_true',
+                        help="one run per page, failing only on forbidden packages; "
+                             "timings depend on the machine, so they are not gated")
+    args = parser.parse_args(argv)
+    if args.check:
+        args.repeat, args.render = 1, False
+
+    budget = load_budget()
+    results = {}
+    failures = []
+    # Whatever streamlit loads itself is not charged to the app
+    baseline = set(profile_imports(['streamlit'])[1])
+
+    for page, modules in PAGES.items():
+        page_budget = budget.get(page, {})
+        runs = [profile_imports(modules) for _ in range(args.repeat)]
+        import_seconds = statistics.median(run[0] for run in runs)
+        heavy = sorted(set(runs[0][1]) - baseline)
+        results[page] = {
+            'import_seconds': round(import_seconds, 4),
+            'heavy_packages': heavy,
+            'slowest_imports': runs[0][2],
+        }
+
+        limit = None if args.check else page_budget.get('import_seconds')
+        if limit is not None and import_seconds > limit:
+            failures.append(f"{page}: import took {import_seconds:.3f}s (budget {limit}s)")
+        forbidden = sorted(set(heavy) & set(page_budget.get('forbidden', ())))
+        if forbidden:
+            failures.append(f"{page}: imports {', '.join(forbidden)} at load time")
+
+        if args.render and page != 'entry':
+            render_seconds = statistics.median(time_first_render(page) for _ in range(args.repeat))
+            results[page]['render_seconds'] = round(render_seconds, 4)
+            limit = page_budget.get('render_seconds')
+            if limit is not None and render_seconds > limit:
+                failures.append(f"{page}: first render took {render_seconds:.3f}s (budget {limit}s)")
+
+    if args.json:
+        print(json.dumps({'results': results, 'failures': failures}, indent=2))
+    else:
+        for page, result in results.items():
+            line = f"{page:<18} import {result['import_seconds']:.3f}s"
+            if 'render_seconds' in result:
+                line += f"  first render {result['render_seconds']:.3f}s"
+            print(f"{line}  heavy: {', '.join(result['heavy_packages']) or '-'}")
+        for failure in failures:
+            print(f"FAIL {failure}")
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
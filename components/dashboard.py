@@ -1,33 +1,41 @@
 import streamlit as st
+from components.resources import cached_aggregates, get_data_version
 from utils.visualization import (
+    BUCKETS,
     create_feedback_trend_chart,
     create_priority_distribution,
     create_tag_distribution
 )
+from utils.instrumentation import RENDER_SECONDS
 
-def render_dashboard(feedback_data):
+@st.fragment
+@RENDER_SECONDS.time(component='dashboard')
+def render_dashboard(db, feedback_filter):
+    """Render metrics and charts from one (cached) aggregate query."""
     st.header("Feedback Dashboard")
+    aggregates = cached_aggregates(db, feedback_filter, get_data_version(db))
     
     # Create metrics
     col1, col2, col3 = st.columns(3)
     
     with col1:
-        st.metric("Total Feedback", len(feedback_data))
+        st.metric("Total Feedback", aggregates['total_feedback'])
     
     with col2:
-        high_priority = sum(1 for item in feedback_data if item['priority'] >= 4)
-        st.metric("High Priority Items", high_priority)
+        st.metric("High Priority Items", aggregates['high_priority'])
     
     with col3:
-        safety_concerns = sum(1 for item in feedback_data if item['safety_flag'])
-        st.metric("Safety Concerns", safety_concerns)
+        st.metric("Safety Concerns", aggregates['safety_concerns'])
     
     # Display charts with unique keys
-    st.plotly_chart(create_feedback_trend_chart(feedback_data), key="trend_chart")
+    # "auto" picks day, week or month buckets from the date range
+    bucket = st.radio("Trend granularity", ("auto",) + BUCKETS, horizontal=True, key="trend_bucket")
+    st.plotly_chart(create_feedback_trend_chart(aggregates, None if bucket == "auto" else bucket),
+                    key="trend_chart")
     
     col1, col2 = st.columns(2)
     with col1:
-        st.plotly_chart(create_priority_distribution(feedback_data), key="priority_chart")
+        st.plotly_chart(create_priority_distribution(aggregates), key="priority_chart")
     
     with col2:
-        st.plotly_chart(create_tag_distribution(feedback_data), key="tag_chart")
+        st.plotly_chart(create_tag_distribution(aggregates), key="tag_chart")
@@ -1,10 +1,46 @@
+import logging
 import streamlit as st
-from utils.nlp import SafetyAnalyzer
-from utils.database import Database
-import os
+from utils.database import FEEDBACK_TAGS
+from components.resources import get_database
+from utils.analysis_worker import ensure_worker_started
+from utils.dedup import find_similar
+from utils.instrumentation import RENDER_SECONDS
+
+logger = logging.getLogger(__name__)
+
+ANALYSIS_POLL_SECONDS = 2
+# Near-identical submissions reuse the existing AI analysis instead of
+# queueing a new GPT-4 call
+REUSE_ANALYSIS_SIMILARITY = 0.9
+
+
+def _reusable_analysis(db, similar):
+    if not similar or similar[0][1] < REUSE_ANALYSIS_SIMILARITY:
+        return None
+    existing = db.get_analysis(similar[0][0])
+    if not existing or existing['analysis_status'] != 'complete':
+        return None
+    return {
+        'priority_score': existing['ai_priority'],
+        'safety_category': existing['safety_category'],
+        'reasoning': existing['reasoning'],
+        'key_concerns': existing['key_concerns'] or [],
+        'is_safety_concern': existing['safety_flag']
+    }
+
+
+def render_similar_feedback(db, similar):
+    items = db.get_feedback_by_ids([feedback_id for feedback_id, _ in similar])
+    similarity = dict(similar)
+    with st.expander(f"⚠️ {len(items)} similar feedback item(s) already submitted", expanded=True):
+        for item in items:
+            st.write(f"**{item['title']}** (Priority: {item['priority']}, "
+                     f"{similarity[item['id']]:.0%} similar, {item['upvotes']} upvotes)")
+        st.caption("Consider upvoting an existing item instead of submitting a duplicate.")
 
 def render_feedback_form():
     st.header("Submit Feedback")
+    ensure_worker_started()
     
     # Form inputs
     title = st.text_input("Feedback Title")
@@ -12,8 +48,17 @@ def render_feedback_form():
     priority = st.slider("Priority Level (Your Assessment)", 1, 5, 3)
     
     # Tag selection
-    available_tags = ['safety', 'alignment', 'performance', 'ethics', 'technical']
-    selected_tags = st.multiselect("Tags", available_tags)
+    selected_tags = st.multiselect("Tags", list(FEEDBACK_TAGS))
+    
+    db = get_database()
+    similar = []
+    if title and description:
+        try:
+            similar = find_similar(db, title, description)
+        except Exception:
+            logger.exception("Duplicate check failed")
+        if similar:
+            render_similar_feedback(db, similar)
     
     if st.button("Submit Feedback"):
         if not title or not description:
@@ -21,56 +66,69 @@ def render_feedback_form():
             return
             
         try:
-            print(f"Starting feedback submission process for: {title}")
-            print("Database connection parameters available:", all(
-                key in os.environ for key in ['PGHOST', 'PGDATABASE', 'PGUSER', 'PGPASSWORD', 'PGPORT']
-            ))
-            
-            print("Initializing components...")
-            safety_analyzer = SafetyAnalyzer()
-            db = Database()
-            
-            print("Getting AI analysis...")
-            ai_analysis = safety_analyzer.get_ai_safety_score(title, description)
-            print("AI analysis complete:", bool(ai_analysis))
-            
-            print("Saving to database...")
+            # Persist immediately; the AI analysis runs in the background
+            # unless a near-identical item already has one
+            reused_analysis = _reusable_analysis(db, similar)
             feedback_id = db.add_feedback(
                 title=title,
                 description=description,
                 priority=priority,
                 tags=selected_tags,
-                ai_analysis=ai_analysis
+                ai_analysis=reused_analysis,
+                queue_analysis=reused_analysis is None
             )
-            print(f"Database save result: {feedback_id}")
             
             if not feedback_id:
                 st.error("Failed to save feedback")
                 return
                 
+            st.session_state['submitted_feedback_id'] = feedback_id
+            st.session_state.pop('submitted_analysis', None)
             st.success("Feedback submitted successfully!")
-            
-            # Show AI analysis results
-            st.subheader("AI Safety Analysis")
-            col1, col2 = st.columns(2)
-            
-            with col1:
-                st.metric("Your Priority Score", priority)
-                st.write("Safety Category:", ai_analysis['safety_category'])
-                
-            with col2:
-                st.metric("AI Priority Score", ai_analysis['priority_score'])
-                if ai_analysis['is_safety_concern']:
-                    st.warning("⚠️ Safety concerns detected!")
-            
-            st.write("AI Reasoning:", ai_analysis['reasoning'])
-            
-            if ai_analysis['key_concerns']:
-                st.write("Key Safety Concerns:")
-                for concern in ai_analysis['key_concerns']:
-                    st.write(f"• {concern}")
                     
         except Exception as e:
-            print(f"Detailed error in feedback submission: {str(e)}")
+            logger.exception("Feedback submission failed")
             st.error(f"Error submitting feedback: {str(e)}")
             return
+
+    if 'submitted_feedback_id' in st.session_state:
+        st.subheader("AI Safety Analysis")
+        if 'submitted_analysis' in st.session_state:
+            render_analysis(st.session_state['submitted_analysis'])
+        else:
+            poll_analysis(st.session_state['submitted_feedback_id'])
+
+
+@st.fragment(run_every=ANALYSIS_POLL_SECONDS)
+@RENDER_SECONDS.time(component='poll_analysis')
+def poll_analysis(feedback_id):
+    """Re-check the analysis status without rerunning the whole page."""
+    analysis = get_database().get_analysis(feedback_id)
+    if analysis and analysis['analysis_status'] != 'pending':
+        # Done: keep the result and leave the polling fragment behind
+        st.session_state['submitted_analysis'] = analysis
+        st.rerun()
+    st.info("⏳ AI safety analysis in progress. Results will appear here automatically.")
+
+
+def render_analysis(analysis):
+    if analysis['analysis_status'] == 'failed':
+        st.warning("AI analysis was unavailable; showing keyword-based scoring.")
+
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        st.metric("Your Priority Score", analysis['priority'])
+        st.write("Safety Category:", analysis['safety_category'])
+        
+    with col2:
+        st.metric("AI Priority Score", analysis['ai_priority'])
+        if analysis['safety_flag']:
+            st.warning("⚠️ Safety concerns detected!")
+    
+    st.write("AI Reasoning:", analysis['reasoning'])
+    
+    if analysis['key_concerns']:
+        st.write("Key Safety Concerns:")
+        for concern in analysis['key_concerns']:
+            st.write(f"• {concern}")
@@ -0,0 +1,157 @@
+import re
+import uuid
+import streamlit as st
+from utils.database import SNIPPET_START, SNIPPET_STOP
+from utils.votes import ensure_vote_flusher_started
+from components.resources import (
+    cached_count,
+    cached_feedback_page,
+    cached_search,
+    get_data_version
+)
+from utils.instrumentation import RENDER_SECONDS
+
+PAGE_SIZE_OPTIONS = [10, 25, 50, 100]
+
+
+def _voter_id():
+    # One vote per item per browser session
+    if 'voter_id' not in st.session_state:
+        st.session_state['voter_id'] = f"session:{uuid.uuid4()}"
+    return st.session_state['voter_id']
+
+
+def _upvote(db, feedback_id):
+    count, _ = db.upvote_feedback(feedback_id, voter_id=_voter_id())
+    st.session_state[f"upvotes_{feedback_id}"] = count
+    st.session_state[f"voted_{feedback_id}"] = True
+
+
+def _reset_pagination(state_key):
+    st.session_state[f"{state_key}_cursors"] = [None]
+    st.session_state[f"{state_key}_search_page"] = 0
+
+
+# Everything Streamlit markdown gives a meaning to, including :emoji: and $math$
+_MARKDOWN_SPECIAL = re.compile(r'([\\`*_{}\[\]()#+\-.!|~<>$:=])')
+
+
+def _escape_markdown(text):
+    """User text as literal markdown."""
+    return _MARKDOWN_SPECIAL.sub(r'\\\1', text)
+
+
+def _highlight(snippet):
+    """Markdown for a search snippet: escaped text with the matches in bold."""
+    parts = re.split(f'({SNIPPET_START}.*?{SNIPPET_STOP})', snippet, flags=re.S)
+    return ''.join(
+        f"**{_escape_markdown(part[1:-1])}**" if part.startswith(SNIPPET_START) else _escape_markdown(part)
+        for part in parts
+    )
+
+
+def _render_item(db, item, snippet=None):
+    with st.expander(f"{_escape_markdown(item['title'])} (Priority: {item['priority']})"):
+        if snippet:
+            st.markdown(f"…{_highlight(snippet)}…")
+        st.markdown(_escape_markdown(item['description']))
+        st.write(f"Tags: {', '.join(item['tags'] or [])}")
+        # The callback stores the count returned by the vote itself, so
+        # the label is current without refetching the list
+        upvotes = st.session_state.get(f"upvotes_{item['id']}", item['upvotes'])
+        voted = st.session_state.get(f"voted_{item['id']}", False)
+        st.button(
+            f"{'Upvoted' if voted else 'Upvote'} ({upvotes})", key=f"upvote_{item['id']}",
+            disabled=voted, on_click=_upvote, args=(db, item['id'])
+        )
+
+
+def _render_pager(state_key, has_previous, has_next, on_previous, on_next):
+    col1, col2 = st.columns(2)
+    with col1:
+        if has_previous and st.button("← Previous", key=f"{state_key}_prev"):
+            on_previous()
+            st.rerun(scope="fragment")
+    with col2:
+        if has_next and st.button("Next →", key=f"{state_key}_next"):
+            on_next()
+            st.rerun(scope="fragment")
+
+
+@st.fragment
+@RENDER_SECONDS.time(component='feedback_list')
+def render_feedback_list(db, feedback_filter, state_key="feedback_list"):
+    """Render the feedback expanders one server-side page at a time.
+
+    A non-empty search box switches to ranked full-text results, still
+    narrowed by the sidebar filters. Runs as a fragment, so votes, paging
+    and searching rerun only the list.
+    """
+    st.header("Feedback Items")
+    ensure_vote_flusher_started()
+    data_version = get_data_version(db)
+
+    query = st.text_input("Search feedback", key=f"{state_key}_query").strip()
+
+    # Restart from the first page whenever the filtered set changes
+    if st.session_state.get(f"{state_key}_filter") != (feedback_filter, query):
+        st.session_state[f"{state_key}_filter"] = (feedback_filter, query)
+        _reset_pagination(state_key)
+
+    page_size = st.selectbox(
+        "Items per page", PAGE_SIZE_OPTIONS, index=1,
+        key=f"{state_key}_page_size",
+        on_change=_reset_pagination, args=(state_key,)
+    )
+
+    if query:
+        _render_search_results(db, query, feedback_filter, page_size, state_key, data_version)
+        return
+
+    cursors = st.session_state[f"{state_key}_cursors"]
+    page_number = len(cursors)
+    items, next_cursor = cached_feedback_page(
+        db, feedback_filter, cursors[-1], page_size, data_version
+    )
+
+    if not items:
+        st.info("No feedback items match the current filters")
+        return
+
+    total = cached_count(db, feedback_filter, data_version)
+    first = (page_number - 1) * page_size + 1
+    st.caption(f"Showing {first}–{first + len(items) - 1} of {total}")
+
+    for item in items:
+        _render_item(db, item)
+
+    _render_pager(
+        state_key, page_number > 1, next_cursor is not None,
+        on_previous=cursors.pop, on_next=lambda: cursors.append(next_cursor)
+    )
+
+
+def _render_search_results(db, query, feedback_filter, page_size, state_key, data_version):
+    page_key = f"{state_key}_search_page"
+    page = st.session_state[page_key]
+    items, total = cached_search(
+        db, query, feedback_filter, page_size, page * page_size, data_version
+    )
+
+    if not items:
+        st.info("No feedback matches your search")
+        return
+
+    first = page * page_size + 1
+    st.caption(f"Showing {first}–{first + len(items) - 1} of {total} matches")
+
+    for item in items:
+        _render_item(db, item, snippet=item['snippet'])
+
+    def move(step):
+        st.session_state[page_key] = page + step
+
+    _render_pager(
+        state_key, page > 0, first + len(items) - 1 < total,
+        on_previous=lambda: move(-1), on_next=lambda: move(1)
+    )
@@ -1,58 +1,65 @@
+from datetime import date, timedelta
 import streamlit as st
-import pandas as pd
+from utils.database import FeedbackFilter
+from components.resources import cached_filter_options, get_data_version
 
-def apply_filters(feedback_data):
+# Sidebar time ranges in days, counting today; feedback is partitioned by
+# month, so list and search queries under a bounded range only scan the
+# months it covers (charts read the in-memory snapshot)
+TIME_RANGES = {
+    "All time": None,
+    "Last 7 days": 7,
+    "Last 30 days": 30,
+    "Last 90 days": 90,
+    "Last 12 months": 365,
+}
+
+def apply_filters(db):
+    """Render the sidebar filters and return the selected FeedbackFilter.
+
+    Filtering itself happens in SQL; only the option lists are queried here.
+    """
     st.sidebar.header("Filters")
-    
-    # Handle empty feedback data
-    if not feedback_data:
-        st.sidebar.warning("No feedback data available")
-        return []
-    
+
     try:
-        # Convert to DataFrame for easier filtering
-        df = pd.DataFrame(feedback_data)
-        
-        # Check for required columns
-        required_columns = ['priority', 'tags', 'safety_flag']
-        missing_columns = [col for col in required_columns if col not in df.columns]
-        
-        if missing_columns:
-            st.sidebar.error(f"Missing required columns: {', '.join(missing_columns)}")
-            return feedback_data
-        
-        # Priority filter with default values
-        unique_priorities = sorted(df['priority'].unique()) if not df.empty else [1, 2, 3, 4, 5]
-        priority_filter = st.sidebar.multiselect(
-            "Priority Level",
-            options=unique_priorities,
-            default=unique_priorities
-        )
-        
-        # Safety concerns filter
-        show_safety_only = st.sidebar.checkbox("Show Safety Concerns Only")
-        
-        # Tag filter
-        all_tags = set([tag for tags in df['tags'] for tag in tags]) if not df.empty else set()
-        selected_tags = st.sidebar.multiselect(
-            "Tags",
-            options=list(all_tags)
-        )
-        
-        # Apply filters
-        if not priority_filter:  # If no priorities selected, show all
-            priority_filter = unique_priorities
-            
-        mask = df['priority'].isin(priority_filter)
-        
-        if show_safety_only:
-            mask = mask & df['safety_flag']
-            
-        if selected_tags:
-            mask = mask & df['tags'].apply(lambda x: any(tag in x for tag in selected_tags))
-        
-        return df[mask].to_dict('records')
-        
+        options = cached_filter_options(db, get_data_version(db))
     except Exception as e:
-        st.sidebar.error(f"Error applying filters: {str(e)}")
-        return feedback_data  # Return original data if filtering fails
+        st.sidebar.error(f"Error loading filter options: {str(e)}")
+        return FeedbackFilter()
+
+    # Handle empty feedback data
+    if not options['priorities']:
+        st.sidebar.warning("No feedback data available")
+        return FeedbackFilter()
+
+    time_range = st.sidebar.selectbox("Time Range", options=list(TIME_RANGES))
+    days = TIME_RANGES[time_range]
+    created_from = date.today() - timedelta(days=days - 1) if days else None
+
+    # Priority filter with default values
+    unique_priorities = options['priorities']
+    priority_filter = st.sidebar.multiselect(
+        "Priority Level",
+        options=unique_priorities,
+        default=unique_priorities
+    )
+
+    # Safety concerns filter
+    show_safety_only = st.sidebar.checkbox("Show Safety Concerns Only")
+
+    # Tag filter
+    selected_tags = st.sidebar.multiselect(
+        "Tags",
+        options=options['tags']
+    )
+
+    # Selecting every priority (or none) is the same as no priority filter
+    if set(priority_filter) == set(unique_priorities):
+        priority_filter = []
+
+    return FeedbackFilter(
+        priorities=tuple(sorted(priority_filter)),
+        safety_only=show_safety_only,
+        tags=tuple(sorted(selected_tags)),
+        created_from=created_from
+    )
@@ -0,0 +1,59 @@
+import streamlit as st
+from components.resources import get_database
+from utils.cache import get_cache_stats
+from utils.instrumentation import REGISTRY
+
+
+def _histogram_rows(series):
+    rows = []
+    for entry in series:
+        value = entry['value']
+        rows.append({
+            **entry['labels'],
+            'count': value['count'],
+            'mean ms': round(value['mean'] * 1000, 1),
+            'p50 ms': round(value['p50'] * 1000, 1),
+            'p95 ms': round(value['p95'] * 1000, 1),
+            'p99 ms': round(value['p99'] * 1000, 1),
+            'max ms': round(value['max'] * 1000, 1),
+        })
+    return sorted(rows, key=lambda row: row['count'], reverse=True)
+
+
+def render_performance():
+    """Latency and throughput metrics recorded by this server process."""
+    st.header("Performance")
+    st.caption("Metrics are per server process and reset on restart. "
+               "Percentiles are estimated from histogram buckets.")
+    if st.button("Refresh"):
+        st.rerun()
+
+    snapshot = REGISTRY.snapshot()
+    histograms = {name: metric for name, metric in snapshot.items()
+                  if metric['type'] == 'histogram' and metric['series']}
+    counters = {name: metric for name, metric in snapshot.items()
+                if metric['type'] == 'counter' and metric['series']}
+
+    if not histograms and not counters:
+        st.info("No metrics recorded yet")
+
+    for name, metric in histograms.items():
+        st.subheader(metric['help'])
+        st.caption(name)
+        st.table(_histogram_rows(metric['series']))
+
+    if counters:
+        st.subheader("Counters")
+        st.table([
+            {'metric': name, **entry['labels'], 'value': entry['value']}
+            for name, metric in counters.items()
+            for entry in metric['series']
+        ])
+
+    st.subheader("Connection Pool")
+    st.json(get_database().get_pool_metrics())
+
+    cache_stats = get_cache_stats()
+    if cache_stats:
+        st.subheader("LLM Cache")
+        st.table([{'cache': name, **stats} for name, stats in cache_stats.items()])
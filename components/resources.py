@@ -0,0 +1,83 @@
+"""Shared Streamlit resources and cached queries.
+
+Long-lived objects are created once per server process with
+st.cache_resource. Query results are cached with st.cache_data, keyed by
+their arguments plus the feedback data version, so any write to feedback
+invalidates them, whichever process or replica made the write. The short
+TTL bounds staleness for the brief window in which a reader can see a new
+version before the writer's rows.
+
+Filtered aggregates and counts come from the in-memory columnar snapshot
+(utils.snapshot) unless ANALYTICS_SNAPSHOT=0; unfiltered aggregates read
+the rollup tables, which is cheaper still.
+"""
+import os
+import streamlit as st
+from utils.database import Database
+from utils.events import get_change_listener
+
+DATA_CACHE_TTL = 60
+USE_SNAPSHOT = os.environ.get('ANALYTICS_SNAPSHOT', '1') != '0'
+
+
+@st.cache_resource
+def get_database():
+    return Database()
+
+
+@st.cache_resource
+def get_summary_generator():
+    # Imported here so only the Executive Summary page loads it
+    from utils.summary import SummaryGenerator
+    return SummaryGenerator()
+
+
+def get_data_version(db):
+    # Kept current by LISTEN/NOTIFY, so writes on any replica invalidate
+    # this process's caches; queried while the listener is reconnecting
+    listener = get_change_listener()
+    version = listener.version if listener is not None else None
+    return version if version is not None else db.get_data_version()
+
+
+@st.cache_data(ttl=DATA_CACHE_TTL, show_spinner=False)
+def cached_aggregates(_db, feedback_filter, data_version):
+    if USE_SNAPSHOT and feedback_filter is not None and not feedback_filter.is_empty():
+        # Imported here so NumPy loads on first use, not at page import
+        from utils.snapshot import get_snapshot
+        return get_snapshot(_db).aggregates(feedback_filter)
+    return _db.get_aggregates(feedback_filter)
+
+
+@st.cache_data(ttl=DATA_CACHE_TTL, show_spinner=False)
+def cached_feedback_watermark(_db, data_version):
+    return _db.get_feedback_watermark()
+
+
+@st.cache_data(ttl=DATA_CACHE_TTL, show_spinner=False)
+def cached_filter_options(_db, data_version):
+    return _db.get_filter_options()
+
+
+@st.cache_data(ttl=DATA_CACHE_TTL, show_spinner=False)
+def cached_feedback_page(_db, feedback_filter, cursor, page_size, data_version):
+    rows, next_cursor = _db.get_feedback_page(
+        limit=page_size, cursor=cursor, feedback_filter=feedback_filter
+    )
+    return [dict(row) for row in rows], next_cursor
+
+
+@st.cache_data(ttl=DATA_CACHE_TTL, show_spinner=False)
+def cached_count(_db, feedback_filter, data_version):
+    if USE_SNAPSHOT and feedback_filter is not None and not feedback_filter.is_empty():
+        from utils.snapshot import get_snapshot
+        return get_snapshot(_db).count(feedback_filter)
+    return _db.count_feedback(feedback_filter)
+
+
+@st.cache_data(ttl=DATA_CACHE_TTL, show_spinner=False)
+def cached_search(_db, query, feedback_filter, page_size, offset, data_version):
+    rows, total = _db.search_feedback(
+        query, feedback_filter=feedback_filter, limit=page_size, offset=offset
+    )
+    return [dict(row) for row in rows], total
@@ -1,27 +1,32 @@
 import streamlit as st
 from datetime import datetime
-from utils.summary import SummaryGenerator
-from utils.database import Database
+from components.resources import (
+    cached_aggregates,
+    cached_feedback_watermark,
+    get_data_version,
+    get_database,
+    get_summary_generator,
+)
 
 def render_summary_dashboard():
     st.header("Executive Summary Dashboard")
     
     try:
         # Initialize components
-        db = Database()
-        summary_gen = SummaryGenerator()
+        db = get_database()
+        summary_gen = get_summary_generator()
         
-        # Get feedback data
-        feedback_data = db.get_all_feedback()
+        # Metrics come from one cached aggregate query, re-run only when the
+        # data version changes; the AI summary is reused until the feedback
+        # set changes
+        data_version = get_data_version(db)
+        aggregates = cached_aggregates(db, None, data_version)
+        watermark = cached_feedback_watermark(db, data_version)
+        summary = summary_gen.get_cached_summary(aggregates, watermark)
         
-        # Generate summary
-        summary = summary_gen.generate_executive_summary(feedback_data)
-        
-        # Display generation time
-        st.caption(f"Last updated: {datetime.fromisoformat(summary['generated_at']).strftime('%Y-%m-%d %H:%M:%S')}")
-        
-        # Display metrics
-        metrics = summary['metrics']
+        # Metrics need no model call, so they show while a summary generates
+        caption = st.empty()
+        metrics = summary_gen.generate_metrics_summary(aggregates)
         col1, col2, col3, col4 = st.columns(4)
         
         with col1:
@@ -32,10 +37,39 @@ def render_summary_dashboard():
             st.metric("High Priority Items", metrics['high_priority'])
         with col4:
             st.metric("Safety Concerns", metrics['safety_concerns'])
+        
+        streamed = None
+        if summary is None:
+            # Map: summarize each time window (cached ones are reused)
+            progress = st.progress(0.0, text="Summarizing feedback by period...")
+            def report(done, total):
+                progress.progress(done / total if total else 1.0,
+                                  text=f"Summarizing feedback by period ({done}/{total})...")
+            partials = summary_gen.summarize_partitions(db, progress=report)
+            progress.empty()
             
-        # Display executive summary
-        st.subheader("Executive Summary")
-        st.write(summary['executive_summary'])
+            # Reduce: stream the executive summary as it is written
+            st.subheader("Executive Summary")
+            streamed = st.empty()
+            stream = summary_gen.stream_executive_summary(aggregates, partials, watermark)
+            with streamed.container():
+                st.write_stream(stream)
+            summary = stream.result
+            if 'error' in summary:
+                streamed.empty()
+                st.error(summary['error'])
+                return
+        
+        # Display generation time
+        caption.caption(f"Last updated: {datetime.fromisoformat(summary['generated_at']).strftime('%Y-%m-%d %H:%M:%S')}")
+        
+        # Display executive summary; a streamed one is re-rendered from
+        # the validated result
+        if streamed is None:
+            st.subheader("Executive Summary")
+            st.write(summary['executive_summary'])
+        else:
+            streamed.write(summary['executive_summary'])
         
         # Display recommendations and risk assessment
         col1, col2 = st.columns(2)
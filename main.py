@@ -1,9 +1,10 @@
+import logging
 import streamlit as st
-from utils.database import Database
-from components.dashboard import render_dashboard
-from components.feedback_form import render_feedback_form
-from components.filters import apply_filters
-from components.summary_dashboard import render_summary_dashboard
+from components.resources import get_database
+from utils.events import ensure_change_listener_started
+from utils.instrumentation import RENDER_SECONDS, configure_logging, ensure_exporters_started
+
+logger = logging.getLogger(__name__)
 
 st.set_page_config(
     page_title="OpenAI Feedback System",
@@ -12,45 +13,55 @@ st.set_page_config(
 )
 
 def main():
+    configure_logging()
+    ensure_exporters_started()
     st.title("OpenAI Internal Feedback System")
     
     try:
-        # Initialize database connection
-        db = Database()
+        # Process-wide database handle (shared connection pool)
+        db = get_database()
+        # Started after the schema is current; tracks writes from every replica
+        ensure_change_listener_started()
         
         # Sidebar navigation
-        page = st.sidebar.radio("Navigation", ["Dashboard", "Executive Summary", "Submit Feedback"])
-        
-        # Get all feedback data
-        feedback_data = db.get_all_feedback()
-        
-        # Apply filters
-        filtered_feedback = apply_filters(feedback_data)
+        page = st.sidebar.radio("Navigation", ["Dashboard", "Executive Summary", "Submit Feedback", "Performance"])
         
-        if page == "Dashboard":
-            render_dashboard(filtered_feedback)
-            
-            # Display filtered feedback items
-            st.header("Feedback Items")
-            for item in filtered_feedback:
-                with st.expander(f"{item['title']} (Priority: {item['priority']})"):
-                    st.write(item['description'])
-                    st.write(f"Tags: {', '.join(item['tags'])}")
-                    if st.button(f"Upvote ({item['upvotes']})", key=f"upvote_{item['id']}"):
-                        db.upvote_feedback(item['id'])
-                        st.rerun()
-                        
-        elif page == "Executive Summary":
-            render_summary_dashboard()
-            
-        else:
-            render_feedback_form()
+        with RENDER_SECONDS.time(component=f"page:{page}"):
+            render_page(db, page)
             
     except Exception as e:
         st.error("Application Error")
         st.error(str(e))
-        print(f"Detailed error: {str(e)}")
+        logger.exception("Application error")
         st.stop()
 
+def render_page(db, page):
+    # Page modules are imported on demand so each page only loads its
+    # own dependencies (plotly for the dashboard, numpy for the form, ...)
+    if page == "Dashboard":
+        from components.dashboard import render_dashboard
+        from components.filters import apply_filters
+        from components.feedback_list import render_feedback_list
+        
+        # Build the filter spec; it is evaluated in SQL by each query
+        feedback_filter = apply_filters(db)
+        
+        # Metrics/charts and the item list are separate fragments, so an
+        # upvote or page change reruns only the list
+        render_dashboard(db, feedback_filter)
+        render_feedback_list(db, feedback_filter)
+                    
+    elif page == "Executive Summary":
+        from components.summary_dashboard import render_summary_dashboard
+        render_summary_dashboard()
+        
+    elif page == "Performance":
+        from components.performance import render_performance
+        render_performance()
+        
+    else:
+        from components.feedback_form import render_feedback_form
+        render_feedback_form()
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,65 @@
+import logging
+from contextlib import contextmanager
+
+from utils.database import Database
+
+
+class _Cursor:
+    def __init__(self, created):
+        self.created = created
+        self.queries = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, params=None):
+        self.queries.append((query, params))
+
+    def fetchone(self):
+        return (self.created,)
+
+
+class _Connection:
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self.committed = False
+
+    def cursor(self, **kwargs):
+        return self._cursor
+
+    def commit(self):
+        self.committed = True
+
+
+def _database(created):
+    """A Database whose connections return ``created`` from
+    feedback_ensure_partitions, without a server or migrations."""
+    cursor = _Cursor(created)
+    conn = _Connection(cursor)
+    db = Database.__new__(Database)
+
+    @contextmanager
+    def connection(query_class='write'):
+        yield conn
+    db._get_connection = connection
+    return db, cursor, conn
+
+
+def test_ensure_partitions_logs_at_info(caplog):
+    db, cursor, conn = _database(created=2)
+    with caplog.at_level(logging.INFO, logger='utils.database'):
+        assert db.ensure_partitions(3) == 2
+    assert cursor.queries == [("SELECT feedback_ensure_partitions(%s)", (3,))]
+    assert conn.committed
+    [record] = [r for r in caplog.records if r.getMessage() == "Created feedback partitions"]
+    assert record.partitions_created == 2
+
+
+def test_ensure_partitions_quiet_when_nothing_created(caplog):
+    db, _, _ = _database(created=0)
+    with caplog.at_level(logging.INFO, logger='utils.database'):
+        assert db.ensure_partitions() == 0
+    assert not caplog.records
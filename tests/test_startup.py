@@ -0,0 +1,13 @@
+import json
+
+from benchmarks import startup
+
+
+def test_pages_load_no_forbidden_packages(capsys):
+    """``python -m benchmarks.startup --check`` against startup_budget.json:
+    no page may import a package its budget forbids."""
+    status = startup.main(['--check', '--json'])
+    report = json.loads(capsys.readouterr().out)
+    assert report['failures'] == []
+    assert status == 0
+    assert set(report['results']) == set(startup.PAGES)
@@ -0,0 +1,102 @@
+from datetime import date
+from typing import Dict, Any
+from psycopg2 import sql
+
+MAX_PRIORITY = 5
+HIGH_PRIORITY_THRESHOLD = 4
+# "Recent" means today plus the previous RECENT_WINDOW_DAYS - 1 calendar
+# days, so the live query and the per-day rollups agree exactly.
+RECENT_WINDOW_DAYS = 7
+
+# Every dashboard number and chart series in one pass over the filtered rows.
+# "filtered" is referenced several times, so Postgres materializes it once.
+_AGGREGATES_QUERY = """
+    WITH filtered AS (
+        SELECT priority, tags, safety_flag, created_at FROM feedback{where}
+    ),
+    daily AS (
+        SELECT created_at::date AS day, count(*) AS n FROM filtered GROUP BY 1
+    ),
+    priorities AS (
+        SELECT priority, count(*) AS n FROM filtered GROUP BY 1
+    ),
+    tag_counts AS (
+        SELECT tag, count(*) AS n FROM filtered, unnest(tags) AS tag GROUP BY 1
+    )
+    SELECT
+        count(*) AS total_feedback,
+        count(*) FILTER (WHERE created_at >= CURRENT_DATE - {recent_offset}) AS recent_feedback,
+        count(*) FILTER (WHERE priority >= {high_priority}) AS high_priority,
+        count(*) FILTER (WHERE safety_flag) AS safety_concerns,
+        coalesce(round(avg(priority)::numeric, 2), 0) AS avg_priority,
+        (SELECT coalesce(json_agg(json_build_array(day, n) ORDER BY day), '[]') FROM daily)
+            AS daily_counts,
+        (SELECT coalesce(json_agg(json_build_array(priority, n) ORDER BY priority), '[]') FROM priorities)
+            AS priority_counts,
+        (SELECT coalesce(json_agg(json_build_array(tag, n) ORDER BY n DESC, tag), '[]') FROM tag_counts)
+            AS tag_counts
+    FROM filtered
+"""
+
+
+def build_aggregates_query(where: sql.Composable) -> sql.Composed:
+    """Compose the aggregation query around a rendered WHERE clause."""
+    return sql.SQL(_AGGREGATES_QUERY).format(
+        where=where,
+        recent_offset=sql.Literal(RECENT_WINDOW_DAYS - 1),
+        high_priority=sql.Literal(HIGH_PRIORITY_THRESHOLD)
+    )
+
+
+# The same result shape read from the rollup tables maintained by the
+# feedback_rollup trigger: O(days + priorities + tags) rows, no feedback scan.
+_ROLLUP_QUERY = """
+    WITH daily AS (
+        SELECT day, feedback_count, high_priority_count, safety_count, priority_sum
+        FROM feedback_daily_stats WHERE feedback_count > 0
+    )
+    SELECT
+        coalesce(sum(feedback_count), 0)::bigint AS total_feedback,
+        coalesce(sum(feedback_count) FILTER (WHERE day >= CURRENT_DATE - {recent_offset}), 0)::bigint
+            AS recent_feedback,
+        coalesce(sum(high_priority_count), 0)::bigint AS high_priority,
+        coalesce(sum(safety_count), 0)::bigint AS safety_concerns,
+        coalesce(round(sum(priority_sum)::numeric / nullif(sum(feedback_count), 0), 2), 0) AS avg_priority,
+        (SELECT coalesce(json_agg(json_build_array(day, feedback_count) ORDER BY day), '[]') FROM daily)
+            AS daily_counts,
+        (SELECT coalesce(json_agg(json_build_array(priority, feedback_count) ORDER BY priority), '[]')
+            FROM feedback_priority_stats WHERE feedback_count > 0) AS priority_counts,
+        (SELECT coalesce(json_agg(json_build_array(tag, feedback_count) ORDER BY feedback_count DESC, tag), '[]')
+            FROM feedback_tag_stats WHERE feedback_count > 0) AS tag_counts
+    FROM daily
+"""
+
+
+def build_rollup_query() -> sql.Composed:
+    """Compose the rollup-table read used when no filter is active."""
+    return sql.SQL(_ROLLUP_QUERY).format(recent_offset=sql.Literal(RECENT_WINDOW_DAYS - 1))
+
+
+def parse_aggregates_row(row) -> Dict[str, Any]:
+    """Convert the raw aggregation row into plain Python structures.
+
+    ``daily_counts`` is a list of ``(date, count)`` in date order,
+    ``priority_counts`` maps priority to count in priority order and
+    ``tag_counts`` maps tag to count, most frequent first.
+    """
+    (total, recent, high_priority, safety_concerns, avg_priority,
+     daily, priorities, tags) = row
+    return {
+        'total_feedback': total,
+        'recent_feedback': recent,
+        'high_priority': high_priority,
+        'safety_concerns': safety_concerns,
+        'avg_priority': float(avg_priority),
+        'daily_counts': [(date.fromisoformat(day), count) for day, count in daily],
+        'priority_counts': {priority: count for priority, count in priorities},
+        'tag_counts': {tag: count for tag, count in tags}
+    }
+
+
+def top_tags(aggregates: Dict[str, Any], limit: int = 5) -> Dict[str, int]:
+    return dict(list(aggregates['tag_counts'].items())[:limit])
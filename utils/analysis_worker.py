@@ -0,0 +1,146 @@
+"""Background worker that runs queued AI safety analyses.
+
+Jobs live in the analysis_jobs table, so they survive restarts and can be
+shared by several worker processes. Start a standalone worker with
+
+    python -m utils.analysis_worker
+"""
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from utils.database import Database
+from utils.nlp import SafetyAnalyzer
+from utils.instrumentation import configure_logging, histogram
+from utils.llm import LLM_RETRIES
+
+logger = logging.getLogger(__name__)
+
+ANALYSIS_JOB_SECONDS = histogram('analysis_job_seconds', 'Time to process one analysis job', ('outcome',))
+
+
+class AnalysisWorker:
+    """Claims due jobs and analyzes them with bounded concurrency.
+
+    Failed analyses are retried with exponential backoff; after
+    ``max_attempts`` the keyword-based fallback analysis is stored and the
+    feedback is marked ``failed``.
+    """
+
+    def __init__(self, db=None, max_workers: int = 4, max_attempts: int = 5,
+                 poll_interval: float = 2.0, base_backoff: float = 5.0,
+                 max_backoff: float = 300.0, lease_seconds: int = 300):
+        self.db = db or Database()
+        self.analyzer = SafetyAnalyzer()
+        self.max_workers = max_workers
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.lease_seconds = lease_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="analysis")
+        self._slots = threading.BoundedSemaphore(max_workers)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self.run, name="analysis-dispatcher", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._executor.shutdown(wait=True)
+
+    def run(self):
+        """Dispatch loop: claim as many jobs as there are free slots."""
+        while not self._stop.is_set():
+            free = self._acquire_free_slots()
+            jobs = []
+            try:
+                jobs = self.db.claim_analysis_jobs(free, lease_seconds=self.lease_seconds)
+            except Exception:
+                logger.exception("Error claiming analysis jobs")
+            for _ in range(free - len(jobs)):
+                self._slots.release()
+            for job in jobs:
+                self._executor.submit(self._process, job)
+            if not jobs:
+                self._stop.wait(self.poll_interval)
+
+    def _acquire_free_slots(self) -> int:
+        # Block for one slot, then take any others that are free right now
+        self._slots.acquire()
+        free = 1
+        while free < self.max_workers and self._slots.acquire(blocking=False):
+            free += 1
+        return free
+
+    def _backoff(self, attempts: int) -> float:
+        delay = min(self.max_backoff, self.base_backoff * 2 ** (attempts - 1))
+        return delay * random.uniform(0.5, 1.0)
+
+    def _process(self, job):
+        started = time.perf_counter()
+        outcome = 'complete'
+        try:
+            analysis = self.analyzer.get_ai_safety_score(
+                job['title'], job['description'], fallback=False
+            )
+            self.db.complete_analysis_job(job['id'], job['feedback_id'], analysis)
+        except Exception as e:
+            try:
+                if job['attempts'] >= self.max_attempts:
+                    outcome = 'failed'
+                    logger.error("Analysis job failed permanently: %s", e,
+                                 extra={'job_id': job['id'], 'attempts': job['attempts']})
+                    fallback = self.analyzer.get_fallback_analysis(job['description'])
+                    self.db.complete_analysis_job(job['id'], job['feedback_id'], fallback, failed=True)
+                else:
+                    outcome = 'retry'
+                    LLM_RETRIES.inc(operation='safety_analysis')
+                    self.db.retry_analysis_job(job['id'], str(e), self._backoff(job['attempts']))
+            except Exception:
+                # The job stays "running" and is reclaimed once its lease expires
+                outcome = 'error'
+                logger.exception("Error recording analysis job result", extra={'job_id': job['id']})
+        finally:
+            ANALYSIS_JOB_SECONDS.observe(time.perf_counter() - started, outcome=outcome)
+            self._slots.release()
+
+
+_worker: Optional[AnalysisWorker] = None
+_worker_lock = threading.Lock()
+
+
+def ensure_worker_started() -> Optional[AnalysisWorker]:
+    """Start the in-process worker once, unless ANALYSIS_INLINE_WORKER=0.
+
+    Deployments that run dedicated ``python -m utils.analysis_worker``
+    processes can disable the in-app worker.
+    """
+    global _worker
+    if os.environ.get('ANALYSIS_INLINE_WORKER', '1') == '0':
+        return None
+    if _worker is None:
+        with _worker_lock:
+            if _worker is None:
+                _worker = AnalysisWorker(max_workers=int(os.environ.get('ANALYSIS_WORKERS', 4)))
+                _worker.start()
+    return _worker
+
+
+if __name__ == "__main__":
+    configure_logging()
+    worker = AnalysisWorker(max_workers=int(os.environ.get('ANALYSIS_WORKERS', 4)))
+    print(f"Analysis worker running with {worker.max_workers} slots")
+    worker.start()
+    try:
+        while True:
+            time.sleep(60)
+    except KeyboardInterrupt:
+        worker.stop()
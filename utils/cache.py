@@ -0,0 +1,223 @@
+"""Content-addressed cache for LLM results.
+
+Keys are a SHA-256 of (namespace, model, prompt template version, normalized
+input), so identical requests hit regardless of which process made them.
+Each named cache has an in-process LRU tier with TTL and, unless
+LLM_CACHE_SHARED=0, a Postgres tier (the llm_cache table) shared by every
+replica.
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+import psycopg2
+from psycopg2.extras import Json
+
+from utils.instrumentation import counter
+
+logger = logging.getLogger(__name__)
+
+CACHE_EVENTS = counter('llm_cache_events_total', 'LLM cache lookups and writes', ('cache', 'event'))
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_text(text: str) -> str:
+    """Canonical form used for hashing: NFC, collapsed whitespace, stripped."""
+    return _WHITESPACE.sub(' ', unicodedata.normalize('NFC', text or '')).strip()
+
+
+def make_key(namespace: str, model: str, template_version: str, payload: Any) -> str:
+    """Hash a request into a cache key; string leaves of ``payload`` are normalized."""
+    def normalize(value):
+        if isinstance(value, str):
+            return normalize_text(value)
+        if isinstance(value, dict):
+            return {k: normalize(v) for k, v in value.items()}
+        if isinstance(value, (list, tuple)):
+            return [normalize(v) for v in value]
+        return value
+
+    material = json.dumps(
+        [namespace, model, template_version, normalize(payload)],
+        sort_keys=True, default=str, separators=(',', ':')
+    )
+    return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+
+class LRUCache:
+    """Thread-safe in-process LRU cache whose entries expire after ``ttl`` seconds."""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 3600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class PostgresCache:
+    """Shared cache tier stored in the llm_cache table.
+
+    Database errors are reported and treated as misses so a cache outage
+    never fails the request that consulted it.
+    """
+
+    def __init__(self, ttl: float = 86400):
+        self.ttl = ttl
+        self._pool = None
+
+    def _get_pool(self):
+        if self._pool is None:
+            from utils.pool import get_pool
+            from utils.migrations import ensure_schema
+            pool = get_pool()
+            ensure_schema(pool)
+            self._pool = pool
+        return self._pool
+
+    def get(self, key: str) -> Optional[Any]:
+        try:
+            with self._get_pool().connection() as conn:
+                with conn.cursor() as cur:
+                    cur.execute(
+                        "SELECT value FROM llm_cache WHERE key = %s AND expires_at > LOCALTIMESTAMP",
+                        (key,)
+                    )
+                    row = cur.fetchone()
+                return row[0] if row else None
+        except psycopg2.Error as e:
+            logger.warning("Shared cache read failed: %s", e)
+            return None
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        try:
+            with self._get_pool().connection() as conn:
+                with conn.cursor() as cur:
+                    cur.execute(
+                        """
+                        INSERT INTO llm_cache (key, value, expires_at)
+                        VALUES (%s, %s, LOCALTIMESTAMP + make_interval(secs => %s))
+                        ON CONFLICT (key) DO UPDATE
+                        SET value = EXCLUDED.value, expires_at = EXCLUDED.expires_at
+                        """,
+                        (key, Json(value), self.ttl if ttl is None else ttl)
+                    )
+                    # Opportunistically trim a few expired entries
+                    cur.execute(
+                        """
+                        DELETE FROM llm_cache WHERE key IN (
+                            SELECT key FROM llm_cache WHERE expires_at < LOCALTIMESTAMP LIMIT 100
+                        )
+                        """
+                    )
+                conn.commit()
+        except psycopg2.Error as e:
+            logger.warning("Shared cache write failed: %s", e)
+
+
+class TieredCache:
+    """Local LRU tier in front of an optional shared Postgres tier."""
+
+    def __init__(self, name: str, maxsize: int = 1024, ttl: float = 3600, shared: bool = True):
+        self.name = name
+        self.ttl = ttl
+        self.local = LRUCache(maxsize=maxsize, ttl=ttl)
+        self.shared = PostgresCache(ttl=ttl) if shared else None
+        self._lock = threading.Lock()
+        self._stats = {'local_hits': 0, 'shared_hits': 0, 'misses': 0, 'writes': 0}
+
+    def _count(self, stat: str):
+        with self._lock:
+            self._stats[stat] += 1
+        CACHE_EVENTS.inc(cache=self.name, event=stat)
+
+    def get(self, key: str) -> Optional[Any]:
+        value = self.local.get(key)
+        if value is not None:
+            self._count('local_hits')
+            return value
+        if self.shared is not None:
+            value = self.shared.get(key)
+            if value is not None:
+                self._count('shared_hits')
+                self.local.set(key, value)
+                return value
+        self._count('misses')
+        return None
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        self._count('writes')
+        self.local.set(key, value, ttl)
+        if self.shared is not None:
+            self.shared.set(key, value, ttl)
+
+    def clear_local(self):
+        self.local.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats['local_hits'] + stats['shared_hits'] + stats['misses']
+        stats['hit_rate'] = (lookups - stats['misses']) / lookups if lookups else 0.0
+        stats['local_size'] = len(self.local)
+        return stats
+
+
+_caches: Dict[str, TieredCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_cache(name: str, ttl: Optional[float] = None) -> TieredCache:
+    """Return the process-wide cache called ``name``, creating it on first use.
+
+    Defaults come from LLM_CACHE_SIZE, LLM_CACHE_TTL and LLM_CACHE_SHARED.
+    """
+    if name not in _caches:
+        with _caches_lock:
+            if name not in _caches:
+                _caches[name] = TieredCache(
+                    name,
+                    maxsize=int(os.environ.get('LLM_CACHE_SIZE', 1024)),
+                    ttl=ttl if ttl is not None else float(os.environ.get('LLM_CACHE_TTL', 86400)),
+                    shared=os.environ.get('LLM_CACHE_SHARED', '1') != '0'
+                )
+    return _caches[name]
+
+
+def get_cache_stats() -> Dict[str, Dict[str, Any]]:
+    """Hit/miss counters for every cache created in this process."""
+    return {name: cache.stats() for name, cache in list(_caches.items())}
@@ -1,78 +1,250 @@
+import functools
+import hashlib
+import logging
 import os
-import psycopg2
-from psycopg2.extras import RealDictCursor
-from datetime import datetime
+import re
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Optional, Tuple
+from psycopg2 import sql
+from psycopg2.extras import RealDictCursor, execute_values
+from datetime import date, datetime
+from utils.pool import get_pool, get_replica_pool
+from utils.replica import ReplicaRouter
+from utils.migrations import ensure_schema
+from utils.aggregation import build_aggregates_query, build_rollup_query, parse_aggregates_row
+from utils.instrumentation import counter, histogram
+from utils.events import VERSION_QUERY
+
+logger = logging.getLogger(__name__)
+
+DB_QUERY_SECONDS = histogram(
+    'db_query_seconds', 'Database method latency, including pool checkout', ('query',)
+)
+DB_QUERY_ERRORS = counter('db_query_errors_total', 'Database methods that raised', ('query',))
+
+FEEDBACK_COLUMNS = (
+    'id', 'title', 'description', 'priority', 'ai_priority', 'safety_category',
+    'reasoning', 'key_concerns', 'tags', 'safety_flag', 'created_at', 'upvotes',
+    'analysis_status'
+)
+
+# Tags users can attach to feedback
+FEEDBACK_TAGS = ('safety', 'alignment', 'performance', 'ethics', 'technical')
+
+# Projection for list views: everything except the long AI analysis text
+LIST_COLUMNS = (
+    'id', 'title', 'description', 'priority', 'tags', 'safety_flag',
+    'created_at', 'upvotes'
+)
+
+# Projection for filters, metrics and charts: no free-text columns at all
+ANALYTICS_COLUMNS = ('id', 'priority', 'ai_priority', 'tags', 'safety_flag', 'created_at', 'upvotes')
+
+# statement_timeout per query class in milliseconds (0 = none); override
+# with STATEMENT_TIMEOUT_<CLASS>, e.g. STATEMENT_TIMEOUT_ANALYTICS=60000
+STATEMENT_TIMEOUTS = {
+    query_class: int(os.environ.get(f'STATEMENT_TIMEOUT_{query_class.upper()}', default))
+    for query_class, default in (
+        ('interactive', 5000),   # lookups a page render waits on
+        ('analytics', 30000),    # aggregates, search, summaries, snapshot loads
+        ('write', 10000),
+        ('maintenance', 0),      # imports, backfills, rollup rebuilds
+    )
+}
+
+# Monthly feedback partitions kept ahead of the current month (see
+# utils.partitions); created at most once per process on startup
+PARTITION_MONTHS_AHEAD = int(os.environ.get('PARTITION_MONTHS_AHEAD', 3))
+PARTITION_NAME_PATTERN = re.compile(r'^feedback_y\d{4}m\d{2}$')
+
+# Control characters marking search matches in snippets (see search_feedback)
+SNIPPET_START, SNIPPET_STOP = '\x02', '\x03'
+
+# Server-side prepared statements; disable behind a transaction-pooling
+# proxy such as PgBouncer, where sessions are not kept per client
+PREPARED_STATEMENTS = os.environ.get('PG_PREPARED_STATEMENTS', '1') != '0'
+
+
+def _projection(columns, table=None):
+    columns = FEEDBACK_COLUMNS if columns is None else columns
+    unknown = [col for col in columns if col not in FEEDBACK_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown feedback columns: {', '.join(unknown)}")
+    qualifier = (table,) if table else ()
+    return sql.SQL(', ').join(sql.Identifier(*qualifier, col) for col in columns)
+
+
+@dataclass(frozen=True)
+class FeedbackFilter:
+    """Declarative feedback filter that Database renders into a WHERE clause.
+
+    Empty ``priorities`` or ``tags`` mean "no constraint"; ``tags`` matches
+    rows carrying any of the given tags. ``unanalyzed_only`` keeps rows
+    without an AI priority. ``created_from``/``created_before`` bound the
+    creation date (inclusive/exclusive).
+    """
+    priorities: Tuple[int, ...] = ()
+    safety_only: bool = False
+    tags: Tuple[str, ...] = ()
+    unanalyzed_only: bool = False
+    created_from: Optional[date] = None
+    created_before: Optional[date] = None
+
+    def is_empty(self):
+        return not (self.priorities or self.safety_only or self.tags or self.unanalyzed_only
+                    or self.created_from or self.created_before)
+
+    def to_sql(self):
+        """Return ``(conditions, params)`` for the active constraints."""
+        conditions = []
+        params = []
+        if self.priorities:
+            conditions.append(sql.SQL("priority = ANY(%s)"))
+            params.append(list(self.priorities))
+        if self.safety_only:
+            conditions.append(sql.SQL("safety_flag"))
+        if self.tags:
+            conditions.append(sql.SQL("tags && %s::text[]"))
+            params.append(list(self.tags))
+        if self.unanalyzed_only:
+            conditions.append(sql.SQL("ai_priority IS NULL"))
+        if self.created_from:
+            conditions.append(sql.SQL("created_at >= %s"))
+            params.append(self.created_from)
+        if self.created_before:
+            conditions.append(sql.SQL("created_at < %s"))
+            params.append(self.created_before)
+        return conditions, params
+
+
+def _where(conditions):
+    if not conditions:
+        return sql.SQL("")
+    return sql.SQL(" WHERE ") + sql.SQL(" AND ").join(conditions)
+
+
+@functools.lru_cache(maxsize=512)
+def _prepared_form(text):
+    """``(name, body, parameter count)`` for a query with %s placeholders."""
+    count = 0
+
+    def placeholder(match):
+        nonlocal count
+        if match.group(1) == '%':
+            return '%'
+        count += 1
+        return f'${count}'
+
+    body = re.sub(r'%([s%])', placeholder, text)
+    return 'q_' + hashlib.sha1(text.encode('utf-8')).hexdigest()[:16], body, count
+
+
+def _execute(cur, query, params=()):
+    """Run ``query`` as a prepared statement, preparing it once per session.
+
+    Saves the parse and plan of hot queries; each distinct query text
+    (e.g. each filter shape) is its own statement.
+    """
+    if not PREPARED_STATEMENTS:
+        cur.execute(query, params)
+        return
+    conn = cur.connection
+    text = query.as_string(conn) if isinstance(query, sql.Composable) else query
+    name, body, count = _prepared_form(text)
+    if name not in conn.prepared:
+        cur.execute(f"PREPARE {name} AS {body}")
+        conn.prepared.add(name)
+    if count:
+        cur.execute(f"EXECUTE {name} ({', '.join(['%s'] * count)})", params)
+    else:
+        cur.execute(f"EXECUTE {name}")
+
+
+def _writes(method):
+    """After ``method`` commits, make this process read from the primary
+    until the replica has replayed the write (read-your-writes)."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        result = method(self, *args, **kwargs)
+        self.router.note_write()
+        return result
+    return wrapper
+
+
+def _instrumented(method):
+    """Record the latency and failures of a Database method under its name."""
+    name = method.__name__
+
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        except Exception:
+            DB_QUERY_ERRORS.inc(query=name)
+            raise
+        finally:
+            DB_QUERY_SECONDS.observe(time.perf_counter() - started, query=name)
+    return wrapper
+
+
+_partitions_ready = False
+
 
 class Database:
     def __init__(self):
+        global _partitions_ready
         try:
-            print("Attempting database connection...")
-            # Store connection params for reuse
-            self.db_params = {
-                'host': os.environ['PGHOST'],
-                'database': os.environ['PGDATABASE'],
-                'user': os.environ['PGUSER'],
-                'password': os.environ['PGPASSWORD'],
-                'port': os.environ['PGPORT']
-            }
-            # Test connection
-            self._get_connection()
-            print("Database connection successful")
-            self._drop_tables()
-            print("Tables dropped successfully")
-            self._create_tables()
-            print("Tables created successfully")
-        except Exception as e:
-            print(f"Database initialization error: {str(e)}")
-            raise e
-
-    def _get_connection(self):
-        return psycopg2.connect(**self.db_params)
-
-    def _drop_tables(self):
-        with self._get_connection() as conn:
-            with conn.cursor() as cur:
-                # Drop existing sequence if exists
-                cur.execute("DROP SEQUENCE IF EXISTS feedback_id_seq CASCADE")
-                # Drop table if exists
-                cur.execute("DROP TABLE IF EXISTS feedback CASCADE")
-                conn.commit()
+            # Connections are borrowed from the process-wide pool
+            self.pool = get_pool()
+            # Read-only queries may go to PGREPLICA_DSN (see utils.replica)
+            self.router = ReplicaRouter(self.pool, get_replica_pool())
+            applied = ensure_schema(self.pool)
+            if applied:
+                logger.info("Applied schema migrations", extra={'versions': applied})
+            if not _partitions_ready:
+                self.ensure_partitions()
+                _partitions_ready = True
+        except Exception:
+            logger.exception("Database initialization failed")
+            raise
 
-    def _create_tables(self):
-        with self._get_connection() as conn:
-            with conn.cursor() as cur:
-                # Create feedback table with additional AI analysis columns
-                cur.execute("""
-                    CREATE TABLE IF NOT EXISTS feedback (
-                        id SERIAL PRIMARY KEY,
-                        title TEXT NOT NULL,
-                        description TEXT NOT NULL,
-                        priority INTEGER NOT NULL,
-                        ai_priority INTEGER,
-                        safety_category TEXT,
-                        reasoning TEXT,
-                        key_concerns TEXT[],
-                        tags TEXT[],
-                        safety_flag BOOLEAN DEFAULT FALSE,
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        upvotes INTEGER DEFAULT 0
-                    )
-                """)
-                conn.commit()
+    def _get_connection(self, query_class='write'):
+        """A primary connection with ``query_class``'s statement timeout."""
+        return self.pool.connection(statement_timeout=STATEMENT_TIMEOUTS[query_class])
 
-    def add_feedback(self, title, description, priority, tags, ai_analysis=None):
+    def _read_connection(self, query_class):
+        """A connection for read-only queries: the replica when it is fresh enough."""
+        return self.router.pool_for_read().connection(statement_timeout=STATEMENT_TIMEOUTS[query_class])
+
+    def get_pool_metrics(self):
+        return self.pool.get_metrics()
+
+    @_instrumented
+    @_writes
+    def add_feedback(self, title, description, priority, tags, ai_analysis=None, queue_analysis=False):
+        """Insert a feedback row and return its id.
+
+        With ``queue_analysis`` the row is stored as "analysis pending" and an
+        analysis job is enqueued in the same transaction for the background
+        worker (see utils.analysis_worker).
+        """
+        # numpy is only needed on the write path, so import it here
+        from utils.dedup import minhash_signature, signature_to_bytes
+        minhash = signature_to_bytes(minhash_signature(title, description))
         try:
-            conn = self._get_connection()
-            with conn.cursor() as cur:
-                print(f"Adding feedback with title: {title}")
+            with self._get_connection('write') as conn, conn.cursor() as cur:
                 if ai_analysis:
                     cur.execute(
                         """
                         INSERT INTO feedback (
                             title, description, priority, tags, ai_priority,
-                            safety_category, reasoning, key_concerns, safety_flag
+                            safety_category, reasoning, key_concerns, safety_flag,
+                            analysis_status, minhash
                         )
-                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, 'complete', %s)
                         RETURNING id
                         """,
                         (
@@ -81,47 +253,697 @@ class Database:
                             ai_analysis.get('safety_category'),
                             ai_analysis.get('reasoning'),
                             ai_analysis.get('key_concerns', []),
-                            ai_analysis.get('is_safety_concern', False)
+                            ai_analysis.get('is_safety_concern', False),
+                            minhash
                         )
                     )
                 else:
                     cur.execute(
                         """
-                        INSERT INTO feedback (title, description, priority, tags)
-                        VALUES (%s, %s, %s, %s) RETURNING id
+                        INSERT INTO feedback (title, description, priority, tags, analysis_status, minhash)
+                        VALUES (%s, %s, %s, %s, %s, %s) RETURNING id
                         """,
-                        (title, description, priority, tags)
+                        (title, description, priority, tags, 'pending' if queue_analysis else None, minhash)
                     )
                 result = cur.fetchone()
+                if result and queue_analysis and not ai_analysis:
+                    cur.execute(
+                        "INSERT INTO analysis_jobs (feedback_id) VALUES (%s)",
+                        (result[0],)
+                    )
                 conn.commit()
-                print("Feedback added successfully")
+                logger.debug("Feedback added", extra={'feedback_id': result[0] if result else None})
                 return result[0] if result else None
-        except Exception as e:
-            print(f"Error adding feedback: {str(e)}")
-            raise e
-        finally:
-            if conn:
-                conn.close()
+        except Exception:
+            logger.exception("Error adding feedback")
+            raise
 
-    def get_all_feedback(self):
-        try:
-            conn = self._get_connection()
+    @_instrumented
+    @_writes
+    def bulk_add_feedback(self, rows, queue_analysis=False, checkpoint=None):
+        """Insert many feedback rows in one transaction and return their ids.
+
+        ``rows`` are ``(title, description, priority, tags, created_at)``
+        tuples; a None ``created_at`` means now. With ``queue_analysis`` an
+        analysis job is enqueued per row. ``checkpoint`` is an optional
+        ``(source, position, inserted, rejected)`` progress record committed
+        atomically with the rows, so an interrupted import can resume
+        exactly where it stopped.
+        """
+        if not rows and checkpoint is None:
+            return []
+        from utils.dedup import minhash_signature, signature_to_bytes
+        with self._get_connection('maintenance') as conn:
+            with conn.cursor() as cur:
+                ids = []
+                if rows:
+                    ids = [row[0] for row in execute_values(
+                        cur,
+                        """
+                        INSERT INTO feedback (
+                            title, description, priority, tags, created_at, analysis_status, minhash
+                        )
+                        VALUES %s RETURNING id
+                        """,
+                        [
+                            row + ('pending' if queue_analysis else None,
+                                   signature_to_bytes(minhash_signature(row[0], row[1])))
+                            for row in rows
+                        ],
+                        template="(%s, %s, %s, %s::text[], coalesce(%s::timestamp, LOCALTIMESTAMP), %s, %s)",
+                        page_size=len(rows),
+                        fetch=True
+                    )]
+                if ids and queue_analysis:
+                    execute_values(
+                        cur,
+                        "INSERT INTO analysis_jobs (feedback_id) VALUES %s",
+                        [(feedback_id,) for feedback_id in ids],
+                        page_size=len(ids)
+                    )
+                if checkpoint is not None:
+                    cur.execute(
+                        """
+                        INSERT INTO import_checkpoints (source, position, inserted, rejected)
+                        VALUES (%s, %s, %s, %s)
+                        ON CONFLICT (source) DO UPDATE SET
+                            position = EXCLUDED.position, inserted = EXCLUDED.inserted,
+                            rejected = EXCLUDED.rejected, updated_at = LOCALTIMESTAMP
+                        """,
+                        checkpoint
+                    )
+            conn.commit()
+        return ids
+
+    @_instrumented
+    def get_import_checkpoint(self, source):
+        """Progress recorded for an import source, or None if it never ran."""
+        with self._get_connection('interactive') as conn:
             with conn.cursor(cursor_factory=RealDictCursor) as cur:
-                cur.execute("SELECT * FROM feedback ORDER BY created_at DESC")
-                return cur.fetchall()
-        finally:
-            if conn:
-                conn.close()
+                cur.execute(
+                    "SELECT source, position, inserted, rejected FROM import_checkpoints WHERE source = %s",
+                    (source,)
+                )
+                return cur.fetchone()
 
-    def upvote_feedback(self, feedback_id):
-        try:
-            conn = self._get_connection()
+    @_instrumented
+    def get_signed_count(self):
+        """Rows with a stored signature (possibly empty), from the rollup
+        total and the small unsigned index; for MinHashIndex refreshes."""
+        with self._get_connection('interactive') as conn:
             with conn.cursor() as cur:
+                _execute(
+                    cur,
+                    """
+                    SELECT (SELECT coalesce(sum(feedback_count), 0) FROM feedback_daily_stats)
+                           - (SELECT count(*) FROM feedback WHERE minhash IS NULL)
+                    """
+                )
+                return int(cur.fetchone()[0])
+
+    @_instrumented
+    def get_minhashes(self, after_id=0, limit=10000):
+        """``(id, minhash)`` pairs for signed rows with id above ``after_id``."""
+        with self._get_connection('analytics') as conn:
+            with conn.cursor() as cur:
+                _execute(
+                    cur,
+                    """
+                    SELECT id, minhash FROM feedback
+                    WHERE id > %s AND minhash IS NOT NULL
+                    ORDER BY id LIMIT %s
+                    """,
+                    (after_id, limit)
+                )
+                return cur.fetchall()
+
+    @_instrumented
+    def get_unsigned_feedback(self, limit=1000):
+        with self._get_connection('maintenance') as conn:
+            with conn.cursor(cursor_factory=RealDictCursor) as cur:
                 cur.execute(
-                    "UPDATE feedback SET upvotes = upvotes + 1 WHERE id = %s",
+                    "SELECT id, title, description FROM feedback WHERE minhash IS NULL ORDER BY id LIMIT %s",
+                    (limit,)
+                )
+                return cur.fetchall()
+
+    @_instrumented
+    def save_minhashes(self, rows):
+        """Store ``(id, minhash)`` pairs in one statement."""
+        with self._get_connection('maintenance') as conn:
+            with conn.cursor() as cur:
+                execute_values(
+                    cur,
+                    "UPDATE feedback f SET minhash = v.minhash FROM (VALUES %s) AS v (id, minhash) WHERE f.id = v.id",
+                    rows,
+                    template="(%s::int, %s::bytea)"
+                )
+            conn.commit()
+
+    @_instrumented
+    def get_analysis(self, feedback_id):
+        """AI analysis fields and analysis_status for one feedback item."""
+        with self._get_connection('interactive') as conn:
+            with conn.cursor(cursor_factory=RealDictCursor) as cur:
+                _execute(
+                    cur,
+                    """
+                    SELECT id, priority, ai_priority, safety_category, reasoning,
+                           key_concerns, safety_flag, analysis_status
+                    FROM feedback WHERE id = %s
+                    """,
                     (feedback_id,)
                 )
-                conn.commit()
-        finally:
-            if conn:
-                conn.close()
+                return cur.fetchone()
+
+    @_instrumented
+    def claim_analysis_jobs(self, limit, lease_seconds=300):
+        """Lock up to ``limit`` due jobs for this worker.
+
+        Jobs left ``running`` longer than ``lease_seconds`` (e.g. by a worker
+        that crashed) are reclaimed. Returns the jobs joined with the
+        feedback text to analyze.
+        """
+        with self._get_connection('write') as conn:
+            with conn.cursor(cursor_factory=RealDictCursor) as cur:
+                cur.execute(
+                    """
+                    WITH due AS (
+                        SELECT id FROM analysis_jobs
+                        WHERE (status = 'queued' AND run_after <= LOCALTIMESTAMP)
+                           OR (status = 'running'
+                               AND locked_at < LOCALTIMESTAMP - make_interval(secs => %s))
+                        ORDER BY run_after
+                        LIMIT %s
+                        FOR UPDATE SKIP LOCKED
+                    ),
+                    claimed AS (
+                        UPDATE analysis_jobs j
+                        SET status = 'running', attempts = j.attempts + 1,
+                            locked_at = LOCALTIMESTAMP, updated_at = LOCALTIMESTAMP
+                        FROM due WHERE j.id = due.id
+                        RETURNING j.id, j.feedback_id, j.attempts
+                    )
+                    SELECT c.id, c.feedback_id, c.attempts, f.title, f.description
+                    FROM claimed c JOIN feedback f ON f.id = c.feedback_id
+                    """,
+                    (lease_seconds, limit)
+                )
+                jobs = cur.fetchall()
+            conn.commit()
+        return jobs
+
+    @_instrumented
+    @_writes
+    def complete_analysis_job(self, job_id, feedback_id, ai_analysis, failed=False):
+        """Write an analysis back to its feedback row and close the job."""
+        with self._get_connection('write') as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    """
+                    UPDATE feedback SET
+                        ai_priority = %s, safety_category = %s, reasoning = %s,
+                        key_concerns = %s, safety_flag = %s, analysis_status = %s
+                    WHERE id = %s
+                    """,
+                    (
+                        ai_analysis.get('priority_score'),
+                        ai_analysis.get('safety_category'),
+                        ai_analysis.get('reasoning'),
+                        ai_analysis.get('key_concerns', []),
+                        ai_analysis.get('is_safety_concern', False),
+                        'failed' if failed else 'complete',
+                        feedback_id
+                    )
+                )
+                cur.execute(
+                    """
+                    UPDATE analysis_jobs
+                    SET status = %s, locked_at = NULL, updated_at = LOCALTIMESTAMP
+                    WHERE id = %s
+                    """,
+                    ('failed' if failed else 'done', job_id)
+                )
+            conn.commit()
+
+    @_instrumented
+    @_writes
+    def save_analyses(self, analyses):
+        """Write many ``(feedback_id, ai_analysis)`` pairs in one statement."""
+        rows = [
+            (
+                feedback_id,
+                analysis.get('priority_score'),
+                analysis.get('safety_category'),
+                analysis.get('reasoning'),
+                analysis.get('key_concerns', []),
+                analysis.get('is_safety_concern', False),
+                'failed' if analysis.get('safety_category') == 'automatic_fallback' else 'complete'
+            )
+            for feedback_id, analysis in analyses
+        ]
+        if not rows:
+            return
+        with self._get_connection('write') as conn:
+            with conn.cursor() as cur:
+                execute_values(
+                    cur,
+                    """
+                    UPDATE feedback f SET
+                        ai_priority = v.ai_priority, safety_category = v.safety_category,
+                        reasoning = v.reasoning, key_concerns = v.key_concerns,
+                        safety_flag = v.safety_flag, analysis_status = v.analysis_status
+                    FROM (VALUES %s) AS v (
+                        id, ai_priority, safety_category, reasoning, key_concerns,
+                        safety_flag, analysis_status
+                    )
+                    WHERE f.id = v.id
+                    """,
+                    rows,
+                    template="(%s::int, %s::int, %s, %s, %s::text[], %s::boolean, %s)"
+                )
+            conn.commit()
+
+    @_instrumented
+    def retry_analysis_job(self, job_id, error, delay_seconds):
+        """Put a failed job back in the queue after ``delay_seconds``."""
+        with self._get_connection('write') as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    """
+                    UPDATE analysis_jobs
+                    SET status = 'queued', locked_at = NULL, last_error = %s,
+                        run_after = LOCALTIMESTAMP + make_interval(secs => %s),
+                        updated_at = LOCALTIMESTAMP
+                    WHERE id = %s
+                    """,
+                    (error, delay_seconds, job_id)
+                )
+            conn.commit()
+
+    @_instrumented
+    def get_all_feedback(self, columns=None, feedback_filter=None):
+        conditions, params = (feedback_filter or FeedbackFilter()).to_sql()
+        query = sql.SQL("SELECT {} FROM feedback{} ORDER BY created_at DESC, id DESC").format(
+            _projection(columns), _where(conditions)
+        )
+        with self._read_connection('analytics') as conn:
+            with conn.cursor(cursor_factory=RealDictCursor) as cur:
+                _execute(cur, query, params)
+                return cur.fetchall()
+
+    @_instrumented
+    def get_feedback_page(self, limit=25, cursor=None, columns=LIST_COLUMNS, feedback_filter=None,
+                          query_class='interactive'):
+        """Fetch one page of feedback, newest first.
+
+        ``cursor`` is the ``(created_at, id)`` of the last row of the previous
+        page, as returned in ``next_cursor``. Returns ``(rows, next_cursor)``;
+        ``next_cursor`` is None on the last page. Batch jobs paging through
+        the table pass ``query_class='maintenance'`` (see STATEMENT_TIMEOUTS).
+        """
+        columns = list(columns)
+        # The keyset columns are needed to build the next cursor
+        selected = columns + [col for col in ('created_at', 'id') if col not in columns]
+        conditions, params = (feedback_filter or FeedbackFilter()).to_sql()
+        if cursor is not None:
+            conditions.append(sql.SQL("(created_at, id) < (%s, %s)"))
+            params.extend(cursor)
+        query = sql.SQL(
+            "SELECT {} FROM feedback{} ORDER BY created_at DESC, id DESC LIMIT %s"
+        ).format(_projection(selected), _where(conditions))
+        # Fetch one extra row to learn whether another page exists
+        params.append(limit + 1)
+
+        with self._read_connection(query_class) as conn:
+            with conn.cursor(cursor_factory=RealDictCursor) as cur:
+                _execute(cur, query, params)
+                rows = cur.fetchall()
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = (rows[-1]['created_at'], rows[-1]['id'])
+        return rows, next_cursor
+
+    @_instrumented
+    def get_top_feedback(self, limit, feedback_filter=None, columns=LIST_COLUMNS):
+        """The most pressing matching rows: safety concerns first, then by
+        AI (or submitted) priority and upvotes."""
+        conditions, params = (feedback_filter or FeedbackFilter()).to_sql()
+        query = sql.SQL(
+            "SELECT {} FROM feedback{} "
+            "ORDER BY safety_flag DESC NULLS LAST, coalesce(ai_priority, priority) DESC, "
+            "upvotes DESC, id DESC LIMIT %s"
+        ).format(_projection(columns), _where(conditions))
+        with self._read_connection('analytics') as conn:
+            with conn.cursor(cursor_factory=RealDictCursor) as cur:
+                _execute(cur, query, params + [limit])
+                return cur.fetchall()
+
+    @_instrumented
+    def get_feedback_by_ids(self, ids, columns=LIST_COLUMNS):
+        """Rows for the given ids, in the order the ids were given."""
+        if not ids:
+            return []
+        query = sql.SQL("SELECT {} FROM feedback WHERE id = ANY(%s)").format(
+            _projection(list(dict.fromkeys(list(columns) + ['id'])))
+        )
+        with self._read_connection('interactive') as conn:
+            with conn.cursor(cursor_factory=RealDictCursor) as cur:
+                _execute(cur, query, (list(ids),))
+                rows = {row['id']: row for row in cur.fetchall()}
+        return [rows[feedback_id] for feedback_id in ids if feedback_id in rows]
+
+    @_instrumented
+    def search_feedback(self, query, feedback_filter=None, limit=25, offset=0, columns=LIST_COLUMNS):
+        """Full-text search over title, description, reasoning and key concerns.
+
+        Matches are ranked (title hits weigh most), narrowed by
+        ``feedback_filter`` in the same query, and paginated. Returns
+        ``(rows, total)``; each row also carries ``rank`` and a ``snippet`` of
+        the description with matches wrapped in SNIPPET_START/SNIPPET_STOP
+        (removed from the description itself, so they only ever mark
+        matches). Snippets are only built for the rows on the requested page.
+        """
+        conditions, params = (feedback_filter or FeedbackFilter()).to_sql()
+        conditions.insert(0, sql.SQL("search_vector @@ q.query"))
+        selected = _projection(columns, table='f')
+        statement = sql.SQL("""
+            WITH q AS (
+                SELECT websearch_to_tsquery('english', %s) AS query
+            ),
+            hits AS (
+                SELECT id, ts_rank_cd(search_vector, q.query) AS rank, count(*) OVER () AS total
+                FROM feedback, q{where}
+                ORDER BY rank DESC, id DESC
+                LIMIT %s OFFSET %s
+            )
+            SELECT {selected}, hits.rank, hits.total,
+                   ts_headline('english', translate(f.description, E'\\x02\\x03', ''), q.query,
+                               E'StartSel=\\x02, StopSel=\\x03, MaxFragments=2, MaxWords=30, MinWords=10')
+                       AS snippet
+            FROM hits JOIN feedback f ON f.id = hits.id, q
+            ORDER BY hits.rank DESC, hits.id DESC
+        """).format(where=_where(conditions), selected=selected)
+
+        with self._read_connection('analytics') as conn:
+            with conn.cursor(cursor_factory=RealDictCursor) as cur:
+                _execute(cur, statement, [query] + params + [limit, offset])
+                rows = cur.fetchall()
+        total = rows[0]['total'] if rows else 0
+        return rows, total
+
+    @_instrumented
+    def count_feedback(self, feedback_filter=None):
+        conditions, params = (feedback_filter or FeedbackFilter()).to_sql()
+        query = sql.SQL("SELECT count(*) FROM feedback{}").format(_where(conditions))
+        with self._read_connection('interactive') as conn:
+            with conn.cursor() as cur:
+                _execute(cur, query, params)
+                return cur.fetchone()[0]
+
+    @_instrumented
+    def get_aggregates(self, feedback_filter=None, use_rollups=True):
+        """Dashboard metrics and chart series in a single round trip.
+
+        Unfiltered requests read the trigger-maintained rollup tables;
+        filtered ones (or ``use_rollups=False``) aggregate the matching
+        feedback rows.
+        """
+        feedback_filter = feedback_filter or FeedbackFilter()
+        if use_rollups and feedback_filter.is_empty():
+            query, params = build_rollup_query(), []
+        else:
+            conditions, params = feedback_filter.to_sql()
+            query = build_aggregates_query(_where(conditions))
+        with self._read_connection('analytics') as conn:
+            with conn.cursor() as cur:
+                _execute(cur, query, params)
+                return parse_aggregates_row(cur.fetchone())
+
+    @_instrumented
+    def get_data_version(self):
+        """Counter bumped by every statement that changes feedback rows.
+
+        The bump happens just before the writer commits, so a reader can
+        briefly see the new version with the old data; caches keyed on it
+        should also carry a short TTL.
+        """
+        with self._get_connection('interactive') as conn:
+            with conn.cursor() as cur:
+                _execute(cur, VERSION_QUERY)
+                return cur.fetchone()[0]
+
+    @_instrumented
+    def get_feedback_watermark(self):
+        """Cheap token that changes whenever feedback is added, removed or
+        re-prioritized; used to invalidate derived results such as summaries.
+        """
+        with self._read_connection('interactive') as conn:
+            with conn.cursor() as cur:
+                _execute(
+                    cur,
+                    """
+                    SELECT (SELECT coalesce(max(id), 0) FROM feedback),
+                           coalesce(sum(feedback_count), 0),
+                           coalesce(sum(priority_sum), 0),
+                           coalesce(sum(safety_count), 0)
+                    FROM feedback_daily_stats
+                    """
+                )
+                return ':'.join(str(value) for value in cur.fetchone())
+
+    @_instrumented
+    def get_daily_stats(self):
+        """Per-day counts from the rollup table, oldest first."""
+        with self._read_connection('analytics') as conn:
+            with conn.cursor(cursor_factory=RealDictCursor) as cur:
+                _execute(
+                    cur,
+                    """
+                    SELECT day, feedback_count, high_priority_count, safety_count, priority_sum
+                    FROM feedback_daily_stats
+                    WHERE feedback_count > 0
+                    ORDER BY day
+                    """
+                )
+                return cur.fetchall()
+
+    @_instrumented
+    def get_analytics_state(self):
+        """``(row_version, total)``: the latest feedback row version and the
+        row count from the rollups, for snapshot change detection."""
+        with self._get_connection('interactive') as conn:
+            with conn.cursor() as cur:
+                _execute(
+                    cur,
+                    """
+                    SELECT (SELECT CASE WHEN is_called THEN last_value ELSE 0 END
+                            FROM feedback_row_version_seq),
+                           (SELECT coalesce(sum(feedback_count), 0) FROM feedback_daily_stats)
+                    """
+                )
+                row_version, total = cur.fetchone()
+                return row_version, int(total)
+
+    @_instrumented
+    def get_analytics_rows(self, after_id=0, limit=50000, changed_after=None):
+        """One page of ANALYTICS_COLUMNS tuples with id above ``after_id``.
+
+        With ``changed_after`` only rows inserted or updated since that row
+        version (see get_analytics_state) are returned.
+        """
+        conditions = [sql.SQL("id > %s")]
+        params = [after_id]
+        if changed_after is not None:
+            conditions.append(sql.SQL("row_version > %s"))
+            params.append(changed_after)
+        query = sql.SQL("SELECT {} FROM feedback{} ORDER BY id LIMIT %s").format(
+            _projection(ANALYTICS_COLUMNS), _where(conditions)
+        )
+        with self._get_connection('analytics') as conn:
+            with conn.cursor() as cur:
+                _execute(cur, query, params + [limit])
+                return cur.fetchall()
+
+    @_instrumented
+    def get_filter_options(self):
+        """Distinct priorities and the tag vocabulary for the filter sidebar."""
+        with self._read_connection('interactive') as conn:
+            with conn.cursor() as cur:
+                _execute(
+                    cur,
+                    "SELECT priority FROM feedback_priority_stats "
+                    "WHERE feedback_count > 0 ORDER BY priority"
+                )
+                priorities = [row[0] for row in cur.fetchall()]
+                _execute(
+                    cur,
+                    "SELECT tag FROM feedback_tag_stats "
+                    "WHERE feedback_count > 0 ORDER BY tag"
+                )
+                tags = [row[0] for row in cur.fetchall()]
+        return {'priorities': priorities, 'tags': tags}
+
+    @_instrumented
+    def rebuild_rollups(self):
+        """Recompute the rollup tables from the feedback table."""
+        with self._get_connection('maintenance') as conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT feedback_rollup_rebuild()")
+            conn.commit()
+
+    @_instrumented
+    def ensure_partitions(self, months_ahead=PARTITION_MONTHS_AHEAD):
+        """Create missing monthly partitions through ``months_ahead`` months
+        from now, plus any month with rows in the default partition.
+        Returns how many were created."""
+        with self._get_connection('maintenance') as conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT feedback_ensure_partitions(%s)", (months_ahead,))
+                created = cur.fetchone()[0]
+            conn.commit()
+        if created:
+            logger.info("Created feedback partitions", extra={'partitions_created': created})
+        return created
+
+    @_instrumented
+    def get_partitions(self):
+        """Monthly partition tables, attached or detached, oldest first.
+
+        Rows are dicts with ``name``, ``attached`` and ``estimated_rows``
+        (from the planner statistics).
+        """
+        with self._get_connection('maintenance') as conn:
+            with conn.cursor(cursor_factory=RealDictCursor) as cur:
+                cur.execute(
+                    """
+                    SELECT c.relname AS name, i.inhrelid IS NOT NULL AS attached,
+                           greatest(c.reltuples, 0)::bigint AS estimated_rows
+                    FROM pg_class c
+                    LEFT JOIN pg_inherits i ON i.inhrelid = c.oid
+                    WHERE c.relkind = 'r' AND c.relnamespace = current_schema()::regnamespace
+                      AND c.relname ~ '^feedback_y[0-9]{4}m[0-9]{2}$'
+                    ORDER BY c.relname
+                    """
+                )
+                return cur.fetchall()
+
+    @_instrumented
+    def detach_partition(self, month):
+        """Detach the partition for ``month`` (any date in it) and take its
+        rows out of the rollups and dependent tables; returns the detached
+        table's name. The rows stay in that table until drop_partition."""
+        with self._get_connection('maintenance') as conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT feedback_detach_partition(%s)", (month,))
+                name = cur.fetchone()[0]
+            conn.commit()
+        return name
+
+    def iter_partition_rows(self, name, batch_size=10000):
+        """Yield every row of a partition table as a dict, streamed with a
+        server-side cursor."""
+        if not PARTITION_NAME_PATTERN.match(name):
+            raise ValueError(f"Not a feedback partition: {name}")
+        query = sql.SQL("SELECT {} FROM {} ORDER BY id").format(
+            _projection(FEEDBACK_COLUMNS) + sql.SQL(", minhash, row_version"), sql.Identifier(name)
+        )
+        with self._get_connection('maintenance') as conn:
+            with conn.cursor(name=f"export_{name}", cursor_factory=RealDictCursor) as cur:
+                cur.itersize = batch_size
+                cur.execute(query)
+                yield from cur
+            conn.rollback()
+
+    @_instrumented
+    def drop_partition(self, name):
+        """Drop a detached partition table."""
+        if not PARTITION_NAME_PATTERN.match(name):
+            raise ValueError(f"Not a feedback partition: {name}")
+        with self._get_connection('maintenance') as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    "SELECT 1 FROM pg_inherits WHERE inhrelid = to_regclass(%s)", (name,)
+                )
+                if cur.fetchone():
+                    raise ValueError(f"{name} is still attached; detach it first")
+                cur.execute(sql.SQL("DROP TABLE {}").format(sql.Identifier(name)))
+            conn.commit()
+
+    @_instrumented
+    def upvote_feedback(self, feedback_id, voter_id=None):
+        """Record a vote and return ``(upvote_count, accepted)``.
+
+        Votes are appended to feedback_votes rather than updating the hot
+        feedback row; flush_votes() folds them into feedback.upvotes in
+        batches. A voter can vote for an item once (``accepted`` is False for
+        a repeat vote); a None ``voter_id`` is treated as a unique anonymous
+        voter. The returned count includes votes not yet flushed.
+        """
+        voter_id = voter_id or f"anonymous:{uuid.uuid4()}"
+        with self._get_connection('write') as conn:
+            with conn.cursor() as cur:
+                # The pending-count subquery cannot see the row inserted by
+                # the CTE in the same statement, so the new vote is added.
+                # feedback_votes has no foreign key to the partitioned
+                # table, hence the existence check.
+                cur.execute(
+                    """
+                    WITH vote AS (
+                        INSERT INTO feedback_votes (feedback_id, voter_id)
+                        SELECT %s, %s WHERE EXISTS (SELECT 1 FROM feedback WHERE id = %s)
+                        ON CONFLICT (feedback_id, voter_id) DO NOTHING
+                        RETURNING 1
+                    )
+                    SELECT f.upvotes
+                           + (SELECT count(*) FROM feedback_votes v
+                              WHERE v.feedback_id = f.id AND NOT v.applied)
+                           + (SELECT count(*) FROM vote),
+                           EXISTS (SELECT 1 FROM vote)
+                    FROM feedback f WHERE f.id = %s
+                    """,
+                    (feedback_id, voter_id, feedback_id, feedback_id)
+                )
+                row = cur.fetchone()
+            conn.commit()
+        return (row[0], row[1]) if row else (0, False)
+
+    @_instrumented
+    def flush_votes(self, limit=10000):
+        """Apply up to ``limit`` pending votes as one counter update per item.
+
+        Safe to run from several processes: rows already being flushed
+        elsewhere are skipped. Returns the number of items updated.
+        """
+        with self._get_connection('write') as conn:
+            with conn.cursor() as cur:
+                # Runs every few seconds; with nothing pending, feedback is
+                # not touched at all (the partial index makes this cheap)
+                _execute(cur, "SELECT EXISTS (SELECT 1 FROM feedback_votes WHERE NOT applied)")
+                if not cur.fetchone()[0]:
+                    conn.rollback()
+                    return 0
+                cur.execute(
+                    """
+                    WITH batch AS (
+                        UPDATE feedback_votes SET applied = TRUE
+                        WHERE id IN (
+                            SELECT id FROM feedback_votes WHERE NOT applied
+                            ORDER BY id LIMIT %s
+                            FOR UPDATE SKIP LOCKED
+                        )
+                        RETURNING feedback_id
+                    ),
+                    counts AS (
+                        SELECT feedback_id, count(*) AS n FROM batch GROUP BY feedback_id
+                    )
+                    UPDATE feedback f SET upvotes = f.upvotes + counts.n
+                    FROM counts WHERE f.id = counts.feedback_id
+                    """,
+                    (limit,)
+                )
+                updated = cur.rowcount
+            conn.commit()
+        return updated
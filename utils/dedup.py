@@ -0,0 +1,268 @@
+"""Near-duplicate detection with MinHash signatures and an LSH index.
+
+Signatures are computed from word 3-gram shingles of title + description
+and stored in feedback.minhash when a row is written. The in-process index
+buckets signatures by LSH band so a lookup only compares the few candidates
+that share a band, with similarity estimated vectorized over them.
+
+    python -m utils.dedup backfill               # sign rows without a minhash
+    python -m utils.dedup cluster --threshold 0.8
+"""
+import argparse
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from utils.cache import normalize_text
+
+logger = logging.getLogger(__name__)
+
+# Seconds between full index reloads, which drop rows deleted since
+DEDUP_INDEX_MAX_AGE = float(os.environ.get('DEDUP_INDEX_MAX_AGE', 900))
+
+NUM_PERM = 64
+BANDS = 8
+ROWS_PER_BAND = NUM_PERM // BANDS
+SHINGLE_SIZE = 3
+
+# Candidates sharing a band have roughly (1/BANDS) ** (1/ROWS_PER_BAND),
+# about 0.77, Jaccard similarity or more.
+DEFAULT_THRESHOLD = 0.7
+
+_PRIME = (1 << 31) - 1
+# Fixed seed: signatures are persisted and must agree across processes
+_rng = np.random.RandomState(0x5eed)
+_A = _rng.randint(1, _PRIME, NUM_PERM).astype(np.int64)
+_B = _rng.randint(0, _PRIME, NUM_PERM).astype(np.int64)
+_WORD = re.compile(r'\w+')
+
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> set:
+    """CRC32 hashes of the word ``size``-grams of the normalized text."""
+    words = _WORD.findall(normalize_text(text).lower())
+    if len(words) < size:
+        return {zlib.crc32(' '.join(words).encode('utf-8'))} if words else set()
+    return {
+        zlib.crc32(' '.join(words[i:i + size]).encode('utf-8'))
+        for i in range(len(words) - size + 1)
+    }
+
+
+def minhash_signature(title: str, description: str) -> Optional[np.ndarray]:
+    """The text's signature, or None when it has no words to compare:
+    such texts would otherwise all share one signature and match each other."""
+    hashes = np.fromiter(shingles(f"{title} {description}"), dtype=np.int64) % _PRIME
+    if hashes.size == 0:
+        return None
+    # (a * x + b) mod p for every (shingle, permutation) pair; values stay < 2**62
+    return ((np.outer(hashes, _A) + _B) % _PRIME).min(axis=0).astype(np.uint32)
+
+
+def signature_to_bytes(signature: Optional[np.ndarray]) -> bytes:
+    # No signature is stored as empty bytes rather than NULL, so backfill
+    # does not pick the row up again
+    if signature is None:
+        return b''
+    return signature.astype('<u4').tobytes()
+
+
+def signature_from_bytes(data) -> Optional[np.ndarray]:
+    if not data:
+        return None
+    return np.frombuffer(bytes(data), dtype='<u4').astype(np.uint32)
+
+
+class MinHashIndex:
+    """Thread-safe LSH index over MinHash signatures."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ids = np.empty(0, dtype=np.int64)
+        self._signatures = np.empty((0, NUM_PERM), dtype=np.uint32)
+        self._size = 0
+        self._buckets: List[Dict[bytes, List[int]]] = [{} for _ in range(BANDS)]
+        self.last_id = 0
+        # Rows loaded, including those without a signature
+        self.rows_seen = 0
+        self.loaded_at = time.monotonic()
+
+    def __len__(self):
+        return self._size
+
+    def _grow(self, needed: int):
+        capacity = len(self._ids)
+        if self._size + needed <= capacity:
+            return
+        capacity = max(1024, capacity * 2, self._size + needed)
+        ids = np.empty(capacity, dtype=np.int64)
+        signatures = np.empty((capacity, NUM_PERM), dtype=np.uint32)
+        ids[:self._size] = self._ids[:self._size]
+        signatures[:self._size] = self._signatures[:self._size]
+        self._ids, self._signatures = ids, signatures
+
+    def add_many(self, ids, signatures):
+        with self._lock:
+            self._grow(len(ids))
+            for feedback_id, signature in zip(ids, signatures):
+                self.last_id = max(self.last_id, int(feedback_id))
+                self.rows_seen += 1
+                if signature is None:
+                    continue
+                position = self._size
+                self._ids[position] = feedback_id
+                self._signatures[position] = signature
+                self._size += 1
+                for band in range(BANDS):
+                    key = signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND].tobytes()
+                    self._buckets[band].setdefault(key, []).append(position)
+
+    def add(self, feedback_id: int, signature: Optional[np.ndarray]):
+        self.add_many([feedback_id], [signature])
+
+    def query(self, signature: Optional[np.ndarray], threshold: float = DEFAULT_THRESHOLD,
+              limit: int = 5, exclude_id: Optional[int] = None) -> List[Tuple[int, float]]:
+        """``(feedback_id, estimated Jaccard similarity)`` pairs, most similar
+        first; a None signature matches nothing."""
+        if signature is None:
+            return []
+        with self._lock:
+            candidates = set()
+            for band in range(BANDS):
+                key = signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND].tobytes()
+                candidates.update(self._buckets[band].get(key, ()))
+            if not candidates:
+                return []
+            positions = np.fromiter(candidates, dtype=np.int64)
+            ids = self._ids[positions]
+            similarity = (self._signatures[positions] == signature).mean(axis=1)
+
+        keep = similarity >= threshold
+        if exclude_id is not None:
+            keep &= ids != exclude_id
+        ids, similarity = ids[keep], similarity[keep]
+        order = np.argsort(-similarity, kind='stable')[:limit]
+        return [(int(ids[i]), float(similarity[i])) for i in order]
+
+    def refresh(self, db, chunk_size: int = 10000, max_age: float = DEDUP_INDEX_MAX_AGE) -> int:
+        """Catch up with the stored signatures; returns how many were loaded.
+
+        Rows above ``last_id`` are fetched incrementally. A lower id that
+        committed late, or a row signed by backfill, leaves the index short
+        of the database's signed row count, and the index is then reloaded
+        in full, as it is every ``max_age`` seconds.
+        """
+        expected = db.get_signed_count()
+        if time.monotonic() - self.loaded_at > max_age:
+            return self._reload(db, chunk_size)
+        loaded = self._load(db, chunk_size)
+        if self.rows_seen < expected:
+            logger.info("Near-duplicate index missed %s rows; reloading", expected - self.rows_seen)
+            return self._reload(db, chunk_size)
+        return loaded
+
+    def _load(self, db, chunk_size: int) -> int:
+        loaded = 0
+        while True:
+            rows = db.get_minhashes(after_id=self.last_id, limit=chunk_size)
+            if not rows:
+                return loaded
+            self.add_many(
+                [feedback_id for feedback_id, _ in rows],
+                [signature_from_bytes(data) for _, data in rows]
+            )
+            loaded += len(rows)
+
+    def _reload(self, db, chunk_size: int) -> int:
+        # Queries keep using the old contents until the new ones are complete
+        fresh = MinHashIndex()
+        loaded = fresh._load(db, chunk_size)
+        with self._lock:
+            self.__dict__.update({key: value for key, value in fresh.__dict__.items() if key != '_lock'})
+        return loaded
+
+
+_index: Optional[MinHashIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_dedup_index(db) -> MinHashIndex:
+    """Process-wide index, caught up with rows added by any process."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = MinHashIndex()
+        _index.refresh(db)
+    return _index
+
+
+def find_similar(db, title: str, description: str, threshold: float = DEFAULT_THRESHOLD,
+                 limit: int = 5) -> List[Tuple[int, float]]:
+    return get_dedup_index(db).query(minhash_signature(title, description), threshold, limit)
+
+
+def cluster(index: MinHashIndex, threshold: float) -> List[List[int]]:
+    """Group indexed rows into near-duplicate clusters (union-find)."""
+    ids = index._ids[:len(index)]
+    signatures = index._signatures[:len(index)]
+    parent = {}
+
+    def find(x):
+        parent.setdefault(x, x)
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for feedback_id, signature in zip(ids, signatures):
+        for other_id, _ in index.query(signature, threshold, limit=len(index), exclude_id=int(feedback_id)):
+            root_a, root_b = find(int(feedback_id)), find(other_id)
+            if root_a != root_b:
+                parent[max(root_a, root_b)] = min(root_a, root_b)
+
+    groups: Dict[int, List[int]] = {}
+    for feedback_id in parent:
+        groups.setdefault(find(feedback_id), []).append(feedback_id)
+    return sorted((sorted(group) for group in groups.values() if len(group) > 1),
+                  key=len, reverse=True)
+
+
+def main(argv=None):
+    from utils.database import Database
+
+    parser = argparse.ArgumentParser(description="Near-duplicate feedback detection")
+    parser.add_argument('command', choices=['backfill', 'cluster'])
+    parser.add_argument('--threshold', type=float, default=0.8)
+    parser.add_argument('--chunk-size', type=int, default=1000)
+    args = parser.parse_args(argv)
+
+    db = Database()
+    if args.command == 'backfill':
+        total = 0
+        while True:
+            rows = db.get_unsigned_feedback(limit=args.chunk_size)
+            if not rows:
+                break
+            db.save_minhashes([
+                (row['id'], signature_to_bytes(minhash_signature(row['title'], row['description'])))
+                for row in rows
+            ])
+            total += len(rows)
+            print(f"Signed {total} feedback items")
+        return 0
+
+    index = get_dedup_index(db)
+    clusters = cluster(index, args.threshold)
+    print(json.dumps({'indexed': len(index), 'clusters': clusters}, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
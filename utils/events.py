@@ -0,0 +1,140 @@
+"""Cross-process change notifications over Postgres LISTEN/NOTIFY.
+
+Every statement that changes feedback rows (submissions, analysis results,
+flushed upvotes) sends the new data version on the ``feedback_changes``
+channel, and Postgres delivers it when the writer commits. Each app
+process keeps one listening connection, so its caches keyed on the data
+version are invalidated by writes made on any replica, without a version
+query per render.
+
+While the listener is disconnected ``version`` is None and callers fall
+back to Database.get_data_version. Set CHANGE_EVENTS=0 to disable it.
+"""
+import logging
+import os
+import select
+import threading
+from typing import Callable, List, Optional
+
+import psycopg2
+
+from utils.instrumentation import counter
+from utils.pool import connection_params_from_env
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = 'feedback_changes'
+# is_called is false until the first write; last_value is 1 then too
+VERSION_QUERY = "SELECT CASE WHEN is_called THEN last_value ELSE 0 END FROM feedback_change_seq"
+
+CHANGE_EVENTS = counter('change_events_total', 'Change notifications received', ('channel',))
+LISTENER_RECONNECTS = counter('change_listener_reconnects_total', 'Change listener reconnects')
+
+
+class ChangeListener:
+    """Tracks the feedback data version from notifications on a background thread."""
+
+    def __init__(self, params=None, poll_interval: float = 5.0, max_backoff: float = 30.0):
+        self.params = params
+        self.poll_interval = poll_interval
+        self.max_backoff = max_backoff
+        self._version: Optional[int] = None
+        self._callbacks: List[Callable[[int], None]] = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def version(self) -> Optional[int]:
+        """The latest data version, or None while not listening."""
+        return self._version
+
+    def subscribe(self, callback: Callable[[int], None]):
+        """Call ``callback(version)`` on the listener thread after each change."""
+        with self._lock:
+            self._callbacks.append(callback)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self.run, name="change-listener", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def run(self):
+        backoff = 1.0
+        while not self._stop.is_set():
+            try:
+                self._listen()
+                backoff = 1.0
+            except Exception as e:
+                logger.warning("Change listener disconnected: %s", e)
+                LISTENER_RECONNECTS.inc()
+            # Changes may be missed while disconnected; readers query instead
+            self._version = None
+            if self._stop.wait(backoff):
+                return
+            backoff = min(backoff * 2, self.max_backoff)
+
+    def _listen(self):
+        conn = psycopg2.connect(**(self.params or connection_params_from_env()))
+        try:
+            conn.autocommit = True
+            with conn.cursor() as cur:
+                cur.execute(f"LISTEN {CHANNEL}")
+                # Read after LISTEN so no change falls between the two
+                cur.execute(VERSION_QUERY)
+                self._set_version(cur.fetchone()[0])
+            logger.info("Listening for feedback changes")
+            while not self._stop.is_set():
+                if select.select([conn], [], [], self.poll_interval) == ([], [], []):
+                    # Idle: make sure the connection is still alive
+                    with conn.cursor() as cur:
+                        cur.execute("SELECT 1")
+                    continue
+                conn.poll()
+                latest = None
+                while conn.notifies:
+                    notify = conn.notifies.pop(0)
+                    CHANGE_EVENTS.inc(channel=notify.channel)
+                    latest = max(latest or 0, int(notify.payload))
+                if latest is not None:
+                    self._set_version(latest)
+        finally:
+            conn.close()
+
+    def _set_version(self, version: int):
+        # Notifications from concurrent writers can arrive out of order
+        if self._version is not None and version <= self._version:
+            return
+        self._version = version
+        with self._lock:
+            callbacks = list(self._callbacks)
+        for callback in callbacks:
+            try:
+                callback(version)
+            except Exception:
+                logger.exception("Change callback failed")
+
+
+_listener: Optional[ChangeListener] = None
+_listener_lock = threading.Lock()
+
+
+def ensure_change_listener_started() -> Optional[ChangeListener]:
+    """Start this process's listener once, unless CHANGE_EVENTS=0."""
+    global _listener
+    if os.environ.get('CHANGE_EVENTS', '1') == '0':
+        return None
+    if _listener is None:
+        with _listener_lock:
+            if _listener is None:
+                _listener = ChangeListener().start()
+    return _listener
+
+
+def get_change_listener() -> Optional[ChangeListener]:
+    """The running listener, if one was started in this process."""
+    return _listener
@@ -0,0 +1,194 @@
+"""Bulk import of feedback from CSV or JSONL exports.
+
+    python -m utils.ingest export.jsonl --batch-size 1000 --queue-analysis
+
+Records need ``title``, ``description`` and ``priority``; ``tags`` (a JSON
+list, or a comma/semicolon separated string in CSV) and ``created_at`` (ISO
+8601) are optional. Progress is committed with every batch, so re-running
+the same command after an interruption resumes where it stopped.
+"""
+import argparse
+import csv
+import json
+import logging
+import os
+import sys
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from utils.aggregation import MAX_PRIORITY
+from utils.database import Database, FEEDBACK_TAGS
+from utils.instrumentation import configure_logging
+
+logger = logging.getLogger(__name__)
+
+
+def read_records(path: str, fmt: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """Stream records from a CSV or JSONL file without loading it whole."""
+    fmt = fmt or ('csv' if path.lower().endswith('.csv') else 'jsonl')
+    with open(path, newline='', encoding='utf-8') as f:
+        if fmt == 'csv':
+            yield from csv.DictReader(f)
+            return
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                # Passed through so the loader counts it as a rejected record
+                yield line
+
+
+def _text_field(record: Dict[str, Any], name: str) -> str:
+    value = record.get(name)
+    if value is None:
+        return ''
+    if not isinstance(value, str):
+        raise ValueError(f"{name} must be a string, got {type(value).__name__}")
+    return value.strip()
+
+
+def _parse_tags(value) -> list:
+    if value is None or value == '':
+        return []
+    if isinstance(value, str):
+        if value.lstrip().startswith('['):
+            value = json.loads(value)
+        else:
+            value = value.replace(';', ',').split(',')
+    if not isinstance(value, list) or not all(isinstance(tag, str) for tag in value):
+        raise ValueError("tags must be a list of strings")
+    return [tag.strip().lower() for tag in value if tag.strip()]
+
+
+def validate_record(record: Dict[str, Any], allowed_tags=FEEDBACK_TAGS,
+                    drop_unknown_tags: bool = False) -> Tuple:
+    """Normalize a record into a Database.bulk_add_feedback row.
+
+    Raises ValueError describing the first problem found.
+    """
+    if not isinstance(record, dict):
+        raise ValueError("record is not a JSON object")
+    title = _text_field(record, 'title')
+    description = _text_field(record, 'description')
+    if not title or not description:
+        raise ValueError("title and description are required")
+
+    raw_priority = record.get('priority')
+    try:
+        # Booleans and fractional numbers are not priorities
+        if isinstance(raw_priority, bool) or (isinstance(raw_priority, float)
+                                              and not raw_priority.is_integer()):
+            raise ValueError
+        priority = int(raw_priority)
+    except (TypeError, ValueError, OverflowError):
+        raise ValueError(f"priority must be an integer, got {raw_priority!r}")
+    if not 1 <= priority <= MAX_PRIORITY:
+        raise ValueError(f"priority must be between 1 and {MAX_PRIORITY}, got {priority}")
+
+    tags = _parse_tags(record.get('tags'))
+    unknown = [tag for tag in tags if tag not in allowed_tags]
+    if unknown:
+        if not drop_unknown_tags:
+            raise ValueError(f"unknown tags: {', '.join(unknown)}")
+        tags = [tag for tag in tags if tag in allowed_tags]
+
+    created_at = record.get('created_at') or None
+    if created_at is not None:
+        try:
+            created_at = datetime.fromisoformat(str(created_at))
+        except ValueError:
+            raise ValueError(f"created_at is not ISO 8601: {created_at!r}")
+
+    # De-duplicate tags while keeping their order
+    return (title, description, priority, list(dict.fromkeys(tags)), created_at)
+
+
+class BulkLoader:
+    """Validates records and inserts them in batches with a DB checkpoint."""
+
+    def __init__(self, db, source: str, batch_size: int = 1000, queue_analysis: bool = False,
+                 drop_unknown_tags: bool = False, rejects=None):
+        self.db = db
+        self.source = source
+        self.batch_size = batch_size
+        self.queue_analysis = queue_analysis
+        self.drop_unknown_tags = drop_unknown_tags
+        self.rejects = rejects
+
+    def load(self, records: Iterator[Dict[str, Any]]) -> Dict[str, int]:
+        checkpoint = self.db.get_import_checkpoint(self.source)
+        position = checkpoint['position'] if checkpoint else 0
+        inserted = checkpoint['inserted'] if checkpoint else 0
+        rejected = checkpoint['rejected'] if checkpoint else 0
+        if position:
+            logger.info("Resuming %s after record %s", self.source, position)
+
+        batch = []
+        started = time.perf_counter()
+        for index, record in enumerate(records):
+            if index < position:
+                continue
+            try:
+                batch.append(validate_record(record, drop_unknown_tags=self.drop_unknown_tags))
+            except ValueError as e:
+                rejected += 1
+                if self.rejects is not None:
+                    self.rejects.write(json.dumps({'record': index, 'error': str(e), 'data': record}, default=str) + '\n')
+            if len(batch) >= self.batch_size:
+                inserted += len(batch)
+                self._flush(batch, (self.source, index + 1, inserted, rejected))
+                batch = []
+                rate = inserted / max(time.perf_counter() - started, 1e-9)
+                logger.info("%s: %s records read, %s inserted, %s rejected (%.0f rows/s)",
+                            self.source, index + 1, inserted, rejected, rate)
+            position = index + 1
+
+        inserted += len(batch)
+        self._flush(batch, (self.source, position, inserted, rejected))
+        return {'position': position, 'inserted': inserted, 'rejected': rejected}
+
+    def _flush(self, batch, checkpoint):
+        self.db.bulk_add_feedback(batch, queue_analysis=self.queue_analysis, checkpoint=checkpoint)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk import feedback from CSV or JSONL")
+    parser.add_argument('path')
+    parser.add_argument('--format', choices=['csv', 'jsonl'], help="default: from the file extension")
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--queue-analysis', action='store_true',
+                        help="enqueue AI analysis jobs for imported rows")
+    parser.add_argument('--drop-unknown-tags', action='store_true',
+                        help="drop tags outside the vocabulary instead of rejecting the record")
+    parser.add_argument('--rejects', help="write rejected records to this JSONL file")
+    parser.add_argument('--source', help="checkpoint name (default: absolute path of the input)")
+    args = parser.parse_args(argv)
+    configure_logging()
+
+    rejects = open(args.rejects, 'a', encoding='utf-8') if args.rejects else None
+    try:
+        db = Database()
+        loader = BulkLoader(
+            db,
+            source=args.source or os.path.abspath(args.path),
+            batch_size=args.batch_size,
+            queue_analysis=args.queue_analysis,
+            drop_unknown_tags=args.drop_unknown_tags,
+            rejects=rejects
+        )
+        result = loader.load(read_records(args.path, args.format))
+        # Backdated records land in the default partition until their month exists
+        db.ensure_partitions()
+    finally:
+        if rejects is not None:
+            rejects.close()
+    print(f"Import finished: {result['inserted']} inserted, {result['rejected']} rejected")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
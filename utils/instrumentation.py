@@ -0,0 +1,332 @@
+"""Lightweight metrics, structured logging and exporters.
+
+Metrics are process-local counters and fixed-bucket histograms with
+labels, registered once at import time by the module that records them:
+
+    DB_QUERY_SECONDS = histogram('db_query_seconds', 'Database query latency', ('query',))
+
+    with DB_QUERY_SECONDS.time(query='add_feedback'):
+        ...
+
+Exporters read the shared registry: ``render_prometheus()`` (served on
+METRICS_PORT by ``ensure_exporters_started``), a periodic JSON log line
+every METRICS_LOG_INTERVAL seconds, and the in-app Performance page.
+Logging is configured by ``configure_logging`` from LOG_LEVEL and
+LOG_FORMAT (``text`` or ``json``).
+"""
+import bisect
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import ContextDecorator
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# Seconds; wide enough for both sub-millisecond queries and GPT-4 calls
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class _Metric:
+    kind = ''
+
+    def __init__(self, name: str, description: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.description = description
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._series: Dict[Tuple[str, ...], Any] = {}
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def series(self) -> List[Tuple[Dict[str, str], Any]]:
+        with self._lock:
+            items = list(self._series.items())
+        return [(dict(zip(self.labelnames, key)), self._export(value)) for key, value in items]
+
+    def _export(self, value):
+        return value
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + amount
+
+
+class _Timer(ContextDecorator):
+    def __init__(self, metric: 'Histogram', labels: Dict[str, Any]):
+        self.metric = metric
+        self.labels = labels
+
+    def _recreate_cm(self):
+        # A fresh timer per decorated call, so concurrent calls don't share state
+        return _Timer(self.metric, self.labels)
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.elapsed = time.perf_counter() - self.started
+        self.metric.observe(self.elapsed, **self.labels)
+        return False
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, description: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, description, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._series.get(key)
+            if state is None:
+                # Per-bucket (not cumulative) counts, the last one is +Inf
+                state = self._series[key] = {'counts': [0] * (len(self.buckets) + 1),
+                                             'sum': 0.0, 'count': 0, 'max': 0.0}
+            state['counts'][bisect.bisect_left(self.buckets, value)] += 1
+            state['sum'] += value
+            state['count'] += 1
+            state['max'] = max(state['max'], value)
+
+    def time(self, **labels) -> _Timer:
+        """Context manager (or decorator) observing the elapsed seconds."""
+        return _Timer(self, labels)
+
+    def _export(self, state):
+        return {'counts': list(state['counts']), 'sum': state['sum'],
+                'count': state['count'], 'max': state['max']}
+
+    def quantile(self, state: Dict[str, Any], q: float) -> float:
+        """Estimate a quantile from exported bucket counts (linear within a bucket)."""
+        if not state['count']:
+            return 0.0
+        rank = q * state['count']
+        seen = 0
+        for index, count in enumerate(state['counts']):
+            if count and seen + count >= rank:
+                lower = self.buckets[index - 1] if index else 0.0
+                upper = self.buckets[index] if index < len(self.buckets) else state['max']
+                return min(lower + (upper - lower) * (rank - seen) / count, state['max'])
+            seen += count
+        return state['max']
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric) or existing.labelnames != metric.labelnames:
+                    raise ValueError(f"Metric {metric.name} is already registered differently")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def metrics(self) -> List[_Metric]:
+        with self._lock:
+            return sorted(self._metrics.values(), key=lambda metric: metric.name)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Plain-data view of every metric, with quantiles for histograms."""
+        snapshot = {}
+        for metric in self.metrics():
+            series = []
+            for labels, value in metric.series():
+                if isinstance(metric, Histogram):
+                    value = {
+                        'count': value['count'],
+                        'sum': value['sum'],
+                        'mean': value['sum'] / value['count'] if value['count'] else 0.0,
+                        'p50': metric.quantile(value, 0.5),
+                        'p95': metric.quantile(value, 0.95),
+                        'p99': metric.quantile(value, 0.99),
+                        'max': value['max'],
+                    }
+                series.append({'labels': labels, 'value': value})
+            snapshot[metric.name] = {'type': metric.kind, 'help': metric.description,
+                                     'series': series}
+        return snapshot
+
+
+REGISTRY = Registry()
+
+
+def counter(name: str, description: str, labelnames: Sequence[str] = ()) -> Counter:
+    return REGISTRY.register(Counter(name, description, labelnames))
+
+
+def histogram(name: str, description: str, labelnames: Sequence[str] = (),
+              buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+    return REGISTRY.register(Histogram(name, description, labelnames, buckets))
+
+
+RENDER_SECONDS = histogram('render_seconds', 'Streamlit page and fragment render time', ('component',))
+
+
+# Logging
+
+_STANDARD_RECORD_FIELDS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record; ``extra=`` fields become top-level keys."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': self.formatTime(record, '%Y-%m-%dT%H:%M:%S'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _STANDARD_RECORD_FIELDS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+_logging_configured = False
+_logging_lock = threading.Lock()
+
+
+def configure_logging():
+    """Install the root handler once per process (LOG_LEVEL, LOG_FORMAT)."""
+    global _logging_configured
+    with _logging_lock:
+        if _logging_configured:
+            return
+        handler = logging.StreamHandler(sys.stderr)
+        if os.environ.get('LOG_FORMAT', 'text') == 'json':
+            handler.setFormatter(JsonFormatter())
+        else:
+            handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s'))
+        root = logging.getLogger()
+        root.addHandler(handler)
+        root.setLevel(os.environ.get('LOG_LEVEL', 'INFO').upper())
+        _logging_configured = True
+
+
+# Exporters
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ''
+    pairs = []
+    for name, value in labels.items():
+        value = value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pairs.append(f'{name}="{value}"')
+    return '{' + ','.join(pairs) + '}'
+
+
+def render_prometheus(registry: Registry = REGISTRY) -> str:
+    """Prometheus text exposition format (version 0.0.4)."""
+    lines = []
+    for metric in registry.metrics():
+        lines.append(f"# HELP {metric.name} {metric.description}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        for labels, value in metric.series():
+            if isinstance(metric, Histogram):
+                cumulative = 0
+                for bound, count in zip(list(metric.buckets) + ['+Inf'], value['counts']):
+                    cumulative += count
+                    lines.append(f"{metric.name}_bucket{_format_labels({**labels, 'le': str(bound)})} {cumulative}")
+                lines.append(f"{metric.name}_sum{_format_labels(labels)} {value['sum']}")
+                lines.append(f"{metric.name}_count{_format_labels(labels)} {value['count']}")
+            else:
+                lines.append(f"{metric.name}{_format_labels(labels)} {value}")
+    return '\n'.join(lines) + '\n'
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = render_prometheus().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Scrapes are too frequent to log
+        pass
+
+
+class LogExporter:
+    """Logs the metrics snapshot as one structured record every ``interval`` seconds."""
+
+    def __init__(self, interval: float, registry: Registry = REGISTRY):
+        self.interval = interval
+        self.registry = registry
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self.run, name="metrics-log", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def run(self):
+        logger = logging.getLogger(__name__)
+        while not self._stop.wait(self.interval):
+            logger.info("metrics snapshot", extra={'metrics': self.registry.snapshot()})
+
+
+_exporters_started = False
+_exporters_lock = threading.Lock()
+
+
+def ensure_exporters_started():
+    """Start the configured exporters once per process.
+
+    METRICS_PORT serves ``/metrics`` for Prometheus; METRICS_LOG_INTERVAL
+    (seconds, default 0 = off) logs periodic snapshots.
+    """
+    global _exporters_started
+    if _exporters_started:
+        return
+    with _exporters_lock:
+        if _exporters_started:
+            return
+        port = os.environ.get('METRICS_PORT')
+        if port:
+            try:
+                server = ThreadingHTTPServer(('', int(port)), _MetricsHandler)
+            except OSError as e:
+                # Another process on this host already serves the endpoint
+                logging.getLogger(__name__).warning("Metrics endpoint not started: %s", e)
+            else:
+                threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+        interval = float(os.environ.get('METRICS_LOG_INTERVAL', 0))
+        if interval > 0:
+            LogExporter(interval).start()
+        _exporters_started = True
@@ -0,0 +1,192 @@
+"""Shared OpenAI client, structured-output requests and instrumentation.
+
+``complete_json`` asks for a JSON object (schema-constrained when a schema
+is given, unless LLM_JSON_SCHEMA=0), validates it with the caller's parser
+and, if the reply is invalid, asks the model once to correct it before
+raising ResponseFormatError. Every request has a timeout (LLM_TIMEOUT
+seconds unless the caller passes one); the client retries transport errors
+up to LLM_MAX_RETRIES times.
+"""
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from utils.instrumentation import counter, histogram
+
+LLM_REQUEST_SECONDS = histogram('llm_request_seconds', 'OpenAI request latency', ('operation',))
+LLM_TOKENS = counter('llm_tokens_total', 'Tokens used by OpenAI requests', ('operation', 'kind'))
+LLM_ERRORS = counter('llm_errors_total', 'Failed OpenAI requests', ('operation',))
+LLM_RETRIES = counter('llm_retries_total', 'Retried OpenAI requests', ('operation',))
+LLM_FIRST_TOKEN_SECONDS = histogram(
+    'llm_first_token_seconds', 'Time to the first streamed token', ('operation',)
+)
+LLM_INVALID_RESPONSES = counter(
+    'llm_invalid_responses_total', 'OpenAI replies that failed validation', ('operation',)
+)
+
+DEFAULT_TIMEOUT = float(os.environ.get('LLM_TIMEOUT', 30))
+
+REPAIR_PROMPT = ("Your previous reply was not valid: {error}. "
+                 "Reply again with only the corrected JSON object.")
+
+_client = None
+_client_lock = threading.Lock()
+
+
+class ResponseFormatError(ValueError):
+    """The model's reply is not the JSON object the caller asked for."""
+
+
+def get_client():
+    """Process-wide OpenAI client, created (and openai imported) on first use."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                from openai import OpenAI
+                _client = OpenAI(
+                    api_key=os.environ.get('OPENAI_API_KEY'),
+                    timeout=DEFAULT_TIMEOUT,
+                    max_retries=int(os.environ.get('LLM_MAX_RETRIES', 2))
+                )
+    return _client
+
+
+def chat_completion(operation: str, **kwargs):
+    """Run a chat completion and record its latency, tokens and failures."""
+    started = time.perf_counter()
+    try:
+        response = get_client().chat.completions.create(**kwargs)
+    except Exception:
+        LLM_ERRORS.inc(operation=operation)
+        raise
+    finally:
+        LLM_REQUEST_SECONDS.observe(time.perf_counter() - started, operation=operation)
+    if response.usage is not None:
+        LLM_TOKENS.inc(response.usage.prompt_tokens or 0, operation=operation, kind='prompt')
+        LLM_TOKENS.inc(response.usage.completion_tokens or 0, operation=operation, kind='completion')
+    return response
+
+
+def stream_chat_completion(operation: str, **kwargs) -> Iterator[str]:
+    """Yield the content deltas of a streamed chat completion.
+
+    Records the same metrics as chat_completion plus the time to the first
+    token.
+    """
+    started = time.perf_counter()
+    first = True
+    try:
+        stream = get_client().chat.completions.create(
+            stream=True, stream_options={'include_usage': True}, **kwargs
+        )
+        for chunk in stream:
+            if chunk.usage is not None:
+                LLM_TOKENS.inc(chunk.usage.prompt_tokens or 0, operation=operation, kind='prompt')
+                LLM_TOKENS.inc(chunk.usage.completion_tokens or 0, operation=operation, kind='completion')
+            if not chunk.choices or not chunk.choices[0].delta.content:
+                continue
+            if first:
+                LLM_FIRST_TOKEN_SECONDS.observe(time.perf_counter() - started, operation=operation)
+                first = False
+            yield chunk.choices[0].delta.content
+    except Exception:
+        LLM_ERRORS.inc(operation=operation)
+        raise
+    finally:
+        LLM_REQUEST_SECONDS.observe(time.perf_counter() - started, operation=operation)
+
+
+def response_format(name: str, schema: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    if schema is None or os.environ.get('LLM_JSON_SCHEMA', '1') == '0':
+        return {'type': 'json_object'}
+    return {'type': 'json_schema', 'json_schema': {'name': name, 'strict': True, 'schema': schema}}
+
+
+def parse_json_object(content: Optional[str]) -> Dict[str, Any]:
+    if not content:
+        raise ResponseFormatError("empty reply")
+    try:
+        data = json.loads(content)
+    except ValueError as e:
+        raise ResponseFormatError(f"not JSON ({e})") from None
+    if not isinstance(data, dict):
+        raise ResponseFormatError("expected a JSON object")
+    return data
+
+
+def repair_messages(messages: List[Dict[str, str]], content: Optional[str],
+                    error: Exception) -> List[Dict[str, str]]:
+    """``messages`` followed by the invalid reply and a request to correct it."""
+    return list(messages) + [
+        {"role": "assistant", "content": content or ""},
+        {"role": "user", "content": REPAIR_PROMPT.format(error=error)}
+    ]
+
+
+def complete_json(operation: str, messages: List[Dict[str, str]], parse: Callable[[Dict[str, Any]], Any],
+                  model: str, schema: Optional[Dict[str, Any]] = None,
+                  timeout: Optional[float] = None, repairs: int = 1, **kwargs) -> Any:
+    """Request a JSON object and return ``parse(object)``.
+
+    ``parse`` raises ResponseFormatError for invalid content; the model
+    then gets up to ``repairs`` chances to correct its reply. API errors
+    propagate.
+    """
+    messages = list(messages)
+    timeout = DEFAULT_TIMEOUT if timeout is None else timeout
+    for attempt in range(repairs + 1):
+        response = chat_completion(
+            operation, model=model, messages=messages,
+            response_format=response_format(operation, schema), timeout=timeout, **kwargs
+        )
+        choice = response.choices[0]
+        content = choice.message.content
+        try:
+            if choice.finish_reason == 'length':
+                raise ResponseFormatError("reply was cut off at the token limit")
+            return parse(parse_json_object(content))
+        except ResponseFormatError as e:
+            LLM_INVALID_RESPONSES.inc(operation=operation)
+            if attempt == repairs:
+                raise
+            LLM_RETRIES.inc(operation=operation)
+            messages = repair_messages(messages, content, e)
+
+
+# Field validators for parse functions
+
+def expect_str(data: Dict[str, Any], key: str) -> str:
+    value = data.get(key)
+    if not isinstance(value, str) or not value.strip():
+        raise ResponseFormatError(f"{key} must be a non-empty string")
+    return value.strip()
+
+
+def expect_int(data: Dict[str, Any], key: str, low: int, high: int) -> int:
+    value = data.get(key)
+    # JSON has a single number type: accept 4.0, but not 4.5, "4" or true
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    if isinstance(value, bool) or not isinstance(value, int) or not low <= value <= high:
+        raise ResponseFormatError(f"{key} must be an integer from {low} to {high}")
+    return value
+
+
+def expect_str_list(data: Dict[str, Any], key: str) -> List[str]:
+    value = data.get(key)
+    if not isinstance(value, list) or not all(isinstance(item, str) for item in value):
+        raise ResponseFormatError(f"{key} must be a list of strings")
+    return [item.strip() for item in value if item.strip()]
+
+
+def object_schema(properties: Dict[str, Any]) -> Dict[str, Any]:
+    """JSON schema for an object with exactly these (all required) properties."""
+    return {
+        'type': 'object',
+        'properties': properties,
+        'required': list(properties),
+        'additionalProperties': False
+    }
@@ -0,0 +1,147 @@
+import json
+import logging
+import os
+import re
+import threading
+import time
+from typing import Dict, List, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SAFETY_KEYWORDS = {
+    'alignment': [
+        'misaligned', 'value alignment', 'goal alignment',
+        'ethical concerns', 'safety concerns'
+    ],
+    'risks': [
+        'catastrophic risk', 'existential risk', 'safety risk',
+        'unintended consequences', 'control problem'
+    ],
+    'behavior': [
+        'unexpected behavior', 'harmful behavior', 'deceptive',
+        'manipulation', 'adversarial'
+    ]
+}
+
+_END = ''
+
+
+def _normalize_keyword(keyword: str) -> str:
+    return ' '.join(keyword.lower().split())
+
+
+def _trie_pattern(node: Dict[str, Any]) -> str:
+    """Render a character trie as a regex with shared prefixes factored out.
+
+    Factoring prefixes keeps matching cost at each text position bounded by
+    the keyword length rather than the number of keywords.
+    """
+    branches = []
+    for char, child in sorted((k, v) for k, v in node.items() if k != _END):
+        # A space in a keyword matches any run of whitespace in the text
+        branches.append((r'\s+' if char == ' ' else re.escape(char)) + _trie_pattern(child))
+    if not branches:
+        return ''
+    if len(branches) == 1 and _END not in node:
+        return branches[0]
+    pattern = '(?:' + '|'.join(branches) + ')'
+    return pattern + '?' if _END in node else pattern
+
+
+class KeywordMatcher:
+    """Single-pass, word-boundary keyword matcher over a category taxonomy.
+
+    All keywords are compiled into one trie-shaped regex, so a text is
+    scanned once regardless of how many keywords the taxonomy holds. At
+    each position the longest keyword wins.
+    """
+
+    def __init__(self, taxonomy: Dict[str, List[str]], version: int = 0):
+        self.taxonomy = {category: list(keywords) for category, keywords in taxonomy.items()}
+        self.version = version
+        # normalized keyword -> [(category, keyword as written)]
+        self._lookup: Dict[str, List[tuple]] = {}
+        trie: Dict[str, Any] = {}
+        for category, keywords in self.taxonomy.items():
+            for keyword in keywords:
+                normalized = _normalize_keyword(keyword)
+                if not normalized:
+                    continue
+                self._lookup.setdefault(normalized, []).append((category, keyword))
+                node = trie
+                for char in normalized:
+                    node = node.setdefault(char, {})
+                node[_END] = {}
+        body = _trie_pattern(trie)
+        self._pattern = re.compile(rf'(?<!\w)(?:{body})(?!\w)', re.IGNORECASE) if body else None
+
+    def find(self, text: str) -> List[Dict[str, Any]]:
+        """Every keyword occurrence with its category and character span."""
+        if self._pattern is None or not text:
+            return []
+        matches = []
+        for match in self._pattern.finditer(text):
+            for category, keyword in self._lookup.get(_normalize_keyword(match.group()), []):
+                matches.append({
+                    'category': category,
+                    'keyword': keyword,
+                    'start': match.start(),
+                    'end': match.end()
+                })
+        return matches
+
+
+class TaxonomyLoader:
+    """Keeps a KeywordMatcher in sync with an optional JSON taxonomy file.
+
+    The file (``{"category": ["keyword", ...]}``) is re-read when its
+    modification time changes, checked at most every ``check_interval``
+    seconds; the matcher is rebuilt only when the file actually changed.
+    """
+
+    def __init__(self, path: Optional[str] = None, check_interval: float = 5.0):
+        self.path = path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._mtime: Optional[float] = None
+        self._checked_at = 0.0
+        self._matcher = KeywordMatcher(DEFAULT_SAFETY_KEYWORDS)
+
+    def _maybe_reload(self):
+        now = time.monotonic()
+        if not self.path or now - self._checked_at < self.check_interval:
+            return
+        self._checked_at = now
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return
+        if mtime == self._mtime:
+            return
+        try:
+            with open(self.path) as f:
+                taxonomy = json.load(f)
+            self._matcher = KeywordMatcher(taxonomy, version=self._matcher.version + 1)
+            self._mtime = mtime
+        except (OSError, ValueError, AttributeError) as e:
+            # Keep serving the previous taxonomy if the new file is bad
+            logger.warning("Could not load keyword taxonomy %s: %s", self.path, e)
+
+    def get_matcher(self) -> KeywordMatcher:
+        with self._lock:
+            self._maybe_reload()
+            return self._matcher
+
+
+_loader: Optional[TaxonomyLoader] = None
+_loader_lock = threading.Lock()
+
+
+def get_matcher() -> KeywordMatcher:
+    """Process-wide matcher for SAFETY_KEYWORDS_FILE, or the built-in taxonomy."""
+    global _loader
+    if _loader is None:
+        with _loader_lock:
+            if _loader is None:
+                _loader = TaxonomyLoader(os.environ.get('SAFETY_KEYWORDS_FILE'))
+    return _loader.get_matcher()
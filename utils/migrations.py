@@ -0,0 +1,559 @@
+import logging
+import threading
+import psycopg2
+from psycopg2 import errorcodes
+
+logger = logging.getLogger(__name__)
+
+# Ordered list of (version, description, sql). Append new migrations at the
+# end with the next version number; never edit one that has shipped.
+MIGRATIONS = [
+    (1, "create feedback table", """
+        CREATE TABLE IF NOT EXISTS feedback (
+            id SERIAL PRIMARY KEY,
+            title TEXT NOT NULL,
+            description TEXT NOT NULL,
+            priority INTEGER NOT NULL,
+            ai_priority INTEGER,
+            safety_category TEXT,
+            reasoning TEXT,
+            key_concerns TEXT[],
+            tags TEXT[],
+            safety_flag BOOLEAN DEFAULT FALSE,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            upvotes INTEGER DEFAULT 0
+        )
+    """),
+    (2, "index feedback keyset ordering", """
+        CREATE INDEX IF NOT EXISTS feedback_created_at_id_idx
+            ON feedback (created_at DESC, id DESC)
+    """),
+    (3, "index feedback filter columns", """
+        CREATE INDEX IF NOT EXISTS feedback_priority_created_at_idx
+            ON feedback (priority, created_at DESC);
+        CREATE INDEX IF NOT EXISTS feedback_safety_created_at_idx
+            ON feedback (created_at DESC) WHERE safety_flag;
+        CREATE INDEX IF NOT EXISTS feedback_tags_gin_idx
+            ON feedback USING GIN (tags);
+    """),
+    # The priority >= 4 threshold mirrors utils.aggregation.HIGH_PRIORITY_THRESHOLD.
+    (4, "add feedback rollup tables", """
+        CREATE TABLE IF NOT EXISTS feedback_daily_stats (
+            day DATE PRIMARY KEY,
+            feedback_count BIGINT NOT NULL DEFAULT 0,
+            high_priority_count BIGINT NOT NULL DEFAULT 0,
+            safety_count BIGINT NOT NULL DEFAULT 0,
+            priority_sum BIGINT NOT NULL DEFAULT 0
+        );
+        CREATE TABLE IF NOT EXISTS feedback_priority_stats (
+            priority INTEGER PRIMARY KEY,
+            feedback_count BIGINT NOT NULL DEFAULT 0
+        );
+        CREATE TABLE IF NOT EXISTS feedback_tag_stats (
+            tag TEXT PRIMARY KEY,
+            feedback_count BIGINT NOT NULL DEFAULT 0
+        );
+
+        CREATE OR REPLACE FUNCTION feedback_rollup_apply(
+            p_created_at TIMESTAMP, p_priority INTEGER, p_safety_flag BOOLEAN,
+            p_tags TEXT[], delta INTEGER
+        ) RETURNS void AS $$
+        BEGIN
+            INSERT INTO feedback_daily_stats AS s
+                (day, feedback_count, high_priority_count, safety_count, priority_sum)
+            VALUES (
+                p_created_at::date, delta,
+                CASE WHEN p_priority >= 4 THEN delta ELSE 0 END,
+                CASE WHEN p_safety_flag THEN delta ELSE 0 END,
+                p_priority * delta
+            )
+            ON CONFLICT (day) DO UPDATE SET
+                feedback_count = s.feedback_count + EXCLUDED.feedback_count,
+                high_priority_count = s.high_priority_count + EXCLUDED.high_priority_count,
+                safety_count = s.safety_count + EXCLUDED.safety_count,
+                priority_sum = s.priority_sum + EXCLUDED.priority_sum;
+
+            INSERT INTO feedback_priority_stats AS s (priority, feedback_count)
+            VALUES (p_priority, delta)
+            ON CONFLICT (priority) DO UPDATE SET
+                feedback_count = s.feedback_count + EXCLUDED.feedback_count;
+
+            INSERT INTO feedback_tag_stats AS s (tag, feedback_count)
+            SELECT tag, count(*) * delta FROM unnest(p_tags) AS tag GROUP BY tag
+            ON CONFLICT (tag) DO UPDATE SET
+                feedback_count = s.feedback_count + EXCLUDED.feedback_count;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        CREATE OR REPLACE FUNCTION feedback_rollup_trigger() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                PERFORM feedback_rollup_apply(OLD.created_at, OLD.priority, OLD.safety_flag, OLD.tags, -1);
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                PERFORM feedback_rollup_apply(NEW.created_at, NEW.priority, NEW.safety_flag, NEW.tags, 1);
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        -- Upvotes do not affect any rollup, so vote UPDATEs skip the trigger
+        DROP TRIGGER IF EXISTS feedback_rollup ON feedback;
+        CREATE TRIGGER feedback_rollup
+            AFTER INSERT OR DELETE OR UPDATE OF created_at, priority, safety_flag, tags
+            ON feedback FOR EACH ROW EXECUTE FUNCTION feedback_rollup_trigger();
+
+        -- Recompute every rollup from scratch; blocks writers while it runs
+        CREATE OR REPLACE FUNCTION feedback_rollup_rebuild() RETURNS void AS $$
+        BEGIN
+            LOCK TABLE feedback IN SHARE MODE;
+            TRUNCATE feedback_daily_stats, feedback_priority_stats, feedback_tag_stats;
+            INSERT INTO feedback_daily_stats
+                (day, feedback_count, high_priority_count, safety_count, priority_sum)
+            SELECT created_at::date, count(*),
+                   count(*) FILTER (WHERE priority >= 4),
+                   count(*) FILTER (WHERE safety_flag),
+                   sum(priority)
+            FROM feedback GROUP BY 1;
+            INSERT INTO feedback_priority_stats (priority, feedback_count)
+            SELECT priority, count(*) FROM feedback GROUP BY 1;
+            INSERT INTO feedback_tag_stats (tag, feedback_count)
+            SELECT tag, count(*) FROM feedback, unnest(tags) AS tag GROUP BY 1;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        SELECT feedback_rollup_rebuild();
+    """),
+    (5, "add analysis job queue", """
+        -- NULL: no AI analysis requested; otherwise pending/complete/failed
+        ALTER TABLE feedback ADD COLUMN IF NOT EXISTS analysis_status TEXT;
+        UPDATE feedback SET analysis_status = 'complete'
+            WHERE analysis_status IS NULL AND ai_priority IS NOT NULL;
+
+        CREATE TABLE IF NOT EXISTS analysis_jobs (
+            id BIGSERIAL PRIMARY KEY,
+            feedback_id INTEGER NOT NULL REFERENCES feedback (id) ON DELETE CASCADE,
+            status TEXT NOT NULL DEFAULT 'queued',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            run_after TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            locked_at TIMESTAMP,
+            last_error TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        CREATE INDEX IF NOT EXISTS analysis_jobs_ready_idx
+            ON analysis_jobs (run_after) WHERE status = 'queued';
+        CREATE INDEX IF NOT EXISTS analysis_jobs_running_idx
+            ON analysis_jobs (locked_at) WHERE status = 'running';
+        CREATE INDEX IF NOT EXISTS analysis_jobs_feedback_idx
+            ON analysis_jobs (feedback_id);
+    """),
+    (6, "add shared LLM result cache", """
+        CREATE UNLOGGED TABLE IF NOT EXISTS llm_cache (
+            key TEXT PRIMARY KEY,
+            value JSONB NOT NULL,
+            expires_at TIMESTAMP NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS llm_cache_expires_at_idx ON llm_cache (expires_at);
+    """),
+    (7, "add bulk import checkpoints", """
+        CREATE TABLE IF NOT EXISTS import_checkpoints (
+            source TEXT PRIMARY KEY,
+            position BIGINT NOT NULL DEFAULT 0,
+            inserted BIGINT NOT NULL DEFAULT 0,
+            rejected BIGINT NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+    """),
+    (8, "add append-only vote log", """
+        CREATE TABLE IF NOT EXISTS feedback_votes (
+            id BIGSERIAL PRIMARY KEY,
+            feedback_id INTEGER NOT NULL REFERENCES feedback (id) ON DELETE CASCADE,
+            voter_id TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            applied BOOLEAN NOT NULL DEFAULT FALSE,
+            UNIQUE (feedback_id, voter_id)
+        );
+        CREATE INDEX IF NOT EXISTS feedback_votes_pending_idx
+            ON feedback_votes (feedback_id) WHERE NOT applied;
+    """),
+    (9, "add full-text search vector", """
+        -- array_to_string is only STABLE, so generated columns need this
+        -- IMMUTABLE wrapper; the 'english' config is fixed, which makes it safe.
+        CREATE OR REPLACE FUNCTION feedback_search_document(
+            title TEXT, description TEXT, reasoning TEXT, key_concerns TEXT[]
+        ) RETURNS tsvector AS $$
+            SELECT setweight(to_tsvector('english', coalesce(title, '')), 'A')
+                || setweight(to_tsvector('english', coalesce(description, '')), 'B')
+                || setweight(to_tsvector('english', coalesce(reasoning, '')), 'C')
+                || setweight(to_tsvector('english', coalesce(array_to_string(key_concerns, ' '), '')), 'C')
+        $$ LANGUAGE sql IMMUTABLE PARALLEL SAFE;
+
+        ALTER TABLE feedback ADD COLUMN IF NOT EXISTS search_vector tsvector
+            GENERATED ALWAYS AS (
+                feedback_search_document(title, description, reasoning, key_concerns)
+            ) STORED;
+        CREATE INDEX IF NOT EXISTS feedback_search_idx ON feedback USING GIN (search_vector);
+    """),
+    (10, "add near-duplicate signatures", """
+        -- MinHash signature of title + description (see utils.dedup);
+        -- existing rows are signed by `python -m utils.dedup backfill`
+        ALTER TABLE feedback ADD COLUMN IF NOT EXISTS minhash BYTEA;
+        CREATE INDEX IF NOT EXISTS feedback_unsigned_idx ON feedback (id) WHERE minhash IS NULL;
+    """),
+    (11, "add feedback data version counter", """
+        -- Bumped once per writing statement. Sequences are non-transactional,
+        -- so concurrent writers never wait on each other for it.
+        CREATE SEQUENCE IF NOT EXISTS feedback_change_seq;
+
+        CREATE OR REPLACE FUNCTION feedback_bump_version() RETURNS trigger AS $$
+        BEGIN
+            PERFORM nextval('feedback_change_seq');
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        DROP TRIGGER IF EXISTS feedback_data_version ON feedback;
+        CREATE TRIGGER feedback_data_version
+            AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON feedback
+            FOR EACH STATEMENT EXECUTE FUNCTION feedback_bump_version();
+    """),
+    (12, "add feedback row versions", """
+        -- Stamped on insert and on updates of the analytics columns, so the
+        -- in-memory snapshot (utils.snapshot) can fetch only changed rows.
+        -- Rows written before this migration keep NULL; full loads read them.
+        CREATE SEQUENCE IF NOT EXISTS feedback_row_version_seq;
+        ALTER TABLE feedback ADD COLUMN IF NOT EXISTS row_version BIGINT;
+
+        CREATE OR REPLACE FUNCTION feedback_set_row_version() RETURNS trigger AS $$
+        BEGIN
+            NEW.row_version := nextval('feedback_row_version_seq');
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        DROP TRIGGER IF EXISTS feedback_row_version ON feedback;
+        CREATE TRIGGER feedback_row_version
+            BEFORE INSERT OR UPDATE OF priority, ai_priority, tags, safety_flag, created_at, upvotes
+            ON feedback
+            FOR EACH ROW EXECUTE FUNCTION feedback_set_row_version();
+        CREATE INDEX IF NOT EXISTS feedback_row_version_idx ON feedback (row_version);
+    """),
+    (13, "notify other processes of feedback changes", """
+        -- Same version bump as migration 11, now also sent to LISTENers on
+        -- feedback_changes (delivered at commit; see utils.events)
+        CREATE OR REPLACE FUNCTION feedback_bump_version() RETURNS trigger AS $$
+        BEGIN
+            PERFORM pg_notify('feedback_changes', nextval('feedback_change_seq')::text);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+    """),
+    # Postgres has no in-place conversion to a partitioned table, so the
+    # table is rebuilt: rename, create the partitioned parent, copy, drop.
+    # A partitioned table's unique keys must include the partition column,
+    # so the primary key becomes (id, created_at); ids still come from the
+    # same sequence. Foreign keys need a unique id, so analysis_jobs and
+    # feedback_votes lose theirs; utils.partitions deletes their rows when
+    # a partition is archived.
+    (14, "partition feedback by month", """
+        DO $$
+        BEGIN
+            IF current_setting('server_version_num')::int < 130000 THEN
+                RAISE EXCEPTION 'Partitioned feedback needs PostgreSQL 13 or later';
+            END IF;
+        END;
+        $$;
+
+        LOCK TABLE feedback IN ACCESS EXCLUSIVE MODE;
+        ALTER TABLE analysis_jobs DROP CONSTRAINT IF EXISTS analysis_jobs_feedback_id_fkey;
+        ALTER TABLE feedback_votes DROP CONSTRAINT IF EXISTS feedback_votes_feedback_id_fkey;
+        ALTER TABLE feedback RENAME TO feedback_unpartitioned;
+        ALTER SEQUENCE feedback_id_seq OWNED BY NONE;
+
+        CREATE TABLE feedback (
+            id INTEGER NOT NULL DEFAULT nextval('feedback_id_seq'),
+            title TEXT NOT NULL,
+            description TEXT NOT NULL,
+            priority INTEGER NOT NULL,
+            ai_priority INTEGER,
+            safety_category TEXT,
+            reasoning TEXT,
+            key_concerns TEXT[],
+            tags TEXT[],
+            safety_flag BOOLEAN DEFAULT FALSE,
+            created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            upvotes INTEGER DEFAULT 0,
+            analysis_status TEXT,
+            search_vector tsvector GENERATED ALWAYS AS (
+                feedback_search_document(title, description, reasoning, key_concerns)
+            ) STORED,
+            minhash BYTEA,
+            row_version BIGINT,
+            PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at);
+        ALTER SEQUENCE feedback_id_seq OWNED BY feedback.id;
+
+        -- Catches rows outside every monthly partition until
+        -- feedback_ensure_partitions gives them one
+        CREATE TABLE feedback_default PARTITION OF feedback DEFAULT;
+
+        -- Create the partition for the month starting at p_month (named
+        -- feedback_yYYYYmMM), first moving that month's rows out of the
+        -- default partition. Returns false if it already exists.
+        CREATE OR REPLACE FUNCTION feedback_create_partition(p_month DATE) RETURNS boolean AS $$
+        DECLARE
+            month_start DATE := date_trunc('month', p_month)::date;
+            month_end DATE := (date_trunc('month', p_month) + interval '1 month')::date;
+            part TEXT := format('feedback_y%sm%s', to_char(p_month, 'YYYY'), to_char(p_month, 'MM'));
+            columns TEXT;
+        BEGIN
+            IF to_regclass(part) IS NOT NULL THEN
+                RETURN FALSE;
+            END IF;
+            IF EXISTS (SELECT 1 FROM feedback_default
+                       WHERE created_at >= month_start AND created_at < month_end) THEN
+                -- Generated columns are recomputed on the way back in
+                SELECT string_agg(quote_ident(attname), ', ' ORDER BY attnum) INTO columns
+                FROM pg_attribute
+                WHERE attrelid = 'feedback'::regclass AND attnum > 0
+                  AND NOT attisdropped AND attgenerated = '';
+                DROP TABLE IF EXISTS pg_temp.feedback_moving;
+                EXECUTE format('CREATE TEMP TABLE feedback_moving ON COMMIT DROP AS '
+                               'SELECT %s FROM feedback_default WITH NO DATA', columns);
+                EXECUTE format(
+                    'WITH moved AS (DELETE FROM feedback_default '
+                    'WHERE created_at >= %L AND created_at < %L RETURNING %s) '
+                    'INSERT INTO feedback_moving SELECT * FROM moved', month_start, month_end, columns);
+                EXECUTE format('CREATE TABLE %I PARTITION OF feedback FOR VALUES FROM (%L) TO (%L)',
+                               part, month_start, month_end);
+                EXECUTE format('INSERT INTO feedback (%s) SELECT %s FROM feedback_moving',
+                               columns, columns);
+                DROP TABLE feedback_moving;
+            ELSE
+                EXECUTE format('CREATE TABLE %I PARTITION OF feedback FOR VALUES FROM (%L) TO (%L)',
+                               part, month_start, month_end);
+            END IF;
+            RETURN TRUE;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        -- Partitions for this month and the next months_ahead, plus any month
+        -- with rows in the default partition. Returns how many were created.
+        CREATE OR REPLACE FUNCTION feedback_ensure_partitions(months_ahead INTEGER) RETURNS integer AS $$
+        DECLARE
+            month DATE;
+            created INTEGER := 0;
+        BEGIN
+            -- Concurrent callers would race on CREATE TABLE
+            PERFORM pg_advisory_xact_lock(7263502);
+            FOR month IN
+                SELECT DISTINCT date_trunc('month', created_at)::date FROM feedback_default
+                UNION
+                SELECT (date_trunc('month', LOCALTIMESTAMP) + make_interval(months => n))::date
+                FROM generate_series(0, months_ahead) AS n
+                ORDER BY 1
+            LOOP
+                IF feedback_create_partition(month) THEN
+                    created := created + 1;
+                END IF;
+            END LOOP;
+            RETURN created;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        SELECT feedback_create_partition(month::date)
+        FROM generate_series(
+            date_trunc('month', (SELECT coalesce(min(created_at), LOCALTIMESTAMP) FROM feedback_unpartitioned)),
+            date_trunc('month', LOCALTIMESTAMP) + interval '3 months',
+            interval '1 month'
+        ) AS month;
+
+        -- Copied before the triggers exist: rollups and row versions carry over
+        INSERT INTO feedback (
+            id, title, description, priority, ai_priority, safety_category, reasoning,
+            key_concerns, tags, safety_flag, created_at, upvotes, analysis_status,
+            minhash, row_version
+        )
+        SELECT id, title, description, priority, ai_priority, safety_category, reasoning,
+               key_concerns, tags, safety_flag, coalesce(created_at, LOCALTIMESTAMP), upvotes,
+               analysis_status, minhash, row_version
+        FROM feedback_unpartitioned;
+        DROP TABLE feedback_unpartitioned;
+
+        CREATE INDEX feedback_created_at_id_idx ON feedback (created_at DESC, id DESC);
+        CREATE INDEX feedback_priority_created_at_idx ON feedback (priority, created_at DESC);
+        CREATE INDEX feedback_safety_created_at_idx ON feedback (created_at DESC) WHERE safety_flag;
+        CREATE INDEX feedback_tags_gin_idx ON feedback USING GIN (tags);
+        CREATE INDEX feedback_search_idx ON feedback USING GIN (search_vector);
+        CREATE INDEX feedback_unsigned_idx ON feedback (id) WHERE minhash IS NULL;
+        CREATE INDEX feedback_row_version_idx ON feedback (row_version);
+
+        CREATE TRIGGER feedback_rollup
+            AFTER INSERT OR DELETE OR UPDATE OF created_at, priority, safety_flag, tags
+            ON feedback FOR EACH ROW EXECUTE FUNCTION feedback_rollup_trigger();
+        CREATE TRIGGER feedback_data_version
+            AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON feedback
+            FOR EACH STATEMENT EXECUTE FUNCTION feedback_bump_version();
+        CREATE TRIGGER feedback_row_version
+            BEFORE INSERT OR UPDATE OF priority, ai_priority, tags, safety_flag, created_at, upvotes
+            ON feedback
+            FOR EACH ROW EXECUTE FUNCTION feedback_set_row_version();
+
+        -- Detach the partition for p_month and take its rows out of the
+        -- rollups, analysis_jobs and feedback_votes. The detached table is
+        -- left for utils.partitions to archive and drop.
+        CREATE OR REPLACE FUNCTION feedback_detach_partition(p_month DATE) RETURNS text AS $$
+        DECLARE
+            part TEXT := format('feedback_y%sm%s', to_char(p_month, 'YYYY'), to_char(p_month, 'MM'));
+        BEGIN
+            -- Holds an exclusive lock on feedback until commit, so no row
+            -- can reach the month's range before the rollups are adjusted
+            EXECUTE format('ALTER TABLE feedback DETACH PARTITION %I', part);
+            EXECUTE format($q$
+                UPDATE feedback_daily_stats s SET
+                    feedback_count = s.feedback_count - d.n,
+                    high_priority_count = s.high_priority_count - d.high,
+                    safety_count = s.safety_count - d.safety,
+                    priority_sum = s.priority_sum - d.priority_sum
+                FROM (SELECT created_at::date AS day, count(*) AS n,
+                             count(*) FILTER (WHERE priority >= 4) AS high,
+                             count(*) FILTER (WHERE safety_flag) AS safety,
+                             sum(priority) AS priority_sum
+                      FROM %I GROUP BY 1) d
+                WHERE s.day = d.day
+            $q$, part);
+            EXECUTE format($q$
+                UPDATE feedback_priority_stats s SET feedback_count = s.feedback_count - d.n
+                FROM (SELECT priority, count(*) AS n FROM %I GROUP BY 1) d
+                WHERE s.priority = d.priority
+            $q$, part);
+            EXECUTE format($q$
+                UPDATE feedback_tag_stats s SET feedback_count = s.feedback_count - d.n
+                FROM (SELECT tag, count(*) AS n FROM %I, unnest(tags) AS tag GROUP BY 1) d
+                WHERE s.tag = d.tag
+            $q$, part);
+            EXECUTE format('DELETE FROM analysis_jobs WHERE feedback_id IN (SELECT id FROM %I)', part);
+            EXECUTE format('DELETE FROM feedback_votes WHERE feedback_id IN (SELECT id FROM %I)', part);
+            -- DETACH fires no triggers; bump the data version by hand
+            PERFORM pg_notify('feedback_changes', nextval('feedback_change_seq')::text);
+            RETURN part;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        ANALYZE feedback;
+    """),
+    (15, "clear placeholder near-duplicate signatures", """
+        -- Texts without words used to get one shared signature (every value
+        -- 2^31 - 1) and so matched each other; they now store no signature
+        UPDATE feedback SET minhash = ''::bytea
+            WHERE minhash = decode(repeat('ffffff7f', 64), 'hex');
+    """),
+    (16, "bump the data version only for statements that change rows", """
+        -- Statement triggers also fire for statements that touch no rows,
+        -- e.g. a vote flush with nothing pending. Transition tables show
+        -- whether any row changed; a trigger with transition tables
+        -- handles one event, so there is one per event.
+        CREATE OR REPLACE FUNCTION feedback_bump_version_if_changed() RETURNS trigger AS $$
+        BEGIN
+            IF EXISTS (SELECT 1 FROM changed) THEN
+                PERFORM pg_notify('feedback_changes', nextval('feedback_change_seq')::text);
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        DROP TRIGGER IF EXISTS feedback_data_version ON feedback;
+        CREATE TRIGGER feedback_data_version_insert
+            AFTER INSERT ON feedback REFERENCING NEW TABLE AS changed
+            FOR EACH STATEMENT EXECUTE FUNCTION feedback_bump_version_if_changed();
+        CREATE TRIGGER feedback_data_version_update
+            AFTER UPDATE ON feedback REFERENCING NEW TABLE AS changed
+            FOR EACH STATEMENT EXECUTE FUNCTION feedback_bump_version_if_changed();
+        CREATE TRIGGER feedback_data_version_delete
+            AFTER DELETE ON feedback REFERENCING OLD TABLE AS changed
+            FOR EACH STATEMENT EXECUTE FUNCTION feedback_bump_version_if_changed();
+        -- Transition tables are not available for TRUNCATE
+        CREATE TRIGGER feedback_data_version_truncate
+            AFTER TRUNCATE ON feedback
+            FOR EACH STATEMENT EXECUTE FUNCTION feedback_bump_version();
+    """),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+# Arbitrary application-wide key for pg_advisory_xact_lock
+MIGRATION_LOCK_ID = 7263501
+
+_schema_ready = False
+_schema_lock = threading.Lock()
+
+
+def _current_version(cur) -> int:
+    cur.execute("SELECT coalesce(max(version), 0) FROM schema_version")
+    return cur.fetchone()[0]
+
+
+def _apply_pending(conn) -> list:
+    with conn.cursor() as cur:
+        # Serialize concurrent bootstrappers (other app processes and
+        # replicas) before anything is created; the lock is released at
+        # commit and the loser then finds nothing left to do.
+        cur.execute("SELECT pg_advisory_xact_lock(%s)", (MIGRATION_LOCK_ID,))
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS schema_version (
+                version INTEGER PRIMARY KEY,
+                description TEXT NOT NULL,
+                applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        current = _current_version(cur)
+        applied = []
+        for version, description, sql in MIGRATIONS:
+            if version <= current:
+                continue
+            logger.info("Applying schema migration %s: %s", version, description)
+            cur.execute(sql)
+            cur.execute(
+                "INSERT INTO schema_version (version, description) VALUES (%s, %s)",
+                (version, description)
+            )
+            applied.append(version)
+    conn.commit()
+    return applied
+
+
+def ensure_schema(pool) -> list:
+    """Bring the schema up to LATEST_VERSION, at most once per process.
+
+    When the schema is already current this costs a single read of
+    schema_version and takes no DDL locks. Returns the versions applied.
+    """
+    global _schema_ready
+    if _schema_ready:
+        return []
+    with _schema_lock:
+        if _schema_ready:
+            return []
+        # No statement timeout: a migration may rewrite or index a big table
+        with pool.connection(statement_timeout=0) as conn:
+            try:
+                with conn.cursor() as cur:
+                    current = _current_version(cur)
+                conn.rollback()
+            except psycopg2.Error as e:
+                if e.pgcode != errorcodes.UNDEFINED_TABLE:
+                    raise
+                conn.rollback()
+                current = 0
+            applied = _apply_pending(conn) if current < LATEST_VERSION else []
+        _schema_ready = True
+        return applied
+
+
+if __name__ == "__main__":
+    from utils.instrumentation import configure_logging
+    from utils.pool import get_pool
+    configure_logging()
+    applied = ensure_schema(get_pool())
+    print(f"Applied migrations: {applied}" if applied else f"Schema is current (version {LATEST_VERSION})")
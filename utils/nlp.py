@@ -1,45 +1,138 @@
 import os
-import openai
-from typing import Dict, List, Any
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Dict, List, Any, Iterable, Iterator, Optional, Tuple
+from utils.llm import (
+    ResponseFormatError, complete_json, expect_int, expect_str, expect_str_list, object_schema
+)
+from utils.ratelimit import RateLimiter
+from utils.cache import get_cache, make_key
+from utils.matcher import get_matcher
 
-class SafetyAnalyzer:
-    def __init__(self):
-        openai.api_key = os.environ.get('OPENAI_API_KEY')
-        self.safety_keywords = {
-            'alignment': [
-                'misaligned', 'value alignment', 'goal alignment',
-                'ethical concerns', 'safety concerns'
-            ],
-            'risks': [
-                'catastrophic risk', 'existential risk', 'safety risk',
-                'unintended consequences', 'control problem'
-            ],
-            'behavior': [
-                'unexpected behavior', 'harmful behavior', 'deceptive',
-                'manipulation', 'adversarial'
-            ]
+logger = logging.getLogger(__name__)
+
+# Needs a model with JSON mode; set LLM_JSON_SCHEMA=0 for ones without
+# schema-constrained output
+SAFETY_MODEL = os.environ.get('SAFETY_MODEL', 'gpt-4o')
+# Bump when the analysis prompts change so cached results are not reused
+SAFETY_PROMPT_VERSION = "2"
+SAFETY_TIMEOUT = 30
+SYSTEM_PROMPT = "You are an AI safety expert analyzing feedback for potential risks and safety implications."
+
+BATCH_PROMPT_HEADER = """Analyze each of the following AI safety feedback items and rate its priority (1-5).
+
+Consider for each item:
+1. Immediate safety implications
+2. Potential risks and consequences
+3. Alignment with AI safety goals
+4. Time sensitivity
+5. Scale of impact
+
+Respond with a JSON object {"results": [...]} containing one entry per item with:
+1. id (the item id exactly as given)
+2. priority_score (1-5, where 5 is highest priority)
+3. safety_category (e.g., immediate concern, potential risk, minor issue)
+4. reasoning (brief explanation)
+5. key_concerns (list of main safety implications)
+
+Items:"""
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token)."""
+    return len(text) // 4 + 1
+
+
+@dataclass(frozen=True)
+class SafetyAnalysis:
+    """A validated model analysis of one feedback item."""
+    priority_score: int
+    safety_category: str
+    reasoning: str
+    key_concerns: Tuple[str, ...]
+
+    SCHEMA_PROPERTIES = {
+        'priority_score': {'type': 'integer'},
+        'safety_category': {'type': 'string'},
+        'reasoning': {'type': 'string'},
+        'key_concerns': {'type': 'array', 'items': {'type': 'string'}}
+    }
+
+    @classmethod
+    def from_json(cls, data: Dict[str, Any]) -> 'SafetyAnalysis':
+        if not isinstance(data, dict):
+            raise ResponseFormatError("analysis must be a JSON object")
+        return cls(
+            priority_score=expect_int(data, 'priority_score', 1, 5),
+            safety_category=expect_str(data, 'safety_category'),
+            reasoning=expect_str(data, 'reasoning'),
+            key_concerns=tuple(expect_str_list(data, 'key_concerns'))
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'priority_score': self.priority_score,
+            'safety_category': self.safety_category,
+            'reasoning': self.reasoning,
+            'key_concerns': list(self.key_concerns)
         }
 
+
+SAFETY_ANALYSIS_SCHEMA = object_schema(SafetyAnalysis.SCHEMA_PROPERTIES)
+BATCH_ANALYSIS_SCHEMA = object_schema({
+    'results': {
+        'type': 'array',
+        'items': object_schema({'id': {'type': 'string'}, **SafetyAnalysis.SCHEMA_PROPERTIES})
+    }
+})
+
+
+def parse_batch_results(data: Dict[str, Any]) -> Dict[str, SafetyAnalysis]:
+    """Map item id to analysis for a batch reply; any invalid entry rejects the reply."""
+    results = data.get('results')
+    if not isinstance(results, list):
+        raise ResponseFormatError("results must be a list")
+    by_id = {}
+    for result in results:
+        if not isinstance(result, dict) or result.get('id') is None:
+            raise ResponseFormatError("each result needs an id")
+        by_id[str(result['id'])] = SafetyAnalysis.from_json(result)
+    return by_id
+
+
+class SafetyAnalyzer:
+    @property
+    def safety_keywords(self) -> Dict[str, List[str]]:
+        return get_matcher().taxonomy
+
     def analyze_text(self, text: str) -> Dict[str, Any]:
-        """Perform basic keyword-based safety analysis."""
-        text = text.lower()
+        """Perform basic keyword-based safety analysis.
+
+        ``flags`` lists each matched (category, keyword) once, at its first
+        occurrence; ``matches`` lists every occurrence with its span.
+        """
+        matches = get_matcher().find(text)
         flags = []
-        
-        for category, keywords in self.safety_keywords.items():
-            for keyword in keywords:
-                if keyword.lower() in text:
-                    flags.append({
-                        'category': category,
-                        'keyword': keyword
-                    })
+        seen = set()
+        for match in matches:
+            if (match['category'], match['keyword']) not in seen:
+                seen.add((match['category'], match['keyword']))
+                flags.append(match)
         
         return {
             'is_safety_concern': len(flags) > 0,
-            'flags': flags
+            'flags': flags,
+            'matches': matches
         }
 
-    def get_ai_safety_score(self, title: str, description: str) -> Dict[str, Any]:
-        """Get AI-powered safety analysis and priority score."""
+    def get_ai_safety_score(self, title: str, description: str, fallback: bool = True) -> Dict[str, Any]:
+        """Get AI-powered safety analysis and priority score.
+
+        With ``fallback=False`` API errors are raised instead of being
+        replaced by the keyword-based analysis, so callers can retry.
+        """
         prompt = f"""Analyze this AI safety feedback and rate its priority (1-5):
 Title: {title}
 Description: {description}
@@ -57,36 +150,155 @@ Provide a JSON response with:
 3. reasoning (brief explanation)
 4. key_concerns (list of main safety implications)"""
 
+        cache = get_cache('safety_analysis')
+        cache_key = self._analysis_cache_key(title, description)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return self._with_keyword_analysis(cached, description)
+
         try:
-            response = openai.ChatCompletion.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": "You are an AI safety expert analyzing feedback for potential risks and safety implications."},
+            analysis = complete_json(
+                'safety_analysis',
+                [
+                    {"role": "system", "content": SYSTEM_PROMPT},
                     {"role": "user", "content": prompt}
                 ],
+                SafetyAnalysis.from_json,
+                model=SAFETY_MODEL,
+                schema=SAFETY_ANALYSIS_SCHEMA,
+                timeout=SAFETY_TIMEOUT,
                 temperature=0.3
-            )
-            
-            # Parse the response
-            analysis = eval(response.choices[0].message.content)
+            ).to_dict()
+            cache.set(cache_key, analysis)
             
             # Add keyword-based analysis
-            basic_analysis = self.analyze_text(description)
-            analysis['keyword_flags'] = basic_analysis['flags']
-            analysis['is_safety_concern'] = basic_analysis['is_safety_concern']
-            
-            return analysis
+            return self._with_keyword_analysis(analysis, description)
         except Exception as e:
+            if not fallback:
+                raise
             # Fallback to basic analysis if AI scoring fails
-            basic_analysis = self.analyze_text(description)
-            return {
-                'priority_score': len(basic_analysis['flags']) + 1,
-                'safety_category': 'automatic_fallback',
-                'reasoning': 'AI analysis failed, using keyword-based scoring',
-                'key_concerns': [flag['category'] for flag in basic_analysis['flags']],
-                'keyword_flags': basic_analysis['flags'],
-                'is_safety_concern': basic_analysis['is_safety_concern']
-            }
+            logger.warning("AI safety analysis failed, using keyword fallback: %s", e)
+            return self.get_fallback_analysis(description)
+
+    def _analysis_cache_key(self, title: str, description: str) -> str:
+        return make_key('safety_analysis', SAFETY_MODEL, SAFETY_PROMPT_VERSION,
+                        {'title': title, 'description': description})
+
+    def _with_keyword_analysis(self, analysis: Dict[str, Any], description: str) -> Dict[str, Any]:
+        """Combine a model result with the (uncached) keyword analysis."""
+        basic_analysis = self.analyze_text(description)
+        return {
+            **analysis,
+            'keyword_flags': basic_analysis['flags'],
+            'is_safety_concern': basic_analysis['is_safety_concern']
+        }
+
+    def get_fallback_analysis(self, description: str) -> Dict[str, Any]:
+        """Keyword-based stand-in used when AI scoring fails."""
+        basic_analysis = self.analyze_text(description)
+        return {
+            'priority_score': len(basic_analysis['flags']) + 1,
+            'safety_category': 'automatic_fallback',
+            'reasoning': 'AI analysis failed, using keyword-based scoring',
+            'key_concerns': [flag['category'] for flag in basic_analysis['flags']],
+            'keyword_flags': basic_analysis['flags'],
+            'is_safety_concern': basic_analysis['is_safety_concern']
+        }
+
+    def _pack_batches(self, items: List[Tuple[Any, str, str]], batch_size: int,
+                      max_batch_tokens: int) -> List[List[Tuple[Any, str, str]]]:
+        """Group items greedily so each request stays under both limits."""
+        batches = []
+        current = []
+        current_tokens = estimate_tokens(BATCH_PROMPT_HEADER)
+        for item in items:
+            item_tokens = estimate_tokens(item[1]) + estimate_tokens(item[2])
+            if current and (len(current) >= batch_size
+                            or current_tokens + item_tokens > max_batch_tokens):
+                batches.append(current)
+                current = []
+                current_tokens = estimate_tokens(BATCH_PROMPT_HEADER)
+            current.append(item)
+            current_tokens += item_tokens
+        if current:
+            batches.append(current)
+        return batches
+
+    def _analyze_batch(self, batch: List[Tuple[Any, str, str]], limiter: RateLimiter,
+                       max_output_tokens_per_item: int,
+                       fallback: bool = True) -> List[Tuple[Any, Optional[Dict[str, Any]]]]:
+        """Score one packed batch with a single structured-output request."""
+        payload = [
+            {'id': str(key), 'title': title, 'description': description}
+            for key, title, description in batch
+        ]
+        prompt = f"{BATCH_PROMPT_HEADER}\n{json.dumps(payload)}"
+        max_tokens = max_output_tokens_per_item * len(batch)
+        limiter.acquire(estimate_tokens(prompt) + max_tokens)
+
+        by_id = {}
+        try:
+            by_id = complete_json(
+                'safety_analysis_batch',
+                [
+                    {"role": "system", "content": SYSTEM_PROMPT},
+                    {"role": "user", "content": prompt}
+                ],
+                parse_batch_results,
+                model=SAFETY_MODEL,
+                schema=BATCH_ANALYSIS_SCHEMA,
+                timeout=SAFETY_TIMEOUT,
+                temperature=0.3,
+                max_tokens=max_tokens
+            )
+        except Exception as e:
+            logger.warning("Batch analysis request failed: %s", e, extra={'batch_size': len(batch)})
+
+        cache = get_cache('safety_analysis')
+        analyses = []
+        for key, title, description in batch:
+            result = by_id.get(str(key))
+            if result is None:
+                # Missing from the response or the request failed
+                analyses.append((key, self.get_fallback_analysis(description) if fallback else None))
+                continue
+            analysis = result.to_dict()
+            cache.set(self._analysis_cache_key(title, description), analysis)
+            analyses.append((key, self._with_keyword_analysis(analysis, description)))
+        return analyses
+
+    def analyze_many(self, items: Iterable[Tuple[Any, str, str]], batch_size: int = 5,
+                     max_workers: int = 4, requests_per_minute: int = 60,
+                     tokens_per_minute: int = 40000, max_batch_tokens: int = 4000,
+                     max_output_tokens_per_item: int = 250,
+                     fallback: bool = True) -> Iterator[Tuple[Any, Optional[Dict[str, Any]]]]:
+        """Analyze many ``(key, title, description)`` items.
+
+        Items are packed several to a request, requests run on a bounded
+        thread pool under the given rate limits, and ``(key, analysis)``
+        pairs are yielded as each request completes. Items the model does
+        not return (including every item of a failed request) get the
+        keyword-based fallback analysis, or None with ``fallback=False``.
+        Cached analyses are yielded first without an API call.
+        """
+        cache = get_cache('safety_analysis')
+        pending = []
+        for key, title, description in items:
+            cached = cache.get(self._analysis_cache_key(title, description))
+            if cached is not None:
+                yield key, self._with_keyword_analysis(cached, description)
+            else:
+                pending.append((key, title, description))
+
+        limiter = RateLimiter(requests_per_minute, tokens_per_minute)
+        batches = self._pack_batches(pending, batch_size, max_batch_tokens)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [
+                executor.submit(self._analyze_batch, batch, limiter, max_output_tokens_per_item, fallback)
+                for batch in batches
+            ]
+            for future in as_completed(futures):
+                yield from future.result()
 
     def get_safety_score(self, text: str) -> float:
         """Legacy method for compatibility."""
@@ -0,0 +1,142 @@
+"""Monthly partitions of the feedback table: creation, retention and archival.
+
+feedback is range-partitioned on created_at into one table per month,
+named feedback_yYYYYmMM (migration 14). SQL queries with a created_at
+window, such as the feedback list under a time range, only scan the months
+it covers; filtered Dashboard aggregates read the in-memory snapshot
+(utils.snapshot) instead unless ANALYTICS_SNAPSHOT=0.
+
+    python -m utils.partitions list               # partitions and row estimates
+    python -m utils.partitions ensure             # create upcoming months
+    python -m utils.partitions retain --months 24 # archive months older than that
+    python -m utils.partitions archive            # finish an interrupted retain
+
+Retention detaches each expired month (adjusting the rollups and removing
+its analysis jobs and votes in the same transaction), writes its rows to
+<archive-dir>/feedback_yYYYYmMM.jsonl.gz and then drops the table. A
+detached table whose export failed is kept and exported by the next run.
+Run `ensure` and `retain` daily from cron; processes also run `ensure` on
+startup.
+"""
+import argparse
+import base64
+import gzip
+import json
+import logging
+import os
+import sys
+from datetime import date, datetime
+from typing import List, Optional
+
+from utils.database import PARTITION_MONTHS_AHEAD, Database
+
+logger = logging.getLogger(__name__)
+
+# Months of feedback kept online; unset keeps everything
+RETENTION_MONTHS = os.environ.get('FEEDBACK_RETENTION_MONTHS')
+ARCHIVE_DIR = os.environ.get('FEEDBACK_ARCHIVE_DIR', 'archive')
+
+
+def partition_month(name: str) -> date:
+    """First day of the month a partition table holds."""
+    return date(int(name[10:14]), int(name[15:17]), 1)
+
+
+def retention_cutoff(months: int, today: Optional[date] = None) -> date:
+    """First day of the oldest month kept when retaining ``months`` months,
+    counting the current one."""
+    today = today or date.today()
+    index = today.year * 12 + today.month - 1 - (months - 1)
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (bytes, memoryview)):
+        return base64.b64encode(bytes(value)).decode('ascii')
+    raise TypeError(f"Cannot archive {type(value).__name__}")
+
+
+def archive_partition(db, name: str, archive_dir: str = ARCHIVE_DIR) -> int:
+    """Write a detached partition to ``<archive_dir>/<name>.jsonl.gz`` and
+    drop it. Returns the number of rows archived."""
+    os.makedirs(archive_dir, exist_ok=True)
+    path = os.path.join(archive_dir, f"{name}.jsonl.gz")
+    partial = path + '.partial'
+    rows = 0
+    with gzip.open(partial, 'wt', encoding='utf-8') as f:
+        for row in db.iter_partition_rows(name):
+            f.write(json.dumps(row, default=_json_default, ensure_ascii=False))
+            f.write('\n')
+            rows += 1
+    # Only a complete file gets the final name, and only then is the table dropped
+    os.replace(partial, path)
+    db.drop_partition(name)
+    logger.info("Archived feedback partition", extra={'partition': name, 'rows': rows, 'path': path})
+    return rows
+
+
+def archive_detached(db, archive_dir: str = ARCHIVE_DIR) -> List[str]:
+    """Archive every detached partition; returns their names."""
+    names = [p['name'] for p in db.get_partitions() if not p['attached']]
+    for name in names:
+        rows = archive_partition(db, name, archive_dir)
+        print(f"Archived {name}: {rows} rows")
+    return names
+
+
+def retain(db, months: int, archive_dir: str = ARCHIVE_DIR, dry_run: bool = False) -> List[str]:
+    """Detach and archive the partitions older than ``months`` months."""
+    if months < 1:
+        raise ValueError("Retention must keep at least the current month")
+    # Give rows parked in the default partition a month first, so they age out too
+    db.ensure_partitions()
+    cutoff = retention_cutoff(months)
+    expired = [p['name'] for p in db.get_partitions()
+               if p['attached'] and partition_month(p['name']) < cutoff]
+    if dry_run:
+        for name in expired:
+            print(f"Would archive {name}")
+        return expired
+    for name in expired:
+        db.detach_partition(partition_month(name))
+        print(f"Detached {name}")
+    archive_detached(db, archive_dir)
+    return expired
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Feedback partition maintenance")
+    parser.add_argument('command', choices=['list', 'ensure', 'retain', 'archive'])
+    parser.add_argument('--months-ahead', type=int, default=PARTITION_MONTHS_AHEAD,
+                        help="ensure: future months to create")
+    parser.add_argument('--months', type=int,
+                        default=int(RETENTION_MONTHS) if RETENTION_MONTHS else None,
+                        help="retain: months to keep, including the current one")
+    parser.add_argument('--archive-dir', default=ARCHIVE_DIR)
+    parser.add_argument('--dry-run', action='store_true', help="retain: only list what would be archived")
+    args = parser.parse_args(argv)
+
+    db = Database()
+    if args.command == 'list':
+        for partition in db.get_partitions():
+            state = 'attached' if partition['attached'] else 'detached'
+            print(f"{partition['name']}  {state:<8}  ~{partition['estimated_rows']} rows")
+    elif args.command == 'ensure':
+        created = db.ensure_partitions(args.months_ahead)
+        print(f"Created {created} partitions")
+    elif args.command == 'retain':
+        if args.months is None:
+            parser.error("retain needs --months or FEEDBACK_RETENTION_MONTHS")
+        expired = retain(db, args.months, args.archive_dir, args.dry_run)
+        if not expired:
+            print("Nothing to archive")
+    else:
+        if not archive_detached(db, args.archive_dir):
+            print("No detached partitions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
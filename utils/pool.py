@@ -0,0 +1,244 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Any, Optional
+
+import psycopg2
+from psycopg2 import extensions
+from psycopg2 import pool as pg_pool
+
+from utils.instrumentation import histogram
+
+POOL_WAIT_SECONDS = histogram('db_pool_wait_seconds', 'Time spent waiting for a pooled connection', ('pool',))
+
+
+def connection_params_from_env() -> Dict[str, str]:
+    """Read the PG* connection settings from the environment."""
+    return {
+        'host': os.environ['PGHOST'],
+        'database': os.environ['PGDATABASE'],
+        'user': os.environ['PGUSER'],
+        'password': os.environ['PGPASSWORD'],
+        'port': os.environ['PGPORT']
+    }
+
+
+class PoolConnection(extensions.connection):
+    """psycopg2 connection that remembers its session-level state.
+
+    ``prepared`` holds the names of the server-side prepared statements
+    created on this session; ``statement_timeout`` is the session's current
+    timeout in milliseconds.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared = set()
+        self.statement_timeout = None
+
+    def set_statement_timeout(self, milliseconds: int):
+        """Set the session's statement_timeout; a no-op when it is unchanged.
+
+        Must be called outside a transaction: the SET runs in autocommit mode
+        so a later rollback cannot undo it.
+        """
+        if milliseconds == self.statement_timeout:
+            return
+        autocommit = self.autocommit
+        self.autocommit = True
+        try:
+            with self.cursor() as cur:
+                cur.execute("SET statement_timeout = %s", (milliseconds,))
+        finally:
+            self.autocommit = autocommit
+        self.statement_timeout = milliseconds
+
+
+class ConnectionPool:
+    """Thread-safe pool of persistent psycopg2 connections.
+
+    Callers block (up to ``checkout_timeout`` seconds) when all ``maxconn``
+    connections are borrowed. Idle connections are pinged before reuse and
+    connections that fail with a connection-level error are discarded
+    instead of being handed to the next caller.
+    """
+
+    def __init__(self, db_params: Dict[str, Any], minconn: int = 1, maxconn: int = 10,
+                 checkout_timeout: float = 30.0, health_check_interval: float = 30.0,
+                 name: str = 'primary'):
+        if minconn < 0 or maxconn < 1 or minconn > maxconn:
+            raise ValueError(f"Invalid pool size: minconn={minconn}, maxconn={maxconn}")
+        self.db_params = db_params
+        self.name = name
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.checkout_timeout = checkout_timeout
+        self.health_check_interval = health_check_interval
+        self._pool = pg_pool.ThreadedConnectionPool(
+            minconn, maxconn, connection_factory=PoolConnection, **db_params
+        )
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self._lock = threading.Lock()
+        self._last_used: Dict[int, float] = {}
+        self._metrics = {
+            'checkouts': 0,
+            'checkout_timeouts': 0,
+            'in_use': 0,
+            'wait_time_total': 0.0,
+            'wait_time_max': 0.0,
+            'health_check_failures': 0,
+            'recycled': 0
+        }
+
+    def _is_healthy(self, conn) -> bool:
+        if conn.closed:
+            return False
+        idle_for = time.monotonic() - self._last_used.get(id(conn), 0.0)
+        if idle_for < self.health_check_interval:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _checkout(self):
+        # A semaphore slot is already held, so getconn() cannot hit the
+        # pool's own "exhausted" error; retry a bounded number of times
+        # in case every idle connection turns out to be stale.
+        for _ in range(self.maxconn + 1):
+            conn = self._pool.getconn()
+            if self._is_healthy(conn):
+                return conn
+            with self._lock:
+                self._metrics['health_check_failures'] += 1
+            self._discard(conn)
+        raise pg_pool.PoolError("Could not obtain a healthy database connection")
+
+    def _discard(self, conn):
+        self._last_used.pop(id(conn), None)
+        self._pool.putconn(conn, close=True)
+        with self._lock:
+            self._metrics['recycled'] += 1
+
+    def _release(self, conn, broken: bool):
+        if not broken and not conn.closed:
+            try:
+                if conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except psycopg2.Error:
+                broken = True
+        if broken or conn.closed:
+            self._discard(conn)
+            return
+        self._last_used[id(conn)] = time.monotonic()
+        self._pool.putconn(conn)
+
+    @contextmanager
+    def connection(self, timeout: Optional[float] = None, statement_timeout: Optional[int] = None):
+        """Borrow a connection for the duration of the ``with`` block.
+
+        Uncommitted work is rolled back when the connection is returned.
+        ``statement_timeout`` (milliseconds, 0 = none) applies to every
+        statement run on it until the next checkout changes it.
+        """
+        timeout = self.checkout_timeout if timeout is None else timeout
+        started = time.perf_counter()
+        if not self._slots.acquire(timeout=timeout):
+            with self._lock:
+                self._metrics['checkout_timeouts'] += 1
+            raise pg_pool.PoolError(f"Timed out after {timeout}s waiting for a database connection")
+
+        conn = None
+        broken = False
+        try:
+            conn = self._checkout()
+            waited = time.perf_counter() - started
+            POOL_WAIT_SECONDS.observe(waited, pool=self.name)
+            with self._lock:
+                self._metrics['checkouts'] += 1
+                self._metrics['in_use'] += 1
+                self._metrics['wait_time_total'] += waited
+                self._metrics['wait_time_max'] = max(self._metrics['wait_time_max'], waited)
+            if statement_timeout is not None:
+                conn.set_statement_timeout(statement_timeout)
+            yield conn
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            broken = True
+            raise
+        finally:
+            if conn is not None:
+                with self._lock:
+                    self._metrics['in_use'] -= 1
+                self._release(conn, broken)
+            self._slots.release()
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Snapshot of checkout counts and wait times."""
+        with self._lock:
+            metrics = dict(self._metrics)
+        checkouts = metrics['checkouts']
+        metrics['wait_time_avg'] = metrics['wait_time_total'] / checkouts if checkouts else 0.0
+        metrics['minconn'] = self.minconn
+        metrics['maxconn'] = self.maxconn
+        return metrics
+
+    def close(self):
+        self._pool.closeall()
+
+
+_pools: Dict[str, ConnectionPool] = {}
+_pool_lock = threading.Lock()
+
+
+def _create_pool(name: str, db_params: Dict[str, Any]) -> ConnectionPool:
+    return ConnectionPool(
+        db_params,
+        minconn=int(os.environ.get('PGPOOL_MINCONN', 1)),
+        maxconn=int(os.environ.get('PGPOOL_MAXCONN', 10)),
+        checkout_timeout=float(os.environ.get('PGPOOL_TIMEOUT', 30)),
+        health_check_interval=float(os.environ.get('PGPOOL_HEALTHCHECK_INTERVAL', 30)),
+        name=name
+    )
+
+
+def get_pool() -> ConnectionPool:
+    """Return the process-wide pool for the primary, creating it on first use.
+
+    Size and timeouts come from PGPOOL_MINCONN, PGPOOL_MAXCONN,
+    PGPOOL_TIMEOUT and PGPOOL_HEALTHCHECK_INTERVAL.
+    """
+    pool = _pools.get('primary')
+    if pool is None:
+        with _pool_lock:
+            pool = _pools.get('primary')
+            if pool is None:
+                pool = _pools['primary'] = _create_pool('primary', connection_params_from_env())
+    return pool
+
+
+def get_replica_pool() -> Optional[ConnectionPool]:
+    """The pool for the read replica in PGREPLICA_DSN (a libpq connection
+    string or URI), or None when no replica is configured. Sized like the
+    primary's pool."""
+    dsn = os.environ.get('PGREPLICA_DSN')
+    if not dsn:
+        return None
+    pool = _pools.get('replica')
+    if pool is None:
+        with _pool_lock:
+            pool = _pools.get('replica')
+            if pool is None:
+                pool = _pools['replica'] = _create_pool('replica', {'dsn': dsn})
+    return pool
+
+
+def close_pool():
+    """Close every pooled connection, e.g. before a forked worker exits."""
+    with _pool_lock:
+        for pool in _pools.values():
+            pool.close()
+        _pools.clear()
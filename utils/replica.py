@@ -0,0 +1,115 @@
+"""Routing of read-only queries between the primary and a read replica.
+
+Reads go to the replica while it is within REPLICA_MAX_LAG seconds of the
+primary and has replayed this process's latest write. Until then, reads go
+to the primary. After a submission, the next page render therefore sees
+the new row even if the replica has not caught up yet. The replica's
+position is checked at most every REPLICA_CHECK_INTERVAL seconds, or more
+often while a write is waiting to be replayed.
+"""
+import logging
+import os
+import threading
+import time
+from typing import Optional
+
+from utils.instrumentation import counter, histogram
+from utils.pool import ConnectionPool
+
+logger = logging.getLogger(__name__)
+
+ROUTED_QUERIES = counter('db_routed_queries_total', 'Read-only queries by the server they ran on', ('target',))
+REPLICA_LAG_SECONDS = histogram(
+    'db_replica_lag_seconds', 'Replica replay lag at each check',
+    buckets=(0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0)
+)
+
+REPLICA_MAX_LAG = float(os.environ.get('REPLICA_MAX_LAG', 5))
+REPLICA_CHECK_INTERVAL = float(os.environ.get('REPLICA_CHECK_INTERVAL', 1))
+# While a write is not yet replayed
+REPLICA_RECHECK_INTERVAL = 0.05
+
+# Replay position and lag; a server that is not in recovery (e.g. a DSN
+# pointing at the primary in development) counts as fully caught up.
+_REPLICA_STATE_QUERY = """
+    SELECT pg_is_in_recovery(),
+           pg_last_wal_replay_lsn()::text,
+           CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+                ELSE extract(epoch FROM now() - pg_last_xact_replay_timestamp())
+           END
+"""
+
+
+def parse_lsn(text: Optional[str]) -> int:
+    """``'16/B374D848'`` as an integer, for comparisons."""
+    if not text:
+        return 0
+    high, low = text.split('/')
+    return (int(high, 16) << 32) + int(low, 16)
+
+
+class ReplicaRouter:
+    def __init__(self, primary: ConnectionPool, replica: Optional[ConnectionPool],
+                 max_lag: float = REPLICA_MAX_LAG, check_interval: float = REPLICA_CHECK_INTERVAL):
+        self.primary = primary
+        self.replica = replica
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self._write_lsn = 0
+        self._replay_lsn = 0
+        self._lag: Optional[float] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self._checking = threading.Lock()
+
+    def pool_for_read(self) -> ConnectionPool:
+        """The pool a read-only query should use now."""
+        if self.replica is None:
+            return self.primary
+        behind = self._replay_lsn < self._write_lsn
+        interval = REPLICA_RECHECK_INTERVAL if behind else self.check_interval
+        if time.monotonic() - self._checked_at >= interval:
+            self._check()
+        with self._lock:
+            usable = (self._lag is not None and self._lag <= self.max_lag
+                      and self._replay_lsn >= self._write_lsn)
+        ROUTED_QUERIES.inc(target='replica' if usable else 'primary')
+        return self.replica if usable else self.primary
+
+    def note_write(self):
+        """Record the primary's WAL position after a committed write."""
+        if self.replica is None:
+            return
+        with self.primary.connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT pg_current_wal_lsn()::text")
+                lsn = parse_lsn(cur.fetchone()[0])
+        with self._lock:
+            self._write_lsn = max(self._write_lsn, lsn)
+
+    def _check(self):
+        # One thread checks; the others route on the previous result
+        if not self._checking.acquire(blocking=False):
+            return
+        try:
+            with self.replica.connection(timeout=1) as conn:
+                with conn.cursor() as cur:
+                    cur.execute(_REPLICA_STATE_QUERY)
+                    in_recovery, replay_lsn, lag = cur.fetchone()
+            with self._lock:
+                if in_recovery:
+                    self._replay_lsn = parse_lsn(replay_lsn)
+                    # No replay timestamp yet means nothing to compare with
+                    self._lag = float(lag) if lag is not None else None
+                else:
+                    self._replay_lsn = self._write_lsn
+                    self._lag = 0.0
+            if self._lag is not None:
+                REPLICA_LAG_SECONDS.observe(self._lag)
+        except Exception as e:
+            logger.warning("Replica check failed; reading from the primary: %s", e)
+            with self._lock:
+                self._lag = None
+        finally:
+            self._checked_at = time.monotonic()
+            self._checking.release()
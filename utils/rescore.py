@@ -0,0 +1,98 @@
+"""Re-score existing feedback with the batch AI analysis API.
+
+    python -m utils.rescore --chunk-size 500 --batch-size 5 --concurrency 4
+"""
+import argparse
+import logging
+import sys
+import time
+from utils.database import Database, FeedbackFilter
+from utils.nlp import SafetyAnalyzer
+from utils.instrumentation import configure_logging
+
+logger = logging.getLogger(__name__)
+
+
+def _analyze_chunk(analyzer, items, retries, batch_options):
+    """``(analyses, failed)`` for one chunk: items whose API request
+    failed are retried up to ``retries`` times, then reported as failed."""
+    analyses = []
+    for attempt in range(retries + 1):
+        by_key = dict(analyzer.analyze_many(items, fallback=False, **batch_options))
+        analyses.extend((key, analysis) for key, analysis in by_key.items() if analysis is not None)
+        items = [item for item in items if by_key.get(item[0]) is None]
+        if not items:
+            break
+        if attempt < retries:
+            logger.warning("Retrying %s items whose analysis failed", len(items))
+    return analyses, [item[0] for item in items]
+
+
+def rescore(db, analyzer, chunk_size=500, only_missing=False, retries=1, **batch_options):
+    """Walk the feedback table newest-first in keyset chunks and re-score it.
+
+    Each chunk is analyzed with ``SafetyAnalyzer.analyze_many`` and written
+    back with one batched UPDATE. Items the API fails to score are retried
+    ``retries`` times and then left unchanged, never overwritten with the
+    keyword fallback. Returns ``(updated, failed)`` row counts.
+    """
+    feedback_filter = FeedbackFilter(unanalyzed_only=only_missing)
+    cursor = None
+    updated = 0
+    failed = 0
+    while True:
+        rows, next_cursor = db.get_feedback_page(
+            limit=chunk_size, cursor=cursor,
+            columns=('id', 'title', 'description'), feedback_filter=feedback_filter,
+            query_class='maintenance'
+        )
+        if not rows:
+            break
+        items = [(row['id'], row['title'], row['description']) for row in rows]
+        analyses, failed_ids = _analyze_chunk(analyzer, items, retries, batch_options)
+        if analyses:
+            db.save_analyses(analyses)
+        updated += len(analyses)
+        failed += len(failed_ids)
+        if failed_ids:
+            logger.warning("Left %s feedback items unchanged after failed analysis",
+                           len(failed_ids), extra={'feedback_ids': failed_ids})
+        logger.info("Re-scored %s feedback items", updated)
+        if next_cursor is None:
+            break
+        # With --only-missing the rows just scored drop out of the filter,
+        # but the cursor still moves past them, so paging stays correct.
+        cursor = next_cursor
+    return updated, failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Re-score feedback with AI safety analysis")
+    parser.add_argument('--chunk-size', type=int, default=500, help="rows fetched and written per round")
+    parser.add_argument('--batch-size', type=int, default=5, help="items packed into one API request")
+    parser.add_argument('--concurrency', type=int, default=4, help="concurrent API requests")
+    parser.add_argument('--rpm', type=int, default=60, help="API requests per minute")
+    parser.add_argument('--tpm', type=int, default=40000, help="API tokens per minute")
+    parser.add_argument('--only-missing', action='store_true', help="skip rows that already have an AI priority")
+    parser.add_argument('--retries', type=int, default=1, help="retries of items whose API request failed")
+    args = parser.parse_args(argv)
+    configure_logging()
+
+    started = time.perf_counter()
+    updated, failed = rescore(
+        Database(), SafetyAnalyzer(),
+        chunk_size=args.chunk_size,
+        only_missing=args.only_missing,
+        retries=args.retries,
+        batch_size=args.batch_size,
+        max_workers=args.concurrency,
+        requests_per_minute=args.rpm,
+        tokens_per_minute=args.tpm
+    )
+    print(f"Done: {updated} items in {time.perf_counter() - started:.1f}s"
+          + (f"; {failed} left unchanged after failed requests" if failed else ""))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
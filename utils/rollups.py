@@ -0,0 +1,38 @@
+"""Maintenance commands for the feedback rollup tables.
+
+    python -m utils.rollups check     # compare rollups against a live scan
+    python -m utils.rollups rebuild   # recompute rollups from feedback
+"""
+import argparse
+import sys
+from utils.database import Database
+
+
+def check_rollups(db) -> list:
+    """Return the aggregate keys where the rollups disagree with a full scan."""
+    from_rollups = db.get_aggregates()
+    from_scan = db.get_aggregates(use_rollups=False)
+    return [key for key in from_rollups if from_rollups[key] != from_scan[key]]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Feedback rollup maintenance")
+    parser.add_argument('command', choices=['check', 'rebuild'])
+    args = parser.parse_args(argv)
+
+    db = Database()
+    if args.command == 'rebuild':
+        db.rebuild_rollups()
+        print("Rollups rebuilt")
+        return 0
+
+    mismatched = check_rollups(db)
+    if mismatched:
+        print(f"Rollups out of date: {', '.join(mismatched)}. Run `python -m utils.rollups rebuild`.")
+        return 1
+    print("Rollups are consistent")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,282 @@
+"""Columnar in-memory snapshot of the feedback analytics columns.
+
+Filtered dashboard aggregates and counts are computed from NumPy arrays
+instead of re-scanning the feedback table for every filter change. The
+snapshot holds no free text; list views fetch titles and descriptions for
+the rows they show (Database.get_feedback_by_ids).
+
+Tags are dictionary-encoded in CSR layout: the tags of row ``i`` are
+``vocabulary[tag_ids[tag_offsets[i]:tag_offsets[i + 1]]]``.
+
+The first use loads every row; later refreshes fetch only the rows whose
+row_version (stamped by a trigger on insert and on analytics-column
+updates) is newer than the snapshot's. Rows committed out of version order
+can be missed by a delta, so the snapshot is reloaded in full when its row
+count disagrees with the rollups or it is older than SNAPSHOT_MAX_AGE
+seconds.
+"""
+import logging
+import os
+import threading
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from utils.aggregation import HIGH_PRIORITY_THRESHOLD, RECENT_WINDOW_DAYS
+from utils.database import FeedbackFilter
+from utils.instrumentation import counter, histogram
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_REFRESH_SECONDS = histogram(
+    'snapshot_refresh_seconds', 'Analytics snapshot refresh time', ('kind',)
+)
+SNAPSHOT_ROWS_LOADED = counter('snapshot_rows_loaded_total', 'Rows fetched into the analytics snapshot', ('kind',))
+
+SNAPSHOT_MAX_AGE = float(os.environ.get('SNAPSHOT_MAX_AGE', 900))
+LOAD_BATCH_SIZE = 50000
+
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+# The int64 value NumPy uses for NaT
+_NAT = np.iinfo(np.int64).min
+
+
+def _timestamps(values, count: int) -> np.ndarray:
+    """datetime64[us] from naive datetimes (None becomes NaT); much faster
+    than letting NumPy convert datetime objects."""
+    return np.fromiter(
+        ((value - _EPOCH) // _MICROSECOND if value is not None else _NAT for value in values),
+        np.int64, count
+    ).view('datetime64[us]')
+
+
+class FeedbackSnapshot:
+    """Immutable column arrays for the feedback rows, ordered by id.
+
+    ``ai_priority`` uses 0 for "not analyzed yet"; ``created_at`` is NaT
+    where the row has no timestamp.
+    """
+
+    def __init__(self, ids, priority, ai_priority, safety_flag, created_at, upvotes,
+                 tag_offsets, tag_ids, vocabulary: List[str], row_version: int):
+        self.ids = ids
+        self.priority = priority
+        self.ai_priority = ai_priority
+        self.safety_flag = safety_flag
+        self.created_at = created_at
+        self.upvotes = upvotes
+        self.tag_offsets = tag_offsets
+        self.tag_ids = tag_ids
+        self.vocabulary = vocabulary
+        self.row_version = row_version
+        # When the data was last loaded in full; deltas keep it
+        self.loaded_at = time.monotonic()
+        # Row index of every tag entry, for tag filters and counts
+        self.tag_rows = np.repeat(np.arange(len(ids), dtype=np.int64), np.diff(tag_offsets))
+        self.created_day = created_at.astype('datetime64[D]')
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(array.nbytes for array in (
+            self.ids, self.priority, self.ai_priority, self.safety_flag, self.created_at,
+            self.upvotes, self.tag_offsets, self.tag_ids, self.tag_rows, self.created_day
+        ))
+
+    @classmethod
+    def from_rows(cls, rows: List[tuple], row_version: int,
+                  vocabulary: Optional[List[str]] = None) -> 'FeedbackSnapshot':
+        """Build from ANALYTICS_COLUMNS tuples sorted by id."""
+        vocabulary = list(vocabulary or ())
+        codes = {tag: code for code, tag in enumerate(vocabulary)}
+        count = len(rows)
+        ids, priority, ai_priority, tags, safety_flag, created_at, upvotes = zip(*rows) if rows else ((),) * 7
+        flat_tags = [tag for row_tags in tags if row_tags for tag in row_tags]
+        for tag in dict.fromkeys(flat_tags):
+            if tag not in codes:
+                codes[tag] = len(vocabulary)
+                vocabulary.append(tag)
+        lengths = np.fromiter((len(row_tags) if row_tags else 0 for row_tags in tags), np.int64, count)
+        return cls(
+            np.fromiter(ids, np.int64, count),
+            np.fromiter(priority, np.int16, count),
+            np.fromiter((value or 0 for value in ai_priority), np.int16, count),
+            np.fromiter((bool(value) for value in safety_flag), bool, count),
+            _timestamps(created_at, count),
+            np.fromiter((value or 0 for value in upvotes), np.int64, count),
+            np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64),
+            np.fromiter((codes[tag] for tag in flat_tags), np.int32, len(flat_tags)),
+            vocabulary, row_version
+        )
+
+    def merge(self, rows: List[tuple], row_version: int) -> 'FeedbackSnapshot':
+        """A new snapshot with ``rows`` (sorted by id) inserted or replaced."""
+        delta = FeedbackSnapshot.from_rows(rows, row_version, self.vocabulary)
+        keep = ~np.isin(self.ids, delta.ids, assume_unique=True)
+        keep_tags = keep[self.tag_rows]
+
+        ids = np.concatenate([self.ids[keep], delta.ids])
+        order = np.argsort(ids, kind='stable')
+        lengths = np.concatenate([np.diff(self.tag_offsets)[keep], np.diff(delta.tag_offsets)])
+        tag_ids = np.concatenate([self.tag_ids[keep_tags], delta.tag_ids])
+        # Reorder the CSR tag lists along with the rows
+        starts = np.concatenate([[0], np.cumsum(lengths)[:-1]]).astype(np.int64)[order]
+        lengths = lengths[order]
+        entries = np.repeat(starts - np.concatenate([[0], np.cumsum(lengths)[:-1]]), lengths)
+        tag_ids = tag_ids[np.arange(len(tag_ids), dtype=np.int64) + entries]
+
+        def column(name):
+            return np.concatenate([getattr(self, name)[keep], getattr(delta, name)])[order]
+
+        merged = FeedbackSnapshot(
+            ids[order], column('priority'), column('ai_priority'), column('safety_flag'),
+            column('created_at'), column('upvotes'),
+            np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64), tag_ids,
+            delta.vocabulary, row_version
+        )
+        merged.loaded_at = self.loaded_at
+        return merged
+
+    # Queries
+
+    def mask(self, feedback_filter: Optional[FeedbackFilter] = None) -> np.ndarray:
+        """Boolean row mask equivalent to FeedbackFilter.to_sql."""
+        feedback_filter = feedback_filter or FeedbackFilter()
+        mask = np.ones(len(self), dtype=bool)
+        if feedback_filter.priorities:
+            mask &= np.isin(self.priority, feedback_filter.priorities)
+        if feedback_filter.safety_only:
+            mask &= self.safety_flag
+        if feedback_filter.tags:
+            wanted = [code for code, tag in enumerate(self.vocabulary) if tag in feedback_filter.tags]
+            tagged = np.zeros(len(self), dtype=bool)
+            tagged[self.tag_rows[np.isin(self.tag_ids, wanted)]] = True
+            mask &= tagged
+        if feedback_filter.unanalyzed_only:
+            mask &= self.ai_priority == 0
+        if feedback_filter.created_from:
+            mask &= self.created_at >= np.datetime64(feedback_filter.created_from, 'us')
+        if feedback_filter.created_before:
+            mask &= self.created_at < np.datetime64(feedback_filter.created_before, 'us')
+        return mask
+
+    def count(self, feedback_filter: Optional[FeedbackFilter] = None) -> int:
+        return int(np.count_nonzero(self.mask(feedback_filter)))
+
+    def aggregates(self, feedback_filter: Optional[FeedbackFilter] = None,
+                   today: Optional[date] = None) -> Dict[str, Any]:
+        """The same result as Database.get_aggregates for this filter."""
+        mask = self.mask(feedback_filter)
+        priority = self.priority[mask]
+        total = len(priority)
+        today = np.datetime64(today or date.today(), 'D')
+
+        days = self.created_day[mask]
+        days = days[~np.isnat(days)]
+        daily_counts = []
+        if len(days):
+            offsets = (days - days.min()).astype(np.int64)
+            counts = np.bincount(offsets)
+            present = np.flatnonzero(counts)
+            first = days.min().item()
+            daily_counts = [(first + timedelta(days=int(offset)), int(counts[offset])) for offset in present]
+
+        values, priority_totals = np.unique(priority, return_counts=True)
+        tag_totals = np.bincount(self.tag_ids[mask[self.tag_rows]], minlength=len(self.vocabulary))
+        tags = sorted(
+            ((self.vocabulary[code], int(n)) for code, n in enumerate(tag_totals) if n),
+            key=lambda item: (-item[1], item[0])
+        )
+
+        # Postgres rounds numeric half away from zero
+        avg_priority = 0.0
+        if total:
+            avg_priority = float((Decimal(int(priority.sum(dtype=np.int64))) / total)
+                                 .quantize(Decimal('0.01'), rounding=ROUND_HALF_UP))
+        return {
+            'total_feedback': total,
+            'recent_feedback': int(np.count_nonzero(days >= today - (RECENT_WINDOW_DAYS - 1))),
+            'high_priority': int(np.count_nonzero(priority >= HIGH_PRIORITY_THRESHOLD)),
+            'safety_concerns': int(np.count_nonzero(self.safety_flag[mask])),
+            'avg_priority': avg_priority,
+            'daily_counts': daily_counts,
+            'priority_counts': {int(value): int(n) for value, n in zip(values, priority_totals)},
+            'tag_counts': dict(tags)
+        }
+
+
+class SnapshotStore:
+    """Holds the current snapshot and refreshes it from the database."""
+
+    def __init__(self, max_age: float = SNAPSHOT_MAX_AGE):
+        self.max_age = max_age
+        self._snapshot: Optional[FeedbackSnapshot] = None
+        self._lock = threading.Lock()
+
+    def get(self, db) -> FeedbackSnapshot:
+        """The snapshot, brought up to date first. Safe to call per request:
+        an unchanged table costs one small query."""
+        with self._lock:
+            self._snapshot = self._refresh(db, self._snapshot)
+            return self._snapshot
+
+    def _refresh(self, db, snapshot: Optional[FeedbackSnapshot]) -> FeedbackSnapshot:
+        row_version, total = db.get_analytics_state()
+        if snapshot is None or time.monotonic() - snapshot.loaded_at > self.max_age:
+            return self._load(db, row_version)
+        if row_version == snapshot.row_version and total == len(snapshot):
+            return snapshot
+
+        started = time.perf_counter()
+        rows = self._fetch(db, snapshot.row_version)
+        SNAPSHOT_ROWS_LOADED.inc(len(rows), kind='delta')
+        refreshed = snapshot.merge(rows, row_version) if rows else snapshot
+        if len(refreshed) != total:
+            # Deleted rows, or a row committed after a newer version was read
+            logger.info("Snapshot has %s rows, rollups %s; reloading", len(refreshed), total)
+            return self._load(db, row_version)
+        refreshed.row_version = row_version
+        SNAPSHOT_REFRESH_SECONDS.observe(time.perf_counter() - started, kind='delta')
+        return refreshed
+
+    def _load(self, db, row_version: int) -> FeedbackSnapshot:
+        # row_version was read before the rows, so later writes are
+        # picked up by the next delta
+        started = time.perf_counter()
+        rows = self._fetch(db, None)
+        snapshot = FeedbackSnapshot.from_rows(rows, row_version)
+        SNAPSHOT_ROWS_LOADED.inc(len(rows), kind='full')
+        SNAPSHOT_REFRESH_SECONDS.observe(time.perf_counter() - started, kind='full')
+        logger.info("Loaded analytics snapshot", extra={'rows': len(snapshot), 'bytes': snapshot.nbytes})
+        return snapshot
+
+    @staticmethod
+    def _fetch(db, changed_after: Optional[int]) -> List[tuple]:
+        rows = []
+        after_id = 0
+        while True:
+            batch = db.get_analytics_rows(after_id, LOAD_BATCH_SIZE, changed_after)
+            rows.extend(batch)
+            if len(batch) < LOAD_BATCH_SIZE:
+                return rows
+            after_id = batch[-1][0]
+
+
+_store: Optional[SnapshotStore] = None
+_store_lock = threading.Lock()
+
+
+def get_snapshot(db) -> FeedbackSnapshot:
+    """The process-wide analytics snapshot, refreshed if feedback changed."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = SnapshotStore()
+    return _store.get(db)
@@ -1,96 +1,435 @@
+"""Executive summaries over the whole feedback set, map-reduce style.
+
+Map: feedback is partitioned into time windows (calendar weeks for the
+last RECENT_WEEKS weeks, calendar months before that). Each window's most
+pressing items are summarized concurrently, and each partial summary is
+cached under the window's rollup counts, so only windows whose feedback
+changed are summarized again.
+
+Reduce: the partial summaries and the overall metrics are combined into
+the final summary. That request is streamed, and the executive_summary
+text is decoded from the JSON while it is still being generated.
+"""
+import json
+import logging
 import os
-from datetime import datetime, timedelta
-from typing import Dict, List, Any
-import pandas as pd
-from openai import OpenAI
+import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from datetime import datetime, date, timedelta
+from typing import Callable, Dict, Iterator, List, Any, Optional, Tuple
+from utils.llm import (
+    ResponseFormatError, complete_json, expect_str, expect_str_list, object_schema,
+    parse_json_object, repair_messages, response_format, stream_chat_completion
+)
+from utils.aggregation import HIGH_PRIORITY_THRESHOLD, top_tags
+from utils.cache import get_cache, make_key
 
-class SummaryGenerator:
-    def __init__(self):
-        self.client = OpenAI(api_key=os.environ.get('OPENAI_API_KEY'))
+logger = logging.getLogger(__name__)
+
+SUMMARY_MODEL = os.environ.get('SUMMARY_MODEL', 'gpt-4o')
+# Bump when the summary prompts change so cached summaries are not reused
+SUMMARY_PROMPT_VERSION = "3"
+# Long-form output takes a while to generate
+SUMMARY_TIMEOUT = 90
+PARTITION_TIMEOUT = 45
+
+RECENT_WEEKS = 12
+# Items quoted per window in the map prompt, and how much of each
+PARTITION_ITEMS = 25
+PARTITION_DESCRIPTION_CHARS = 400
+SUMMARY_WORKERS = int(os.environ.get('SUMMARY_WORKERS', 4))
+
+SYSTEM_PROMPT = "You are an AI safety expert analyzing feedback trends and generating executive summaries."
+PARTITION_COLUMNS = ('id', 'title', 'description', 'priority', 'ai_priority', 'safety_flag', 'upvotes')
+
+
+@dataclass(frozen=True)
+class ExecutiveSummary:
+    """A validated model-written executive summary."""
+    executive_summary: str
+    key_recommendations: Tuple[str, ...]
+    risk_assessment: str
+    focus_areas: Tuple[str, ...]
+
+    @classmethod
+    def from_json(cls, data: Dict[str, Any]) -> 'ExecutiveSummary':
+        summary = cls(
+            executive_summary=expect_str(data, 'executive_summary'),
+            key_recommendations=tuple(expect_str_list(data, 'key_recommendations')),
+            risk_assessment=expect_str(data, 'risk_assessment'),
+            focus_areas=tuple(expect_str_list(data, 'focus_areas'))
+        )
+        if not summary.key_recommendations:
+            raise ResponseFormatError("key_recommendations must not be empty")
+        return summary
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'executive_summary': self.executive_summary,
+            'key_recommendations': list(self.key_recommendations),
+            'risk_assessment': self.risk_assessment,
+            'focus_areas': list(self.focus_areas)
+        }
+
+
+@dataclass(frozen=True)
+class PartitionSummary:
+    """A validated summary of one time window."""
+    summary: str
+    themes: Tuple[str, ...]
+    risks: Tuple[str, ...]
+
+    @classmethod
+    def from_json(cls, data: Dict[str, Any]) -> 'PartitionSummary':
+        return cls(
+            summary=expect_str(data, 'summary'),
+            themes=tuple(expect_str_list(data, 'themes')),
+            risks=tuple(expect_str_list(data, 'risks'))
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'summary': self.summary, 'themes': list(self.themes), 'risks': list(self.risks)}
+
+
+# Property order matters: executive_summary comes first so it can be
+# shown while the rest of the reply is generated
+EXECUTIVE_SUMMARY_SCHEMA = object_schema({
+    'executive_summary': {'type': 'string'},
+    'key_recommendations': {'type': 'array', 'items': {'type': 'string'}},
+    'risk_assessment': {'type': 'string'},
+    'focus_areas': {'type': 'array', 'items': {'type': 'string'}}
+})
+PARTITION_SUMMARY_SCHEMA = object_schema({
+    'summary': {'type': 'string'},
+    'themes': {'type': 'array', 'items': {'type': 'string'}},
+    'risks': {'type': 'array', 'items': {'type': 'string'}}
+})
+
+
+@dataclass(frozen=True)
+class SummaryWindow:
+    """A time window of feedback, ``start`` inclusive and ``end`` exclusive."""
+    start: date
+    end: date
+    label: str
+    feedback_count: int
+    high_priority_count: int
+    safety_count: int
+    priority_sum: int
+
+    @property
+    def avg_priority(self) -> float:
+        return self.priority_sum / self.feedback_count if self.feedback_count else 0.0
+
+    @property
+    def fingerprint(self) -> str:
+        # Rollup counts change whenever a row in the window is added,
+        # removed, re-prioritized or flagged
+        return f"{self.feedback_count}:{self.high_priority_count}:{self.safety_count}:{self.priority_sum}"
+
+
+def summary_windows(daily_stats: List[Dict[str, Any]], today: Optional[date] = None,
+                    recent_weeks: int = RECENT_WEEKS) -> List[SummaryWindow]:
+    """Group per-day rollup rows into windows, oldest first."""
+    today = today or date.today()
+    cutoff = today - timedelta(days=today.weekday(), weeks=recent_weeks - 1)
+    windows: Dict[date, Dict[str, Any]] = {}
+    for row in daily_stats:
+        day = row['day']
+        if day >= cutoff:
+            start = day - timedelta(days=day.weekday())
+            end = start + timedelta(weeks=1)
+            label = f"Week of {start.isoformat()}"
+        else:
+            start = day.replace(day=1)
+            end = min((start + timedelta(days=32)).replace(day=1), cutoff)
+            label = start.strftime('%B %Y')
+        window = windows.setdefault(start, {
+            'start': start, 'end': end, 'label': label, 'feedback_count': 0,
+            'high_priority_count': 0, 'safety_count': 0, 'priority_sum': 0
+        })
+        for field in ('feedback_count', 'high_priority_count', 'safety_count', 'priority_sum'):
+            window[field] += int(row[field])
+    return [SummaryWindow(**windows[start]) for start in sorted(windows)]
+
+
+class _FieldStream:
+    """Decodes one top-level string field of a JSON object while it streams in."""
+
+    def __init__(self, field: str):
+        self._opening = re.compile(r'"%s"\s*:\s*"' % re.escape(field))
+        self.buffer = ''
+        self._start = None
+        self._emitted = 0
+        self._done = False
+
+    def feed(self, delta: str) -> str:
+        """Add a chunk of the reply; return newly decoded text of the field."""
+        self.buffer += delta
+        if self._done:
+            return ''
+        if self._start is None:
+            match = self._opening.search(self.buffer)
+            if not match:
+                return ''
+            self._start = match.end()
+        raw = self.buffer[self._start:]
+        end = self._closing_quote(raw)
+        if end is None:
+            raw = self._trim_partial_escape(raw)
+        else:
+            raw = raw[:end]
+            self._done = True
+        try:
+            text = json.loads(f'"{raw}"')
+        except ValueError:
+            return ''
+        if not self._done and text and '\ud800' <= text[-1] <= '\udbff':
+            # Half of a surrogate pair; wait for the other half
+            text = text[:-1]
+        new = text[self._emitted:]
+        self._emitted = len(text)
+        return new
+
+    @staticmethod
+    def _closing_quote(raw: str) -> Optional[int]:
+        index = 0
+        while index < len(raw):
+            if raw[index] == '\\':
+                index += 2
+                continue
+            if raw[index] == '"':
+                return index
+            index += 1
+        return None
+
+    @staticmethod
+    def _trim_partial_escape(raw: str) -> str:
+        match = re.search(r'(\\+)(u[0-9a-fA-F]{0,3})?$', raw)
+        if match and len(match.group(1)) % 2 == 1:
+            return raw[:match.end(1) - 1]
+        return raw
+
+
+class SummaryStream:
+    """Iterating yields the executive summary text as the model writes it.
+
+    Once iteration finishes, ``result`` holds the complete summary dict
+    (or an ``error`` entry), shaped like generate_executive_summary's.
+    """
+
+    def __init__(self, messages: List[Dict[str, str]], metrics: Dict[str, Any],
+                 cache_key: Optional[str]):
+        self.messages = messages
+        self.metrics = metrics
+        self.cache_key = cache_key
+        self.result: Optional[Dict[str, Any]] = None
 
-    def generate_metrics_summary(self, feedback_data: List[Dict]) -> Dict[str, Any]:
-        """Generate key metrics from feedback data."""
-        if not feedback_data:
+    def __iter__(self) -> Iterator[str]:
+        field = _FieldStream('executive_summary')
+        try:
+            for delta in stream_chat_completion(
+                'executive_summary', model=SUMMARY_MODEL, messages=self.messages,
+                response_format=response_format('executive_summary', EXECUTIVE_SUMMARY_SCHEMA),
+                timeout=SUMMARY_TIMEOUT
+            ):
+                text = field.feed(delta)
+                if text:
+                    yield text
+            try:
+                summary = ExecutiveSummary.from_json(parse_json_object(field.buffer))
+            except ResponseFormatError as e:
+                # One repair round, not streamed; callers re-render the text
+                summary = complete_json(
+                    'executive_summary', repair_messages(self.messages, field.buffer, e),
+                    ExecutiveSummary.from_json, model=SUMMARY_MODEL,
+                    schema=EXECUTIVE_SUMMARY_SCHEMA, timeout=SUMMARY_TIMEOUT, repairs=0
+                )
+        except Exception as e:
+            logger.warning("Executive summary generation failed: %s", e)
+            self.result = {
+                'error': f"Failed to generate AI summary: {str(e)}",
+                'metrics': self.metrics,
+                'generated_at': datetime.now().isoformat()
+            }
+            return
+
+        ai_summary = {**summary.to_dict(), 'generated_at': datetime.now().isoformat()}
+        if self.cache_key is not None:
+            get_cache('executive_summary').set(self.cache_key, ai_summary)
+        self.result = {**ai_summary, 'metrics': self.metrics}
+
+
+class SummaryGenerator:
+    def generate_metrics_summary(self, aggregates: Dict[str, Any]) -> Dict[str, Any]:
+        """Generate key metrics from Database.get_aggregates output."""
+        if not aggregates or not aggregates['total_feedback']:
             return {
                 'total_feedback': 0,
+                'recent_feedback': 0,
                 'high_priority': 0,
                 'safety_concerns': 0,
-                'avg_priority': 0
+                'avg_priority': 0,
+                'top_tags': {}
             }
 
-        df = pd.DataFrame(feedback_data)
-        
-        # Calculate time-based metrics
-        df['created_at'] = pd.to_datetime(df['created_at'])
-        last_week = datetime.now() - timedelta(days=7)
-        recent_df = df[df['created_at'] >= last_week]
-
         return {
-            'total_feedback': len(df),
-            'recent_feedback': len(recent_df),
-            'high_priority': len(df[df['priority'] >= 4]),
-            'safety_concerns': len(df[df['safety_flag'] == True]),
-            'avg_priority': round(df['priority'].mean(), 2),
-            'top_tags': df['tags'].explode().value_counts().head(5).to_dict() if 'tags' in df else {}
+            'total_feedback': aggregates['total_feedback'],
+            'recent_feedback': aggregates['recent_feedback'],
+            'high_priority': aggregates['high_priority'],
+            'safety_concerns': aggregates['safety_concerns'],
+            'avg_priority': aggregates['avg_priority'],
+            'top_tags': top_tags(aggregates)
         }
 
-    def generate_executive_summary(self, feedback_data: List[Dict]) -> Dict[str, Any]:
-        """Generate an AI-powered executive summary of feedback."""
-        metrics = self.generate_metrics_summary(feedback_data)
-        
-        # Prepare data for AI analysis
-        high_priority_items = [
-            f"{item['title']}: {item['description'][:200]}..."
-            for item in feedback_data
-            if item['priority'] >= 4
-        ]
-        
-        safety_items = [
-            f"{item['title']}: {item['description'][:200]}..."
-            for item in feedback_data
-            if item.get('safety_flag', False)
-        ]
+    def _summary_cache_key(self, watermark: str) -> str:
+        # The date is part of the key because the 7-day metrics roll over daily
+        return make_key('executive_summary', SUMMARY_MODEL, SUMMARY_PROMPT_VERSION,
+                        {'watermark': watermark, 'date': date.today().isoformat()})
+
+    def get_cached_summary(self, aggregates: Dict[str, Any], watermark: str) -> Optional[Dict[str, Any]]:
+        """Return the summary generated for this data ``watermark``, if cached."""
+        cached = get_cache('executive_summary').get(self._summary_cache_key(watermark))
+        if cached is None:
+            return None
+        return {**cached, 'metrics': self.generate_metrics_summary(aggregates)}
+
+    # Map stage
+
+    def _partition_cache_key(self, window: SummaryWindow) -> str:
+        return make_key('summary_partition', SUMMARY_MODEL, SUMMARY_PROMPT_VERSION, {
+            'start': window.start.isoformat(), 'end': window.end.isoformat(),
+            'fingerprint': window.fingerprint
+        })
+
+    def _summarize_window(self, db, window: SummaryWindow) -> PartitionSummary:
+        from utils.database import FeedbackFilter
+        items = db.get_top_feedback(
+            PARTITION_ITEMS,
+            FeedbackFilter(created_from=window.start, created_before=window.end),
+            columns=PARTITION_COLUMNS
+        )
+        quoted = '\n'.join(
+            f"- [priority {item['ai_priority'] or item['priority']}"
+            f"{', safety concern' if item['safety_flag'] else ''}, {item['upvotes']} upvotes] "
+            f"{item['title']}: {item['description'][:PARTITION_DESCRIPTION_CHARS]}"
+            for item in items
+        )
+        prompt = f"""Summarize this period of AI safety feedback for an executive report.
+Period: {window.label} ({window.start.isoformat()} to {(window.end - timedelta(days=1)).isoformat()})
+Items: {window.feedback_count}; high priority: {window.high_priority_count}; safety concerns: {window.safety_count}; average priority: {window.avg_priority:.1f}
+
+The {len(items)} most pressing items:
+{quoted or 'None'}
 
-        prompt = f"""Generate an executive summary of AI safety feedback data with the following structure:
+Provide a JSON response with:
+1. summary (one paragraph on what this period's feedback is about)
+2. themes (list of 2-4 recurring themes)
+3. risks (list of notable safety risks; empty if none)"""
+        return complete_json(
+            'summary_partition',
+            [
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ],
+            PartitionSummary.from_json,
+            model=SUMMARY_MODEL,
+            schema=PARTITION_SUMMARY_SCHEMA,
+            timeout=PARTITION_TIMEOUT,
+            temperature=0.3,
+            max_tokens=400
+        )
+
+    def summarize_partitions(self, db, progress: Optional[Callable[[int, int], None]] = None
+                             ) -> List[Tuple[SummaryWindow, PartitionSummary]]:
+        """Partial summaries for every window, oldest first.
+
+        Cached windows are reused; the rest are summarized concurrently and
+        ``progress(done, total)`` is called as each finishes. Windows that
+        fail are left out (and retried next time).
+        """
+        windows = summary_windows(db.get_daily_stats())
+        cache = get_cache('summary_partition')
+        summaries: Dict[date, PartitionSummary] = {}
+        pending = []
+        for window in windows:
+            cached = cache.get(self._partition_cache_key(window))
+            if cached is not None:
+                summaries[window.start] = PartitionSummary.from_json(cached)
+            else:
+                pending.append(window)
+
+        done = len(summaries)
+        if progress:
+            progress(done, len(windows))
+        if pending:
+            with ThreadPoolExecutor(max_workers=SUMMARY_WORKERS, thread_name_prefix="summary") as executor:
+                futures = {executor.submit(self._summarize_window, db, window): window for window in pending}
+                for future in as_completed(futures):
+                    window = futures[future]
+                    try:
+                        summaries[window.start] = future.result()
+                        cache.set(self._partition_cache_key(window), summaries[window.start].to_dict())
+                    except Exception as e:
+                        logger.warning("Summarizing %s failed: %s", window.label, e)
+                    done += 1
+                    if progress:
+                        progress(done, len(windows))
+        return [(window, summaries[window.start]) for window in windows if window.start in summaries]
+
+    # Reduce stage
+
+    def _reduce_prompt(self, metrics: Dict[str, Any],
+                       partials: List[Tuple[SummaryWindow, PartitionSummary]]) -> str:
+        periods = '\n\n'.join(
+            f"### {window.label} ({window.feedback_count} items, {window.safety_count} safety concerns, "
+            f"average priority {window.avg_priority:.1f})\n"
+            f"{partial.summary}\n"
+            f"Themes: {', '.join(partial.themes) or 'none'}\n"
+            f"Risks: {', '.join(partial.risks) or 'none'}"
+            for window, partial in partials
+        )
+        tags = ', '.join(f"{tag} ({count})" for tag, count in metrics['top_tags'].items())
+        return f"""Generate an executive summary of AI safety feedback data.
 Key Metrics:
 - Total Feedback: {metrics['total_feedback']}
 - Recent Feedback (7 days): {metrics['recent_feedback']}
-- High Priority Items: {metrics['high_priority']}
+- High Priority Items (priority {HIGH_PRIORITY_THRESHOLD}+): {metrics['high_priority']}
 - Safety Concerns: {metrics['safety_concerns']}
 - Average Priority: {metrics['avg_priority']}
+- Top Tags: {tags or 'None'}
 
-High Priority Feedback:
-{', '.join(high_priority_items[:5]) if high_priority_items else 'None'}
+Summaries of the feedback by period, oldest first:
 
-Safety Concerns:
-{', '.join(safety_items[:5]) if safety_items else 'None'}
+{periods or 'None'}
 
-Generate a JSON response with:
-1. executive_summary (2-3 paragraphs highlighting key insights)
+Generate a JSON response with, in this order:
+1. executive_summary (2-3 paragraphs highlighting key insights and trends over time)
 2. key_recommendations (list of 3-5 actionable items)
 3. risk_assessment (brief assessment of identified safety risks)
 4. focus_areas (list of 2-3 areas needing immediate attention)"""
 
-        try:
-            response = self.client.chat.completions.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": "You are an AI safety expert analyzing feedback trends and generating executive summaries."},
-                    {"role": "user", "content": prompt}
-                ],
-                response_format={"type": "json_object"}
-            )
-            
-            ai_summary = eval(response.choices[0].message.content)
-            return {
-                **ai_summary,
-                'metrics': metrics,
-                'generated_at': datetime.now().isoformat()
-            }
-            
-        except Exception as e:
-            return {
-                'error': f"Failed to generate AI summary: {str(e)}",
-                'metrics': metrics,
-                'generated_at': datetime.now().isoformat()
-            }
+    def stream_executive_summary(self, aggregates: Dict[str, Any],
+                                 partials: List[Tuple[SummaryWindow, PartitionSummary]],
+                                 watermark: Optional[str] = None) -> SummaryStream:
+        """Reduce ``partials`` (from summarize_partitions) into a streamed summary.
+
+        When a data ``watermark`` (Database.get_feedback_watermark) is given
+        the result is cached until the feedback set changes.
+        """
+        metrics = self.generate_metrics_summary(aggregates)
+        messages = [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": self._reduce_prompt(metrics, partials)}
+        ]
+        cache_key = self._summary_cache_key(watermark) if watermark is not None else None
+        return SummaryStream(messages, metrics, cache_key)
+
+    def generate_executive_summary(self, db, aggregates: Dict[str, Any],
+                                   watermark: Optional[str] = None) -> Dict[str, Any]:
+        """Map and reduce without streaming; returns the summary dict."""
+        stream = self.stream_executive_summary(aggregates, self.summarize_partitions(db), watermark)
+        for _ in stream:
+            pass
+        return stream.result
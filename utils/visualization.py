@@ -1,73 +1,153 @@
-import plotly.express as px
+import logging
+import os
 import plotly.graph_objects as go
-import pandas as pd
-from datetime import datetime, timedelta
-
-def create_feedback_trend_chart(feedback_data):
-    if not feedback_data:
-        fig = go.Figure()
-        fig.add_annotation(text='No feedback data available', showarrow=False)
-        return fig
-    
-    df = pd.DataFrame(feedback_data)
-    if 'created_at' not in df.columns:
-        fig = go.Figure()
-        fig.add_annotation(text='Created date information not available', showarrow=False)
-        return fig
-    
-    df['created_at'] = pd.to_datetime(df['created_at'])
-    daily_counts = df.groupby(df['created_at'].dt.date).size().reset_index()
-    daily_counts.columns = ['date', 'count']
-    
-    fig = px.line(daily_counts, x='date', y='count',
-                  title='Feedback Submissions Over Time')
+import plotly.io as pio
+
+# Chart builders take the precomputed aggregates from Database.get_aggregates
+# rather than raw rows, so no chart re-scans or regroups the feedback table.
+# They use graph_objects directly: plotly.express would pull in pandas.
+#
+# Each figure is serialized to the browser, so its size is bounded: the
+# trend is re-binned into days, weeks or months to stay under
+# TREND_MAX_POINTS, the tag chart keeps its TAG_CHART_TOP_N largest tags,
+# and either is coarsened further if its JSON exceeds CHART_PAYLOAD_BUDGET.
+# NumPy is imported inside the functions that bin data, so importing this
+# module (and the Dashboard page) does not load it.
+
+logger = logging.getLogger(__name__)
+
+TREND_MAX_POINTS = int(os.environ.get('CHART_TREND_MAX_POINTS', 180))
+TAG_CHART_TOP_N = int(os.environ.get('CHART_TOP_TAGS', 10))
+CHART_PAYLOAD_BUDGET = int(os.environ.get('CHART_PAYLOAD_BUDGET', 200_000))
+# Line traces with more points than this are drawn with WebGL
+WEBGL_MIN_POINTS = 1000
+
+# Trend buckets, finest first, with their approximate length in days
+BUCKETS = ('day', 'week', 'month')
+_BUCKET_DAYS = {'day': 1, 'week': 7, 'month': 30}
+
+def _empty_figure(message):
+    fig = go.Figure()
+    fig.add_annotation(text=message, showarrow=False)
     return fig
 
-def create_priority_distribution(feedback_data):
-    if not feedback_data:
-        fig = go.Figure()
-        fig.add_annotation(text='No feedback data available', showarrow=False)
-        return fig
-    
-    df = pd.DataFrame(feedback_data)
-    if 'priority' not in df.columns:
-        fig = go.Figure()
-        fig.add_annotation(text='Priority information not available', showarrow=False)
-        return fig
-    
-    priority_counts = df['priority'].value_counts().sort_index()
-    
-    fig = px.pie(values=priority_counts.values,
-                 names=priority_counts.index,
-                 title='Feedback by Priority Level')
+def chart_payload_size(fig):
+    """Bytes of JSON the figure sends to the browser."""
+    return len(pio.to_json(fig, validate=False))
+
+def daily_series(daily_counts):
+    """``(days, counts)`` arrays from aggregates' ``daily_counts``: a list of
+    ``(date, count)`` pairs, or a pair of arrays that is already binned."""
+    import numpy as np
+    if isinstance(daily_counts, tuple) and len(daily_counts) == 2 and isinstance(daily_counts[0], np.ndarray):
+        days, counts = daily_counts
+    elif daily_counts:
+        days = [day for day, _ in daily_counts]
+        counts = np.fromiter((count for _, count in daily_counts), dtype=np.int64, count=len(daily_counts))
+    else:
+        days, counts = [], []
+    days = np.asarray(days, dtype='datetime64[D]')
+    counts = np.asarray(counts, dtype=np.int64)
+    order = np.argsort(days, kind='stable')
+    return days[order], counts[order]
+
+def choose_bucket(days, max_points=TREND_MAX_POINTS):
+    """The finest bucket that keeps the span of ``days`` within ``max_points``."""
+    import numpy as np
+    span = int((days[-1] - days[0]).astype(np.int64)) + 1 if len(days) else 0
+    for bucket in BUCKETS:
+        if span / _BUCKET_DAYS[bucket] <= max_points:
+            return bucket
+    return BUCKETS[-1]
+
+def bucket_series(days, counts, bucket):
+    """Sum sorted daily counts into ``bucket``s labelled by their first day;
+    weeks start on Monday."""
+    import numpy as np
+    if bucket == 'week':
+        # Day 0 of datetime64 (1970-01-01) is a Thursday
+        keys = days - (days.astype(np.int64) + 3) % 7
+    elif bucket == 'month':
+        keys = days.astype('datetime64[M]').astype('datetime64[D]')
+    else:
+        keys = days
+    if not len(keys):
+        return keys, counts
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    return keys[starts], np.add.reduceat(counts, starts)
+
+def top_with_other(counts, limit):
+    """The ``limit`` largest entries of a ``{label: count}`` mapping, plus
+    one "other" entry summing the rest, as ``(labels, values)``."""
+    import numpy as np
+    labels = list(counts)
+    values = np.fromiter(counts.values(), dtype=np.int64, count=len(labels))
+    order = np.argsort(-values, kind='stable')
+    if len(labels) <= limit:
+        return [labels[i] for i in order], values[order]
+    rest = order[limit:]
+    return ([labels[i] for i in order[:limit]] + [f'other ({len(rest)} tags)'],
+            np.append(values[order[:limit]], values[rest].sum()))
+
+def _trend_figure(keys, counts, bucket):
+    trace = go.Scattergl if len(keys) > WEBGL_MIN_POINTS else go.Scatter
+    fig = go.Figure(trace(x=keys, y=counts, mode='lines'))
+    fig.update_layout(title='Feedback Submissions Over Time',
+                      xaxis_title=bucket, yaxis_title=f'count per {bucket}')
     return fig
 
-def create_tag_distribution(feedback_data):
-    if not feedback_data:
-        fig = go.Figure()
-        fig.add_annotation(text='No feedback data available', showarrow=False)
-        return fig
-    
-    df = pd.DataFrame(feedback_data)
-    if 'tags' not in df.columns:
-        fig = go.Figure()
-        fig.add_annotation(text='Tag information not available', showarrow=False)
-        return fig
-    
-    # Handle empty tags
-    if df.empty or all(not tags for tags in df['tags']):
-        fig = go.Figure()
-        fig.add_annotation(text='No tags available', showarrow=False)
-        return fig
-        
-    all_tags = [tag for tags in df['tags'] for tag in tags if tags]  # Only include non-empty tag lists
-    if not all_tags:  # If no tags after filtering
-        fig = go.Figure()
-        fig.add_annotation(text='No tags available', showarrow=False)
-        return fig
-        
-    tag_counts = pd.Series(all_tags).value_counts()
-    
-    fig = px.bar(x=tag_counts.index, y=tag_counts.values,
-                 title='Distribution of Feedback Tags')
+def create_feedback_trend_chart(aggregates, bucket=None, max_points=TREND_MAX_POINTS,
+                                budget=CHART_PAYLOAD_BUDGET):
+    """Submissions per ``bucket`` ('day', 'week' or 'month'); by default the
+    finest one within ``max_points``. Coarser buckets are used while the
+    figure exceeds ``budget`` bytes."""
+    if not aggregates or not aggregates['total_feedback']:
+        return _empty_figure('No feedback data available')
+
+    days, counts = daily_series(aggregates['daily_counts'])
+    if not len(days):
+        return _empty_figure('Created date information not available')
+
+    bucket = bucket or choose_bucket(days, max_points)
+    for candidate in BUCKETS[BUCKETS.index(bucket):]:
+        fig = _trend_figure(*bucket_series(days, counts, candidate), candidate)
+        size = chart_payload_size(fig)
+        if size <= budget:
+            return fig
+    logger.warning("Trend chart exceeds its payload budget", extra={'bytes': size, 'budget': budget})
     return fig
+
+def create_priority_distribution(aggregates):
+    if not aggregates or not aggregates['total_feedback']:
+        return _empty_figure('No feedback data available')
+
+    priority_counts = aggregates['priority_counts']
+    if not priority_counts:
+        return _empty_figure('Priority information not available')
+
+    fig = go.Figure(go.Pie(values=list(priority_counts.values()),
+                           labels=list(priority_counts.keys())))
+    fig.update_layout(title='Feedback by Priority Level')
+    return fig
+
+def create_tag_distribution(aggregates, top_n=TAG_CHART_TOP_N, budget=CHART_PAYLOAD_BUDGET):
+    """The ``top_n`` most frequent tags and an "other" bar for the rest;
+    fewer tags are shown while the figure exceeds ``budget`` bytes."""
+    if not aggregates or not aggregates['total_feedback']:
+        return _empty_figure('No feedback data available')
+
+    tag_counts = aggregates['tag_counts']
+    if not tag_counts:
+        return _empty_figure('No tags available')
+
+    while True:
+        labels, values = top_with_other(tag_counts, top_n)
+        fig = go.Figure(go.Bar(x=labels, y=values))
+        fig.update_layout(title='Distribution of Feedback Tags')
+        size = chart_payload_size(fig)
+        if size <= budget:
+            return fig
+        if top_n <= 1:
+            logger.warning("Tag chart exceeds its payload budget", extra={'bytes': size, 'budget': budget})
+            return fig
+        top_n //= 2
@@ -0,0 +1,56 @@
+"""Background coalescing of upvotes into feedback.upvotes.
+
+Votes are appended to feedback_votes by Database.upvote_feedback; this
+thread periodically folds the pending ones into the counters so a burst of
+votes on one item becomes a single row update.
+"""
+import logging
+import os
+import threading
+from typing import Optional
+
+from utils.database import Database
+
+logger = logging.getLogger(__name__)
+
+
+class VoteFlusher:
+    def __init__(self, db=None, interval: float = 2.0, batch_size: int = 10000):
+        self.db = db or Database()
+        self.interval = interval
+        self.batch_size = batch_size
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self.run, name="vote-flusher", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                # Keep draining until nothing is pending
+                while self.db.flush_votes(self.batch_size) and not self._stop.is_set():
+                    pass
+            except Exception:
+                # Pending votes stay in the log and are retried next tick
+                logger.exception("Error flushing votes")
+
+
+_flusher: Optional[VoteFlusher] = None
+_flusher_lock = threading.Lock()
+
+
+def ensure_vote_flusher_started() -> VoteFlusher:
+    """Start this process's flusher once; the interval is VOTE_FLUSH_INTERVAL seconds."""
+    global _flusher
+    if _flusher is None:
+        with _flusher_lock:
+            if _flusher is None:
+                _flusher = VoteFlusher(interval=float(os.environ.get('VOTE_FLUSH_INTERVAL', 2)))
+                _flusher.start()
+    return _flusher